@@ -3,12 +3,29 @@
 CLI for the Mini RAG system: index emails, ask questions, run eval.
 Usage:
   python cli.py index              # build Qdrant index from emails/
+  python cli.py index --dedup      # ... collapsing near-duplicate paragraphs
+  python cli.py index --collection-profile bulk-load   # defer HNSW until the load finishes
+  python cli.py index --profile    # + sampled CPU profile (collapsed stacks), memory peak, stage times
+  python cli.py index --shard sales  # rebuild one shard (SHARDS / SHARD_HASH_BUCKETS)
+  python cli.py index --precompute # ... then re-answer the frequent logged questions
+  python cli.py index --chunking window  # paragraph | window | sentence | email (CHUNK_STRATEGY)
+  python cli.py chunk-report       # chunk count, token lengths, truncation and embed time per strategy
   python cli.py ask "your question" # get answer (requires index + MISTRAL_API_KEY)
   python cli.py ask "question" --subject "Meeting Request"  # with filter
+  python cli.py ask "question" --since 2024-01-01 --where '{"subject": {"$prefix": "Budget"}}'
+  python cli.py ask "question" --shard sales --shard hr  # search only these shards
+  python cli.py ask "question" --deadline-ms 1500  # degrade (skip planning, fewer chunks, extractive) to fit
+  python cli.py precompute --top 50  # answer frequent questions from the query log (QUERY_LOG=1) ahead of time
   python cli.py eval               # run quality evaluation (e2e tests)
+  python cli.py sweep --top-k 3,5,10 --hierarchical on,off   # recall@k / MRR / latency / memory per config
+  python cli.py sweep --synthetic 5000 --compact-dim 0,64 --min-recall 0.9   # + Pareto frontier, guardrail
+  python cli.py loadtest --concurrency 16 --requests 500   # throughput and latency percentiles
+  python cli.py snapshot export DIR [--dtype int8] [--compress]   # dump vectors + payloads
+  python cli.py snapshot import DIR [--parallel 8]                # restore without re-embedding
 """
 
 import argparse
+import json
 import logging
 import os
 import sys
@@ -17,8 +34,10 @@ from pathlib import Path
 # Ensure project root is on path
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from rag.config import EMAILS_DIR, MISTRAL_API_KEY
+from rag.chunking import CHUNK_STRATEGIES
+from rag.config import COLLECTION_PROFILES, EMAILS_DIR, MISTRAL_API_KEY, PROFILE_DIR
 from rag.pipeline import RAGPipeline
+from rag.profiling import profiled, record_stages
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,14 +48,23 @@ logger = logging.getLogger(__name__)
 
 
 def _where_from_args(args: argparse.Namespace) -> dict | None:
-    """Build Qdrant payload filter from CLI args."""
+    """Build Qdrant payload filter from CLI args (see rag.filters for the --where grammar)."""
     filters = []
+    if getattr(args, "where", None):
+        filters.append(json.loads(args.where))
     if getattr(args, "subject", None):
         filters.append({"subject": {"$eq": args.subject}})
     if getattr(args, "from_", None):
         filters.append({"from": {"$eq": args.from_}})
     if getattr(args, "to", None):
         filters.append({"to": {"$eq": args.to}})
+    dates = {}
+    if getattr(args, "since", None):
+        dates["$gte"] = args.since
+    if getattr(args, "until", None):
+        dates["$lt"] = args.until
+    if dates:
+        filters.append({"date": dates})
     if not filters:
         return None
     if len(filters) == 1:
@@ -45,22 +73,129 @@ def _where_from_args(args: argparse.Namespace) -> dict | None:
 
 
 def cmd_index(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
-    pipeline.index()
-    print("Index built successfully.")
+    pipeline.index(shard=args.shard)
+    print(f"Index built successfully{f' for shard {args.shard}' if args.shard else ''}.")
+    if args.precompute:
+        cmd_precompute(args, pipeline)
 
 
-def cmd_ask(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+def cmd_precompute(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
     if not MISTRAL_API_KEY:
         print("Error: MISTRAL_API_KEY is not set.", file=sys.stderr)
         sys.exit(1)
-    where = _where_from_args(args)
-    answer, results = pipeline.ask(args.query, top_k=args.top_k, where=where)
+    stored = pipeline.precompute(
+        top=getattr(args, "top", None),
+        min_count=getattr(args, "min_count", None),
+        window_days=getattr(args, "window_days", None),
+    )
+    print(f"Precomputed {stored} answers.")
+
+
+def _print_answer(answer: str, results: list) -> None:
     print("Retrieved sources:", len(results))
     for i, r in enumerate(results[:3], 1):
         print(f"  {i}. {r.source_file} | {r.subject}")
     print("\nAnswer:", answer)
 
 
+def cmd_ask(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+    where = _where_from_args(args)
+    if not MISTRAL_API_KEY:
+        # Structured questions are answered from the metadata index without Mistral
+        routed = None if where or args.shard else pipeline.route(args.query)
+        if routed is None:
+            print("Error: MISTRAL_API_KEY is not set.", file=sys.stderr)
+            sys.exit(1)
+        _print_answer(*routed)
+        return
+    response = pipeline.ask(
+        args.query,
+        top_k=args.top_k,
+        where=where,
+        hnsw_ef=args.hnsw_ef,
+        exact=args.exact,
+        hierarchical=False if args.flat else None,
+        deadline_ms=args.deadline_ms,
+        shards=args.shard,
+    )
+    record_stages(response.timings_ms)
+    _print_answer(response.answer, response.results)
+    if response.degraded:
+        print("\nDegraded to meet the deadline:", ", ".join(response.degradations))
+    if "answer_store" in response.timings_ms:
+        print("\n(precomputed answer; re-run precompute after re-indexing to refresh)")
+    elif "semantic_cache" in response.timings_ms:
+        print("\n(cached answer to a similar question)")
+
+
+def cmd_chunk_report(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+    from rag.chunk_report import compare_strategies, format_report
+    from rag.ingest import load_all_emails
+
+    emails = load_all_emails(pipeline.emails_dir)
+    if args.limit:
+        emails = emails[: args.limit]
+    if not emails:
+        print(f"No emails loaded from {pipeline.emails_dir}", file=sys.stderr)
+        sys.exit(1)
+    print(format_report(compare_strategies(emails, args.strategy, embed=not args.no_embed)))
+
+
+def cmd_snapshot(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+    from rag.snapshot import export_snapshot, import_snapshot
+
+    collection = args.collection or pipeline.collection_name
+    if args.snapshot_command == "export":
+        manifest = export_snapshot(
+            Path(args.dir),
+            collection,
+            dtype=args.dtype,
+            compress=args.compress,
+        )
+        print(f"Exported {manifest['count']} points ({manifest['dtype']}) to {args.dir}")
+        return
+    client = None
+    parallel = args.parallel
+    if args.local:
+        from rag.store import PATH_PREFIX, get_qdrant_client
+
+        # The shared, locked embedded client: email-index upload threads use it too
+        client = get_qdrant_client(f"{PATH_PREFIX}{args.local}")
+        parallel = 1  # embedded storage is single-process
+    count = import_snapshot(
+        Path(args.dir),
+        collection,
+        client=client,
+        parallel=parallel,
+        force=args.force,
+    )
+    print(f"Imported {count} points from {args.dir}")
+
+
+def cmd_loadtest(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+    from rag.loadtest import DEFAULT_QUESTIONS, run_load
+
+    if not MISTRAL_API_KEY:
+        print("Error: MISTRAL_API_KEY is not set (any value works with MISTRAL_SERVER_URL).", file=sys.stderr)
+        sys.exit(1)
+    questions = list(DEFAULT_QUESTIONS)
+    if args.questions:
+        questions = [q.strip() for q in Path(args.questions).read_text(encoding="utf-8").splitlines() if q.strip()]
+    if args.index:
+        pipeline.index()
+    report = run_load(
+        lambda q: pipeline.ask(q, top_k=args.top_k, deadline_ms=args.deadline_ms),
+        questions,
+        concurrency=args.concurrency,
+        requests=args.requests,
+        duration_s=args.duration,
+        warmup=args.warmup,
+    )
+    print(report.summary())
+    if pipeline.semantic_cache is not None:
+        print(pipeline.semantic_cache.stats.summary())
+
+
 def cmd_eval(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
     """Run e2e evaluation (imports tests)."""
     import pytest
@@ -74,35 +209,276 @@ def cmd_eval(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
     sys.exit(pytest.main(pytest_args))
 
 
+def _grid(value: str, parse: type = int) -> list:
+    """Comma-separated sweep values; "default" stands for None (the configured default)."""
+    return [None if v.strip() == "default" else parse(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def _switch(value: str) -> bool:
+    if value.lower() in ("on", "true", "1", "yes"):
+        return True
+    if value.lower() in ("off", "false", "0", "no"):
+        return False
+    raise argparse.ArgumentTypeError(f"Expected on or off, got {value!r}")
+
+
+def cmd_sweep(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+    from rag.evaluation import (
+        corpus_queries,
+        fastest_within,
+        format_results,
+        index_grid,
+        load_queries,
+        pareto_front,
+        search_grid,
+        sweep,
+        synthetic_corpus,
+    )
+    from rag.ingest import load_all_emails
+
+    if args.synthetic:
+        emails, queries = synthetic_corpus(args.synthetic, seed=args.seed)
+    else:
+        emails = load_all_emails(pipeline.emails_dir)
+        queries = corpus_queries(emails)
+    if args.queries:
+        queries = load_queries(Path(args.queries))
+    if args.max_queries:
+        queries = queries[: args.max_queries]
+    results = sweep(
+        emails,
+        queries,
+        index_grid(
+            _grid(args.sweep_chunking, str),
+            args.sweep_profiles.split(",") if args.sweep_profiles else [None],
+            _grid(args.compact_dim),
+        ),
+        search_grid(
+            _grid(args.top_k),
+            _grid(args.hnsw_ef),
+            _grid(args.exact, _switch),
+            _grid(args.hierarchical, _switch),
+        ),
+        repeat=args.repeat,
+        keep=args.keep,
+    )
+    front = pareto_front(results)
+    print(f"{len(queries)} labelled queries over {len(emails)} emails; * = Pareto frontier")
+    print(format_results(results, front))
+    if args.json:
+        Path(args.json).write_text(
+            json.dumps(
+                {"results": [r.to_dict() for r in results], "frontier": [r.label for r in front]},
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"Wrote {args.json}")
+    if args.min_recall is not None:
+        best = fastest_within(results, args.min_recall)
+        if best is None:
+            print(f"No configuration reaches recall@k {args.min_recall}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Fastest with recall@k >= {args.min_recall}: {best.label} (p99 {best.p99_ms:.2f} ms)")
+
+
+def run_command(args: argparse.Namespace, pipeline: RAGPipeline) -> None:
+    if args.command == "index":
+        cmd_index(args, pipeline)
+    elif args.command == "ask":
+        cmd_ask(args, pipeline)
+    elif args.command == "precompute":
+        cmd_precompute(args, pipeline)
+    elif args.command == "chunk-report":
+        cmd_chunk_report(args, pipeline)
+    elif args.command == "snapshot":
+        cmd_snapshot(args, pipeline)
+    elif args.command == "loadtest":
+        cmd_loadtest(args, pipeline)
+    elif args.command == "eval":
+        cmd_eval(args, pipeline)
+    elif args.command == "sweep":
+        cmd_sweep(args, pipeline)
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Mini RAG: index emails, ask questions.")
     sub = parser.add_subparsers(dest="command", required=True)
 
     # index
-    sub.add_parser("index", help="Build Qdrant index from emails/")
+    index_p = sub.add_parser("index", help="Build Qdrant index from emails/")
+    index_p.add_argument(
+        "--dedup",
+        action="store_true",
+        default=None,
+        help="Collapse near-duplicate paragraphs into one stored vector (MinHash/LSH)",
+    )
+    index_p.add_argument(
+        "--collection-profile",
+        choices=sorted(COLLECTION_PROFILES),
+        default=None,
+        help="Qdrant HNSW/segment/on-disk preset (default: QDRANT_COLLECTION_PROFILE)",
+    )
+    index_p.add_argument("--shard", type=str, default=None, help="Build only this shard (default: every shard)")
+    index_p.add_argument(
+        "--chunking",
+        choices=CHUNK_STRATEGIES,
+        default=None,
+        help="Chunking strategy (default: CHUNK_STRATEGY); compare them with chunk-report",
+    )
+    index_p.add_argument(
+        "--precompute", action="store_true", help="Afterwards, re-answer the frequent logged questions"
+    )
+
+    index_p.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(PROFILE_DIR),
+        default=None,
+        metavar="DIR",
+        help="Write a sampled CPU profile (collapsed stacks), memory peak and stage times to DIR",
+    )
 
     # ask
     ask_p = sub.add_parser("ask", help="Ask a question (requires index and MISTRAL_API_KEY)")
     ask_p.add_argument("query", type=str, help="Your question")
-    ask_p.add_argument("--top-k", type=int, default=5, help="Number of chunks to retrieve")
+    ask_p.add_argument("--top-k", type=int, default=None, help="Number of chunks to retrieve (default: TOP_K)")
     ask_p.add_argument("--subject", type=str, help="Filter by subject (exact match)")
     ask_p.add_argument("--from", dest="from_", type=str, help="Filter by sender (exact match)")
     ask_p.add_argument("--to", type=str, help="Filter by receiver (exact match)")
+    ask_p.add_argument("--since", type=str, help="Only emails sent on/after this ISO date")
+    ask_p.add_argument("--until", type=str, help="Only emails sent before this ISO date")
+    ask_p.add_argument(
+        "--where",
+        type=str,
+        help='JSON filter, e.g. \'{"from": {"$in": ["A <a@x.io>", "B <b@x.io>"]}, "subject": {"$prefix": "Budget"}}\'',
+    )
+    ask_p.add_argument("--hnsw-ef", type=int, default=None, help="HNSW search breadth (higher: more accurate)")
+    ask_p.add_argument(
+        "--exact", action="store_true", default=None, help="Exact (brute-force) search instead of HNSW"
+    )
+    ask_p.add_argument(
+        "--flat", action="store_true", help="Search all paragraphs (skip the email-level candidate stage)"
+    )
+    ask_p.add_argument(
+        "--deadline-ms",
+        type=float,
+        default=None,
+        help="Answer within this many ms, degrading if needed (default: ASK_DEADLINE_MS; 0 = none)",
+    )
+    ask_p.add_argument(
+        "--shard", action="append", default=None, help="Search only this shard (repeatable; default: all)"
+    )
+
+    ask_p.add_argument(
+        "--profile",
+        nargs="?",
+        const=str(PROFILE_DIR),
+        default=None,
+        metavar="DIR",
+        help="Write a sampled CPU profile (collapsed stacks), memory peak and stage times to DIR",
+    )
+
+    # precompute
+    pre_p = sub.add_parser("precompute", help="Answer the most frequent logged questions ahead of time")
+    pre_p.add_argument("--top", type=int, default=None, help="How many questions (default: PRECOMPUTE_TOP)")
+    pre_p.add_argument(
+        "--min-count", type=int, default=None, help="Times asked to qualify (default: PRECOMPUTE_MIN_COUNT)"
+    )
+    pre_p.add_argument(
+        "--window-days", type=float, default=None, help="Log window in days (default: PRECOMPUTE_WINDOW_DAYS)"
+    )
+
+    # chunk-report
+    chunk_p = sub.add_parser("chunk-report", help="Compare chunking strategies on the emails (no Qdrant)")
+    chunk_p.add_argument(
+        "--strategy", action="append", choices=CHUNK_STRATEGIES, default=None, help="Repeatable (default: all)"
+    )
+    chunk_p.add_argument("--limit", type=int, default=None, help="Only the first N emails")
+    chunk_p.add_argument("--no-embed", action="store_true", help="Skip embedding (no embed time)")
+
+    # snapshot
+    snap_p = sub.add_parser("snapshot", help="Export / import index vectors and payloads")
+    snap_sub = snap_p.add_subparsers(dest="snapshot_command", required=True)
+    export_p = snap_sub.add_parser("export", help="Write collection to a snapshot directory")
+    export_p.add_argument("dir", type=str, help="Output directory")
+    export_p.add_argument("--collection", type=str, help="Collection (default: QDRANT_COLLECTION_NAME)")
+    export_p.add_argument(
+        "--dtype",
+        choices=("float32", "float16", "int8"),
+        default="float32",
+        help="Stored vector precision (int8 uses per-vector scales)",
+    )
+    export_p.add_argument("--compress", action="store_true", help="gzip vectors and payloads")
+    import_p = snap_sub.add_parser("import", help="Load a snapshot directory into Qdrant")
+    import_p.add_argument("dir", type=str, help="Snapshot directory")
+    import_p.add_argument("--collection", type=str, help="Target collection (default: from manifest)")
+    import_p.add_argument("--parallel", type=int, default=None, help="Upload processes")
+    import_p.add_argument("--local", type=str, help="Load into embedded Qdrant storage at this path")
+    import_p.add_argument("--force", action="store_true", help="Import even if EMBEDDING_MODEL differs")
+
+    # loadtest
+    load_p = sub.add_parser("loadtest", help="Concurrent ask traffic; report throughput and latency percentiles")
+    load_p.add_argument("--concurrency", type=int, default=8, help="Parallel askers")
+    load_p.add_argument("--requests", type=int, default=100, help="Total requests")
+    load_p.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    load_p.add_argument("--warmup", type=int, default=2, help="Unmeasured requests sent first")
+    load_p.add_argument("--questions", type=str, help="File with one question per line (default: built-in set)")
+    load_p.add_argument("--top-k", type=int, default=None, help="Number of chunks to retrieve (default: TOP_K)")
+    load_p.add_argument("--deadline-ms", type=float, default=None, help="Per-request deadline (see ask)")
+    load_p.add_argument(
+        "--index", action="store_true", help="Build the index first (needed with QDRANT_URL=:memory:)"
+    )
 
     # eval
     eval_p = sub.add_parser("eval", help="Run end-to-end quality tests")
     eval_p.add_argument("--coverage", action="store_true", help="Report coverage")
 
+    # sweep
+    sweep_p = sub.add_parser(
+        "sweep", help="Retrieval quality vs latency and memory over configuration grids (labelled queries)"
+    )
+    sweep_p.add_argument("--top-k", default="3,5,10", help="Comma-separated top-k values")
+    sweep_p.add_argument("--hnsw-ef", default="default", help="Comma-separated search ef values (default = Qdrant's)")
+    sweep_p.add_argument("--exact", default="off", help="on, off or off,on: exact search instead of HNSW")
+    sweep_p.add_argument("--hierarchical", default="on,off", help="on, off or on,off: two-stage email-first search")
+    sweep_p.add_argument("--compact-dim", default="0", help="Comma-separated compact vector sizes (0 = full only)")
+    sweep_p.add_argument(
+        "--collection-profile",
+        dest="sweep_profiles",
+        default=None,
+        help="Comma-separated collection profiles (default: QDRANT_COLLECTION_PROFILE)",
+    )
+    sweep_p.add_argument(
+        "--chunking",
+        dest="sweep_chunking",
+        default="default",
+        help="Comma-separated chunking strategies (default: CHUNK_STRATEGY)",
+    )
+    sweep_p.add_argument("--synthetic", type=int, default=None, help="Use N synthetic emails instead of EMAILS_DIR")
+    sweep_p.add_argument("--seed", type=int, default=0, help="Seed of the synthetic corpus")
+    sweep_p.add_argument("--queries", type=str, help='Labelled queries JSONL: {"query": ..., "relevant": [files]}')
+    sweep_p.add_argument("--max-queries", type=int, default=None, help="Only the first N labelled queries")
+    sweep_p.add_argument("--repeat", type=int, default=3, help="Timed passes over the queries per configuration")
+    sweep_p.add_argument("--json", type=str, default=None, help="Also write every result and the frontier here")
+    sweep_p.add_argument(
+        "--min-recall", type=float, default=None, help="Report the fastest config reaching this recall@k; fail if none"
+    )
+    sweep_p.add_argument("--keep", action="store_true", help="Keep the evaluation collections afterwards")
+
     args = parser.parse_args()
-    pipeline = RAGPipeline()
+    pipeline = RAGPipeline(
+        dedup=getattr(args, "dedup", None),
+        collection_profile=getattr(args, "collection_profile", None),
+        chunking=getattr(args, "chunking", None),
+    )
 
     try:
-        if args.command == "index":
-            cmd_index(args, pipeline)
-        elif args.command == "ask":
-            cmd_ask(args, pipeline)
-        elif args.command == "eval":
-            cmd_eval(args, pipeline)
+        if getattr(args, "profile", None):
+            with profiled(args.command, Path(args.profile)):
+                run_command(args, pipeline)
+        else:
+            run_command(args, pipeline)
         return 0
     except Exception as e:
         logger.exception("Command failed: %s", e)
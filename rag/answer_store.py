@@ -0,0 +1,119 @@
+"""Persistent answer store (SQLite): precomputed answers to frequent questions, checked by ask before any work."""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from rag.config import ANSWER_STORE_PATH
+from rag.models import RetrieveResult
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    collection TEXT NOT NULL,
+    question TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    results TEXT NOT NULL,
+    created REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (collection, question, scope)
+)
+"""
+
+
+def _result_to_dict(result: RetrieveResult) -> dict[str, Any]:
+    return {
+        "text": result.text,
+        "metadata": result.metadata,
+        "distance": result.distance,
+        "point_id": result.point_id,
+    }
+
+
+class AnswerStore:
+    """
+    Answers keyed by (collection, normalized question, scope key) with their sources.
+    One connection, serialized by a lock; a store whose file does not exist yet answers
+    every lookup with None without creating it, so a fresh install pays nothing.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or ANSWER_STORE_PATH
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connect(self, create: bool) -> sqlite3.Connection | None:
+        if self._conn is None:
+            if not create and not self.path.exists():
+                return None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, collection: str, question: str, scope: str = "") -> tuple[str, list[RetrieveResult]] | None:
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT answer, results FROM answers WHERE collection = ? AND question = ? AND scope = ?",
+                (collection, question, scope),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE answers SET hits = hits + 1 WHERE collection = ? AND question = ? AND scope = ?",
+                (collection, question, scope),
+            )
+        return row[0], [RetrieveResult(**r) for r in json.loads(row[1])]
+
+    def put(
+        self,
+        collection: str,
+        question: str,
+        scope: str,
+        answer: str,
+        results: list[RetrieveResult],
+    ) -> None:
+        payload = json.dumps([_result_to_dict(r) for r in results], ensure_ascii=False, default=str)
+        with self._lock:
+            self._connect(create=True).execute(
+                "INSERT OR REPLACE INTO answers (collection, question, scope, answer, results, created, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (collection, question, scope, answer, payload, time.time()),
+            )
+
+    def clear(self, collection: str) -> int:
+        """Drop a collection's answers (its index changed); returns how many were dropped."""
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return 0
+            dropped = conn.execute("DELETE FROM answers WHERE collection = ?", (collection,)).rowcount
+        if dropped:
+            logger.info("Answer store: dropped %d answers for %s", dropped, collection)
+        return dropped
+
+    def count(self, collection: str | None = None) -> int:
+        with self._lock:
+            conn = self._connect(create=False)
+            if conn is None:
+                return 0
+            if collection is None:
+                return conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            return conn.execute("SELECT COUNT(*) FROM answers WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
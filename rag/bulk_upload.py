@@ -0,0 +1,214 @@
+"""Parallel, adaptive Qdrant bulk upload: concurrent wait=False upserts, backpressure, retries, final barrier."""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from rag.config import (
+    QDRANT_TIMEOUT,
+    QDRANT_UPLOAD_MAX_BATCH_BYTES,
+    QDRANT_UPLOAD_MAX_BATCH_SIZE,
+    QDRANT_UPLOAD_MAX_RETRIES,
+    QDRANT_UPLOAD_MIN_BATCH_SIZE,
+    QDRANT_UPLOAD_TARGET_LATENCY_MS,
+    QDRANT_UPLOAD_WORKERS,
+    QDRANT_UPSERT_BATCH_SIZE,
+)
+from rag.llm import retryable
+
+logger = logging.getLogger(__name__)
+
+_BACKOFF_BASE_S = 0.2
+_BACKOFF_MAX_S = 10.0
+_BARRIER_POLL_S = 0.2
+_BYTES_PER_FLOAT = 10  # JSON-encoded float, roughly
+
+
+def _point_bytes(point: models.PointStruct) -> int:
+    """Approximate request bytes for one point (vectors as JSON floats + payload strings)."""
+    vectors = point.vector.values() if isinstance(point.vector, dict) else [point.vector]
+    floats = sum(len(v) for v in vectors if isinstance(v, list))
+    payload = point.payload or {}
+    return _BYTES_PER_FLOAT * floats + sum(len(str(v)) for v in payload.values())
+
+
+def _retryable(error: Exception) -> bool:
+    """rag.llm.retryable, looking through the exception qdrant-client wraps transport errors in."""
+    source = getattr(error, "source", None)  # ResponseHandlingException
+    return retryable(source if isinstance(source, BaseException) else error)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^attempt)]."""
+    return random.uniform(0.0, min(_BACKOFF_MAX_S, _BACKOFF_BASE_S * (2**attempt)))
+
+
+class BulkUploader:
+    """
+    Buffer points and upsert them from `workers` threads with wait=False.
+
+    At most 2 * workers batches are in flight; add() blocks beyond that (backpressure), so
+    the producer (embedding) slows to what Qdrant absorbs. Batch size adapts per response:
+    it grows by 25% while batches finish under the target latency and halves above it,
+    capped by count and approximate request bytes. Failed batches retry with jittered
+    backoff. flush() waits for all batches, then for the points to be visible (barrier).
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        *,
+        workers: int | None = None,
+        batch_size: int | None = None,
+        min_batch_size: int | None = None,
+        max_batch_size: int | None = None,
+        max_batch_bytes: int | None = None,
+        target_latency_ms: float | None = None,
+        max_retries: int | None = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.workers = max(1, workers or QDRANT_UPLOAD_WORKERS)
+        self.min_batch_size = min_batch_size or QDRANT_UPLOAD_MIN_BATCH_SIZE
+        self.max_batch_size = max_batch_size or QDRANT_UPLOAD_MAX_BATCH_SIZE
+        self.max_batch_bytes = max_batch_bytes or QDRANT_UPLOAD_MAX_BATCH_BYTES
+        self.target_latency_s = (target_latency_ms or QDRANT_UPLOAD_TARGET_LATENCY_MS) / 1000.0
+        self.max_retries = QDRANT_UPLOAD_MAX_RETRIES if max_retries is None else max_retries
+        self.batch_size = min(
+            self.max_batch_size, max(self.min_batch_size, batch_size or QDRANT_UPSERT_BATCH_SIZE)
+        )
+
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qdrant-upload")
+        self._slots = threading.BoundedSemaphore(2 * self.workers)
+        self._lock = threading.Lock()
+        self._buffer: list[models.PointStruct] = []
+        self._buffer_bytes = 0
+        self._futures: set[Future] = set()
+        self._error: BaseException | None = None
+        self.submitted = 0
+        self.uploaded = 0
+        self.retries = 0
+        self.batches = 0
+        self._started = time.perf_counter()
+
+    def add(self, points: Iterable[models.PointStruct]) -> None:
+        """Queue points; full batches are dispatched immediately (blocks when too many are in flight)."""
+        for point in points:
+            self._buffer.append(point)
+            self._buffer_bytes += _point_bytes(point)
+            if len(self._buffer) >= self.batch_size or self._buffer_bytes >= self.max_batch_bytes:
+                self._dispatch()
+
+    def _dispatch(self) -> None:
+        if not self._buffer:
+            return
+        self._raise_if_failed()
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        self._slots.acquire()
+        future = self._pool.submit(self._send, batch)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._on_done)
+        self.submitted += len(batch)
+
+    def _on_done(self, future: Future) -> None:
+        self._slots.release()
+        with self._lock:
+            self._futures.discard(future)
+            error = future.exception()
+            if error is not None and self._error is None:
+                self._error = error
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"Bulk upload to {self.collection_name} failed") from self._error
+
+    def _send(self, batch: list[models.PointStruct]) -> int:
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                self.client.upsert(collection_name=self.collection_name, points=batch, wait=False)
+            except Exception as e:  # noqa: BLE001 - classified below
+                if attempt >= self.max_retries or not _retryable(e):
+                    logger.error("Upsert of %d points failed after %d attempt(s): %s", len(batch), attempt + 1, e)
+                    raise
+                delay = backoff_delay(attempt)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                    # Errors usually mean overload: back off the batch size too
+                    self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+                logger.warning("Upsert failed (%s); retry %d in %.2fs", e, attempt, delay)
+                time.sleep(delay)
+                continue
+            self._adapt(time.perf_counter() - started)
+            with self._lock:
+                self.uploaded += len(batch)
+                self.batches += 1
+            return len(batch)
+
+    def _adapt(self, latency_s: float) -> None:
+        """Grow the batch by 25% under the target latency, halve it above."""
+        with self._lock:
+            if latency_s > self.target_latency_s:
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            else:
+                self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+
+    def flush(self, *, expected_count: int | None = None, timeout: float | None = None) -> int:
+        """
+        Send the remaining buffer, wait for every batch, then block until the collection
+        reports `expected_count` points (default: all points uploaded by this uploader).
+        Returns the number of points uploaded.
+        """
+        self._dispatch()
+        while True:
+            with self._lock:
+                pending = list(self._futures)
+            if not pending:
+                break
+            for future in pending:
+                future.exception()  # wait without raising; errors are collected in _on_done
+        self._pool.shutdown(wait=True)
+        self._raise_if_failed()
+        self.wait_until_visible(self.uploaded if expected_count is None else expected_count, timeout=timeout)
+        elapsed = time.perf_counter() - self._started
+        logger.info(
+            "Uploaded %d points to %s in %d batches (%d retries, final batch size %d) in %.1fs (%.0f points/s)",
+            self.uploaded,
+            self.collection_name,
+            self.batches,
+            self.retries,
+            self.batch_size,
+            elapsed,
+            self.uploaded / elapsed if elapsed > 0 else 0.0,
+        )
+        return self.uploaded
+
+    def wait_until_visible(self, expected_count: int, *, timeout: float | None = None) -> None:
+        """Consistency barrier for wait=False upserts: poll an exact count until it is reached."""
+        deadline = time.monotonic() + (QDRANT_TIMEOUT if timeout is None else timeout)
+        while True:
+            count = self.client.count(self.collection_name, exact=True).count
+            if count >= expected_count:
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"{self.collection_name} shows {count} of {expected_count} points after upload"
+                )
+            time.sleep(_BARRIER_POLL_S)
+
+    def __enter__(self) -> "BulkUploader":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,92 @@
+"""Chunking strategy report: chunk count, token length distribution, truncation and embed time per strategy."""
+
+import logging
+import time
+from dataclasses import dataclass
+
+from rag.chunking import CHUNK_STRATEGIES, chunk_batch, resolve_strategy, token_spans
+from rag.config import INDEX_EMBED_BATCH_SIZE
+from rag.models import ParsedEmail
+from rag.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class StrategyReport:
+    """What one chunking strategy makes of a corpus. Token counts include the model's special tokens."""
+
+    strategy: str
+    emails: int
+    chunks: int
+    chunk_ms: float
+    tokens_p50: float
+    tokens_p90: float
+    tokens_max: int
+    total_tokens: int
+    truncated: int | None  # chunks longer than the model reads (None: no limit)
+    embed_ms: float | None = None  # None when not embedded
+
+    @property
+    def chunks_per_email(self) -> float:
+        return self.chunks / self.emails if self.emails else 0.0
+
+
+def report_strategy(emails: list[ParsedEmail], strategy: str, *, embed: bool = True) -> StrategyReport:
+    """Chunk `emails` with one strategy, measure the chunks' token lengths and (optionally) embed them."""
+    name = resolve_strategy(strategy)
+    started = time.perf_counter()
+    batch = chunk_batch(emails, name)
+    chunk_ms = (time.perf_counter() - started) * 1000.0
+    texts = batch.texts()
+    spans, max_length = token_spans(texts)
+    special = 2 if max_length else 0
+    lengths = sorted(len(s) + special for s in spans)
+    embed_ms = None
+    if embed and texts:
+        from rag.embedding import embed_texts
+
+        started = time.perf_counter()
+        for first in range(0, len(texts), INDEX_EMBED_BATCH_SIZE):
+            embed_texts(texts[first : first + INDEX_EMBED_BATCH_SIZE])
+        embed_ms = (time.perf_counter() - started) * 1000.0
+    return StrategyReport(
+        strategy=name,
+        emails=len(emails),
+        chunks=len(batch),
+        chunk_ms=chunk_ms,
+        tokens_p50=percentile(lengths, 50),
+        tokens_p90=percentile(lengths, 90),
+        tokens_max=lengths[-1] if lengths else 0,
+        total_tokens=sum(lengths),
+        truncated=sum(n > max_length for n in lengths) if max_length else None,
+        embed_ms=embed_ms,
+    )
+
+
+def compare_strategies(
+    emails: list[ParsedEmail],
+    strategies: list[str] | None = None,
+    *,
+    embed: bool = True,
+) -> list[StrategyReport]:
+    """A report per strategy (default: all of CHUNK_STRATEGIES), over the same emails."""
+    return [report_strategy(emails, s, embed=embed) for s in strategies or CHUNK_STRATEGIES]
+
+
+def format_report(reports: list[StrategyReport]) -> str:
+    """Fixed-width table, one row per strategy."""
+    header = (
+        f"{'strategy':<10} {'chunks':>7} {'per email':>9} {'tokens p50':>10} {'p90':>6} {'max':>6} "
+        f"{'total':>9} {'truncated':>9} {'chunk ms':>9} {'embed ms':>9} {'chunks/s':>9}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        truncated = "-" if r.truncated is None else str(r.truncated)
+        embed_ms = "-" if r.embed_ms is None else f"{r.embed_ms:.0f}"
+        rate = "-" if not r.embed_ms else f"{r.chunks / (r.embed_ms / 1000.0):.0f}"
+        lines.append(
+            f"{r.strategy:<10} {r.chunks:>7} {r.chunks_per_email:>9.2f} {r.tokens_p50:>10.0f} {r.tokens_p90:>6.0f} "
+            f"{r.tokens_max:>6} {r.total_tokens:>9} {truncated:>9} {r.chunk_ms:>9.1f} {embed_ms:>9} {rate:>9}"
+        )
+    return "\n".join(lines)
@@ -1,10 +1,137 @@
-"""Chunking strategy: paragraph-based with email context and metadata."""
+"""Chunking strategies (paragraph, token window, sentence merge, whole email) with email context and metadata."""
 
 import logging
-from rag.models import Chunk, ParsedEmail
+import re
+from itertools import islice
+from typing import Callable, Iterable
+
+from rag.config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_STRATEGY, CHUNK_TARGET_CHARS
+from rag.models import Chunk, ChunkBatch, ParsedEmail, chunk_header
 
 logger = logging.getLogger(__name__)
 
+CHUNK_STRATEGIES = ("paragraph", "window", "sentence", "email")
+DEFAULT_WINDOW_TOKENS = 256  # window size when the embedder reads any length (hashing)
+MIN_WINDOW_TOKENS = 16  # body tokens per window even when the header alone nearly fills the limit
+TOKENIZE_BATCH_SIZE = 256  # texts per tokenizer call
+CHUNK_GROUP_EMAILS = 1024  # emails split per pass by chunk_batch
+
+# A sentence ends at . ! or ? followed by whitespace, or at a blank line
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# Token spans when there is no model tokenizer: words and single punctuation marks
+_WORD_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def split_paragraphs(body: str) -> list[str]:
+    """Paragraphs of an email body (blank-line separated); a body without blank lines is one paragraph."""
+    # Normalize: split by blank lines, keep non-empty blocks
+    raw_paragraphs = [p.strip() for p in body.split("\n\n") if p.strip()]
+    if not raw_paragraphs:
+        # Single block or no body: treat whole body as one chunk
+        raw_paragraphs = [body] if body.strip() else []
+    return raw_paragraphs
+
+
+def split_sentences(body: str, target_chars: int | None = None) -> list[str]:
+    """
+    Sentences merged in order into chunks of up to `target_chars` (CHUNK_TARGET_CHARS);
+    a longer sentence is a chunk of its own.
+    """
+    target = target_chars or CHUNK_TARGET_CHARS
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for sentence in _SENTENCE_BREAK.split(body):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if current and size + 1 + len(sentence) > target:
+            chunks.append(" ".join(current))
+            current, size = [], -1
+        current.append(sentence)
+        size += 1 + len(sentence)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def split_email(body: str) -> list[str]:
+    """The whole body as one chunk."""
+    body = body.strip()
+    return [body] if body else []
+
+
+def token_spans(texts: list[str]) -> tuple[list[list[tuple[int, int]]], int]:
+    """
+    Character spans of each text's tokens, from the embedding model's (fast) tokenizer in
+    batches of TOKENIZE_BATCH_SIZE, or word / punctuation spans if it has none; plus the
+    model's max sequence length (0: no limit).
+    """
+    from rag.embedding import get_tokenizer
+
+    tokenizer, max_length = get_tokenizer()
+    if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+        return [[m.span() for m in _WORD_TOKEN.finditer(t)] for t in texts], max_length
+    spans: list[list[tuple[int, int]]] = []
+    for start in range(0, len(texts), TOKENIZE_BATCH_SIZE):
+        encoded = tokenizer(
+            texts[start : start + TOKENIZE_BATCH_SIZE],
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+        )
+        spans.extend([(int(a), int(b)) for a, b in offsets] for offsets in encoded["offset_mapping"])
+    return spans, max_length
+
+
+def split_windows(
+    bodies: list[str],
+    headers: list[str],
+    *,
+    max_tokens: int | None = None,
+    overlap: int | None = None,
+) -> list[list[str]]:
+    """
+    Each body cut into windows of consecutive tokens that fit, with its header, in
+    `max_tokens` (CHUNK_MAX_TOKENS, else the model's max sequence length), adjacent windows
+    sharing `overlap` (CHUNK_OVERLAP_TOKENS) tokens. Windows are cut at token boundaries of
+    the model's own tokenizer, so nothing is truncated when embedded.
+    """
+    spans, model_max = token_spans(bodies + headers)
+    body_spans, header_spans = spans[: len(bodies)], spans[len(bodies) :]
+    limit = max_tokens or CHUNK_MAX_TOKENS or model_max or DEFAULT_WINDOW_TOKENS
+    special = 2 if model_max else 0  # the model adds a start and an end token
+    shared = CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    out: list[list[str]] = []
+    for body, tokens, header in zip(bodies, body_spans, header_spans):
+        size = max(MIN_WINDOW_TOKENS, limit - special - len(header))
+        if len(tokens) <= size:
+            out.append(split_email(body))
+            continue
+        step = max(1, size - min(shared, size - 1))
+        windows = []
+        for first in range(0, len(tokens), step):
+            first = min(first, len(tokens) - size)  # the last window is full too, overlapping more
+            windows.append(body[tokens[first][0] : tokens[first + size - 1][1]])
+            if first + size == len(tokens):
+                break
+        out.append(windows)
+    return out
+
+
+_SPLITTERS: dict[str, Callable[[str], list[str]]] = {
+    "paragraph": split_paragraphs,
+    "sentence": split_sentences,
+    "email": split_email,
+}
+
+
+def resolve_strategy(strategy: str | None = None) -> str:
+    """A chunking strategy name (default CHUNK_STRATEGY); unknown names raise."""
+    name = (strategy or CHUNK_STRATEGY).strip().lower()
+    if name not in CHUNK_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {name!r}; expected one of {', '.join(CHUNK_STRATEGIES)}")
+    return name
+
 
 def chunk_email(email: ParsedEmail) -> list[Chunk]:
     """
@@ -12,14 +139,8 @@ def chunk_email(email: ParsedEmail) -> list[Chunk]:
     and the same metadata for filtering.
     """
     chunks: list[Chunk] = []
-    # Normalize: split by blank lines, keep non-empty blocks
-    raw_paragraphs = [p.strip() for p in email.body.split("\n\n") if p.strip()]
-    if not raw_paragraphs:
-        # Single block or no body: treat whole body as one chunk
-        raw_paragraphs = [email.body] if email.body.strip() else []
-
-    header = f"Subject: {email.subject}\nFrom: {email.from_display()}\nTo: {email.to_display()}\n\n"
-    for i, para in enumerate(raw_paragraphs):
+    header = chunk_header(email.subject, email.from_display(), email.to_display())
+    for i, para in enumerate(split_paragraphs(email.body)):
         chunk_text = header + para
         chunk_id = f"{email.source_file}_{i}"
         chunks.append(
@@ -31,12 +152,38 @@ def chunk_email(email: ParsedEmail) -> list[Chunk]:
                 from_=email.from_display(),
                 to=email.to_display(),
                 paragraph_index=i,
+                date=email.date,
             )
         )
 
     return chunks
 
 
+def chunk_batch(emails: Iterable[ParsedEmail], strategy: str | None = None) -> ChunkBatch:
+    """
+    Chunk all emails into one columnar batch with the given strategy (default CHUNK_STRATEGY).
+    The paragraph strategy gives the same chunks as chunk_emails, in far less memory.
+    Emails are consumed CHUNK_GROUP_EMAILS at a time, so a stream (iter_all_emails) is
+    chunked without keeping its emails: only the batch grows.
+    """
+    name = resolve_strategy(strategy)
+    batch = ChunkBatch()
+    stream = iter(emails)
+    count = 0
+    while group := list(islice(stream, CHUNK_GROUP_EMAILS)):
+        if name == "window":
+            headers = [chunk_header(e.subject, e.from_display(), e.to_display()) for e in group]
+            pieces = split_windows([e.body for e in group], headers)
+        else:
+            split = _SPLITTERS[name]
+            pieces = [split(e.body) for e in group]
+        for email, parts in zip(group, pieces):
+            batch.add_email(email, parts)
+        count += len(group)
+    logger.info("Produced %d chunks from %d emails (%s)", len(batch), count, name)
+    return batch
+
+
 def chunk_emails(emails: list[ParsedEmail]) -> list[Chunk]:
     """Chunk all emails; returns flat list of chunks with metadata."""
     all_chunks: list[Chunk] = []
@@ -1,6 +1,7 @@
 """Configuration from environment and defaults."""
 
 import os
+from dataclasses import dataclass, replace
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -11,22 +12,213 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 # Load .env from project root so MISTRAL_API_KEY, QDRANT_*, etc. are set
 load_dotenv(PROJECT_ROOT / ".env")
 
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    """Boolean env var: 1/true/yes/on (case-insensitive) are true."""
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
 EMAILS_DIR = Path(os.environ.get("EMAILS_DIR", str(PROJECT_ROOT / "emails")))
 
+# Bulk mailbox ingest (mbox / Maildir / .eml)
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(os.cpu_count() or 1)))  # parser processes; 1 = in-process
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "256"))  # messages per worker task
+
 # Qdrant
 QDRANT_URL = os.environ.get("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY = os.environ.get("QDRANT_API_KEY", "")
 QDRANT_COLLECTION_NAME = os.environ.get("QDRANT_COLLECTION_NAME", "email_chunks")
 QDRANT_VECTOR_SIZE = int(os.environ.get("QDRANT_VECTOR_SIZE", "1536"))
 QDRANT_TIMEOUT = int(os.environ.get("QDRANT_TIMEOUT", "120"))  # seconds for large upserts
-QDRANT_UPSERT_BATCH_SIZE = int(os.environ.get("QDRANT_UPSERT_BATCH_SIZE", "50"))
+QDRANT_UPSERT_BATCH_SIZE = int(os.environ.get("QDRANT_UPSERT_BATCH_SIZE", "50"))  # initial batch; adapts
+# Bulk upload: concurrent wait=False upserts with adaptive batch size and retries
+QDRANT_UPLOAD_WORKERS = int(os.environ.get("QDRANT_UPLOAD_WORKERS", "4"))
+QDRANT_UPLOAD_MIN_BATCH_SIZE = int(os.environ.get("QDRANT_UPLOAD_MIN_BATCH_SIZE", "8"))
+QDRANT_UPLOAD_MAX_BATCH_SIZE = int(os.environ.get("QDRANT_UPLOAD_MAX_BATCH_SIZE", "1024"))
+QDRANT_UPLOAD_MAX_BATCH_BYTES = int(os.environ.get("QDRANT_UPLOAD_MAX_BATCH_BYTES", str(8 * 1024 * 1024)))
+QDRANT_UPLOAD_TARGET_LATENCY_MS = float(os.environ.get("QDRANT_UPLOAD_TARGET_LATENCY_MS", "500"))
+QDRANT_UPLOAD_MAX_RETRIES = int(os.environ.get("QDRANT_UPLOAD_MAX_RETRIES", "5"))
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """
+    Qdrant collection tuning applied when an index build creates its collection.
+    None leaves the server default. Thresholds are in KB, as in Qdrant's config.
+    """
+
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    hnsw_on_disk: bool = False
+    full_scan_threshold: int | None = None
+    on_disk_vectors: bool = False
+    on_disk_payload: bool = False
+    default_segment_number: int | None = None
+    max_segment_size: int | None = None
+    memmap_threshold: int | None = None
+    indexing_threshold: int | None = None
+    # Load with HNSW / indexing disabled (m=0, indexing_threshold=0) and enable them after upload
+    defer_indexing: bool = False
+
+
+COLLECTION_PROFILES: dict[str, CollectionProfile] = {
+    "default": CollectionProfile(),
+    # Fast ingest: no graph maintenance while points stream in; one HNSW build at the end
+    "bulk-load": CollectionProfile(defer_indexing=True, default_segment_number=2),
+    # Denser graph, one segment per core, everything in RAM
+    "low-latency": CollectionProfile(
+        hnsw_m=32,
+        hnsw_ef_construct=256,
+        default_segment_number=os.cpu_count() or 2,
+    ),
+    # Vectors, graph and payload memory-mapped from disk; sparser graph
+    "low-memory": CollectionProfile(
+        hnsw_m=8,
+        hnsw_on_disk=True,
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        memmap_threshold=20000,
+    ),
+}
+
+QDRANT_COLLECTION_PROFILE = os.environ.get("QDRANT_COLLECTION_PROFILE", "default")
+QDRANT_INDEXING_TIMEOUT = int(os.environ.get("QDRANT_INDEXING_TIMEOUT", "600"))  # seconds to wait for a green collection
+# Query-time search defaults (per-call arguments to retrieve take precedence)
+QDRANT_HNSW_EF = int(os.environ["QDRANT_HNSW_EF"]) if os.environ.get("QDRANT_HNSW_EF") else None
+QDRANT_EXACT_SEARCH = _env_flag("QDRANT_EXACT_SEARCH")
+
+
+def collection_profile(name: str | None = None) -> CollectionProfile:
+    """
+    Preset by name (default: QDRANT_COLLECTION_PROFILE), with QDRANT_HNSW_M,
+    QDRANT_HNSW_EF_CONSTRUCT and QDRANT_ON_DISK env overrides applied on top.
+    """
+    key = name or QDRANT_COLLECTION_PROFILE
+    if key not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown collection profile {key!r}; expected one of {', '.join(COLLECTION_PROFILES)}")
+    profile = COLLECTION_PROFILES[key]
+    overrides: dict[str, object] = {}
+    if os.environ.get("QDRANT_HNSW_M"):
+        overrides["hnsw_m"] = int(os.environ["QDRANT_HNSW_M"])
+    if os.environ.get("QDRANT_HNSW_EF_CONSTRUCT"):
+        overrides["hnsw_ef_construct"] = int(os.environ["QDRANT_HNSW_EF_CONSTRUCT"])
+    if os.environ.get("QDRANT_ON_DISK"):
+        on_disk = _env_flag("QDRANT_ON_DISK")
+        overrides.update(on_disk_vectors=on_disk, on_disk_payload=on_disk, hnsw_on_disk=on_disk)
+    return replace(profile, **overrides) if overrides else profile
+
+
+# Chunking: "paragraph" (blank lines), "window" (token windows with overlap), "sentence" (sentences merged
+# up to a target length) or "email" (one chunk per email); cli.py index --chunking overrides per index
+CHUNK_STRATEGY = os.environ.get("CHUNK_STRATEGY", "paragraph").lower()
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "0"))  # window size incl. header; 0 = model's max length
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "32"))  # tokens shared by adjacent windows
+CHUNK_TARGET_CHARS = int(os.environ.get("CHUNK_TARGET_CHARS", "1000"))  # sentence strategy: merge up to this
+
+# Blue/green index builds: write a new versioned collection, warm it up, swap the alias
+INDEX_BLUE_GREEN = _env_flag("INDEX_BLUE_GREEN", True)
+INDEX_RETAIN_VERSIONS = int(os.environ.get("INDEX_RETAIN_VERSIONS", "2"))  # newest versions kept (live included)
+INDEX_EMBED_BATCH_SIZE = int(os.environ.get("INDEX_EMBED_BATCH_SIZE", "512"))  # chunks embedded per step while uploads run
+INDEX_WARMUP_QUERIES = [q.strip() for q in os.environ.get("INDEX_WARMUP_QUERIES", "").split("|") if q.strip()]
+# Compact first-pass vectors: 0 = off; else a PCA / truncation to this many dims, rescored with the full vector
+INDEX_COMPACT_DIM = int(os.environ.get("INDEX_COMPACT_DIM", "0"))
+INDEX_COMPACT_METHOD = os.environ.get("INDEX_COMPACT_METHOD", "pca").lower()  # "pca" or "truncate"
+INDEX_COMPACT_SAMPLE = int(os.environ.get("INDEX_COMPACT_SAMPLE", "4096"))  # vectors the PCA is fitted on
+INDEX_PROJECTION_DIR = Path(os.environ.get("INDEX_PROJECTION_DIR", str(PROJECT_ROOT / ".cache" / "projections")))
+# Email-level index: one vector per email (mean of its chunk vectors) in <collection>_emails
+INDEX_EMAIL_VECTORS = _env_flag("INDEX_EMAIL_VECTORS", True)
+
+# Sharding: one collection per mailbox ("name=path,..."), or per source_file hash bucket of EMAILS_DIR
+SHARDS = os.environ.get("SHARDS", "")
+SHARD_HASH_BUCKETS = int(os.environ.get("SHARD_HASH_BUCKETS", "0"))  # 0 = off; ignored when SHARDS is set
+SHARD_FANOUT_WORKERS = int(os.environ.get("SHARD_FANOUT_WORKERS", "8"))  # shards searched in parallel
+
+# Profiling (cli.py index/ask --profile): sampling CPU profile, tracemalloc, per-stage wall time
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", str(PROJECT_ROOT / ".cache" / "profiles")))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))  # stack sampling period
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "15"))  # rows per table in the summary
+
+# Snapshots (cli.py snapshot export / import)
+SNAPSHOT_BATCH_SIZE = int(os.environ.get("SNAPSHOT_BATCH_SIZE", "512"))  # scroll / upload batch size
+SNAPSHOT_UPLOAD_PARALLEL = int(os.environ.get("SNAPSHOT_UPLOAD_PARALLEL", "4"))  # upload processes
 
 # Embedding
+# A sentence-transformers model, or "hashing" / "hashing-<dim>": offline feature hashing (tests, benchmarks)
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-mpnet-base-v2")
+# Backend: "torch" (sentence-transformers), "onnx" (ONNX Runtime fp32) or "onnx-int8" (dynamic int8 quantization)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "32"))
+# Where ONNX exports (and quantized variants) are cached; exported once per model
+EMBEDDING_CACHE_DIR = Path(os.environ.get("EMBEDDING_CACHE_DIR", str(PROJECT_ROOT / ".cache" / "embeddings")))
+EMBEDDING_NUM_THREADS = int(os.environ.get("EMBEDDING_NUM_THREADS", "0"))  # ONNX intra-op threads; 0 = runtime default
+EMBEDDING_LOCAL_ONLY = _env_flag("EMBEDDING_LOCAL_ONLY")  # never hit the model hub; use cached files only
+EMBEDDING_DRIFT_CHECK = _env_flag("EMBEDDING_DRIFT_CHECK")  # compare non-torch backend to torch at startup
+EMBEDDING_MAX_DRIFT = float(os.environ.get("EMBEDDING_MAX_DRIFT", "0.01"))  # warn above this (1 - cosine)
+
+# Index-time near-duplicate collapse (MinHash/LSH over paragraph shingles)
+DEDUP_ENABLED = _env_flag("DEDUP_ENABLED")
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))  # estimated Jaccard similarity
+DEDUP_NUM_PERM = int(os.environ.get("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.environ.get("DEDUP_BANDS", "16"))  # LSH bands; must divide DEDUP_NUM_PERM
+DEDUP_SHINGLE_SIZE = int(os.environ.get("DEDUP_SHINGLE_SIZE", "3"))  # words per shingle
 
 # Retrieval
 TOP_K = int(os.environ.get("TOP_K", "5"))
+# Two-stage retrieval: pick candidate emails from the email index, then rank their paragraphs
+RETRIEVE_HIERARCHICAL = _env_flag("RETRIEVE_HIERARCHICAL", True)
+RETRIEVE_CANDIDATE_EMAILS = int(os.environ.get("RETRIEVE_CANDIDATE_EMAILS", "20"))
+# Structured questions ("how many emails did X send") answered from the metadata index, no LLM calls
+ROUTER_ENABLED = _env_flag("ROUTER_ENABLED", True)
+ROUTER_MAX_LIST = int(os.environ.get("ROUTER_MAX_LIST", "50"))  # emails listed / returned per routed answer
+METADATA_INDEX_DIR = Path(os.environ.get("METADATA_INDEX_DIR", str(PROJECT_ROOT / ".cache" / "metadata")))
+# Filters: compiled-filter cache size; exact search when a filter is selective (estimated from payload indexes)
+FILTER_CACHE_SIZE = int(os.environ.get("FILTER_CACHE_SIZE", "256"))
+RETRIEVE_AUTO_EXACT = _env_flag("RETRIEVE_AUTO_EXACT", True)
+RETRIEVE_EXACT_SELECTIVITY = float(os.environ.get("RETRIEVE_EXACT_SELECTIVITY", "0.05"))  # matching fraction
+RETRIEVE_EXACT_MAX_POINTS = int(os.environ.get("RETRIEVE_EXACT_MAX_POINTS", "10000"))  # exact-scan budget
+RETRIEVE_SELECTIVITY_TTL = float(os.environ.get("RETRIEVE_SELECTIVITY_TTL", "60"))  # seconds an estimate is reused
+RETRIEVE_RESCORE_FACTOR = int(os.environ.get("RETRIEVE_RESCORE_FACTOR", "4"))  # compact candidates per result
+RETRIEVE_LAYOUT_TTL = float(os.environ.get("RETRIEVE_LAYOUT_TTL", "30"))  # seconds an alias's vector layout is reused
+
+# Deadline-aware ask (0 = no deadline): budget shares per stage; generation gets what is left
+ASK_DEADLINE_MS = float(os.environ.get("ASK_DEADLINE_MS", "0"))
+ASK_PLAN_SHARE = float(os.environ.get("ASK_PLAN_SHARE", "0.2"))
+ASK_RETRIEVE_SHARE = float(os.environ.get("ASK_RETRIEVE_SHARE", "0.2"))
+ASK_MIN_PLAN_MS = float(os.environ.get("ASK_MIN_PLAN_MS", "300"))  # smaller planning share: skip planning
+ASK_MIN_GENERATE_MS = float(os.environ.get("ASK_MIN_GENERATE_MS", "800"))  # less time left: extractive answer
+ASK_GENERATE_MS_PER_RESULT = float(os.environ.get("ASK_GENERATE_MS_PER_RESULT", "150"))  # context cost per chunk
+ASK_EXTRACTIVE_SENTENCES = int(os.environ.get("ASK_EXTRACTIVE_SENTENCES", "3"))
+
+# Query log (one JSON line per ask) and precomputed answers for frequent questions (cli.py precompute)
+QUERY_LOG_ENABLED = _env_flag("QUERY_LOG")
+QUERY_LOG_PATH = Path(os.environ.get("QUERY_LOG_PATH", str(PROJECT_ROOT / ".cache" / "query_log.jsonl")))
+ANSWER_STORE_ENABLED = _env_flag("ANSWER_STORE", True)  # ask checks the store first (no-op until precompute ran)
+ANSWER_STORE_PATH = Path(os.environ.get("ANSWER_STORE_PATH", str(PROJECT_ROOT / ".cache" / "answers.sqlite3")))
+PRECOMPUTE_TOP = int(os.environ.get("PRECOMPUTE_TOP", "50"))  # most frequent questions answered ahead of time
+PRECOMPUTE_MIN_COUNT = int(os.environ.get("PRECOMPUTE_MIN_COUNT", "2"))  # times asked to qualify
+PRECOMPUTE_WINDOW_DAYS = float(os.environ.get("PRECOMPUTE_WINDOW_DAYS", "30"))  # log entries considered
+
+# Semantic answer cache: a rephrased question reuses a prior answer (in-process, embedded question lookup)
+SEMANTIC_CACHE_ENABLED = _env_flag("SEMANTIC_CACHE")
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.92"))  # min cosine similarity
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "1024"))  # answers kept (least recently used go)
+SEMANTIC_CACHE_TTL_S = float(os.environ.get("SEMANTIC_CACHE_TTL_S", "3600"))  # 0 = no expiry
 
 # Mistral
 MISTRAL_API_KEY = os.environ.get("MISTRAL_API_KEY", "")
 MISTRAL_MODEL = os.environ.get("MISTRAL_MODEL", "mistral-small-latest")
+MISTRAL_SERVER_URL = os.environ.get("MISTRAL_SERVER_URL", "")  # e.g. a local mock server; empty = Mistral's API
+# Resilient calls (rag/llm.py): retries with jittered backoff, hedging, circuit breaker, client-side rate limit
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_MS = float(os.environ.get("LLM_BACKOFF_BASE_MS", "250"))
+LLM_BACKOFF_MAX_MS = float(os.environ.get("LLM_BACKOFF_MAX_MS", "8000"))
+LLM_HEDGE = _env_flag("LLM_HEDGE")  # second request when the first is slower than the observed p95
+LLM_HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))  # latencies needed before hedging
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))  # consecutive failures that open it
+LLM_BREAKER_RESET_S = float(os.environ.get("LLM_BREAKER_RESET_S", "30"))  # open time before a probe call
+LLM_RATE_LIMIT_RPS = float(os.environ.get("LLM_RATE_LIMIT_RPS", "0"))  # token bucket refill; 0 = unlimited
+LLM_RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", "5"))
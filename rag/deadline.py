@@ -0,0 +1,57 @@
+"""Time budgets for ask(): a deadline split across planning, retrieval and generation."""
+
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# Degradations reported in AskResponse.degradations, in the order the pipeline applies them
+SKIP_PLANNING = "skip_planning"  # searched the question as asked (planning too slow or no budget)
+DROP_QUERIES = "drop_queries"  # ran fewer planned queries than the planner produced
+LOWER_TOP_K = "lower_top_k"  # fewer chunks, so retrieval and the generation prompt are cheaper
+EXTRACTIVE_ANSWER = "extractive_answer"  # answer built locally from the top chunks, no generation
+
+
+class Deadline:
+    """A wall-clock budget started at construction; stage shares are fractions of the whole budget."""
+
+    def __init__(self, budget_ms: float):
+        if budget_ms <= 0:
+            raise ValueError(f"Deadline budget must be positive, got {budget_ms}")
+        self.budget_ms = float(budget_ms)
+        self._started = time.monotonic()
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self._started) * 1000.0
+
+    def remaining_ms(self) -> float:
+        return max(0.0, self.budget_ms - self.elapsed_ms())
+
+    def share_ms(self, fraction: float) -> float:
+        """A stage's allowance: its fraction of the budget, never more than what is left."""
+        return min(self.remaining_ms(), fraction * self.budget_ms)
+
+
+def run_with_timeout(timeout_ms: float, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """
+    Call fn in a daemon thread and wait at most timeout_ms for it. Raises TimeoutError if it
+    has not finished; the call is abandoned (give fn its own timeout so the thread ends too).
+    Exceptions raised by fn are re-raised here.
+    """
+    outcome: dict[str, Any] = {}
+
+    def target() -> None:
+        try:
+            outcome["value"] = fn(*args, **kwargs)
+        except BaseException as e:  # noqa: BLE001 - handed to the caller
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name=f"deadline-{getattr(fn, '__name__', 'call')}", daemon=True)
+    thread.start()
+    thread.join(max(0.0, timeout_ms) / 1000.0)
+    if thread.is_alive():
+        raise TimeoutError(f"{getattr(fn, '__name__', 'call')} did not finish within {timeout_ms:.0f} ms")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
@@ -0,0 +1,160 @@
+"""Index-time near-duplicate detection: MinHash over paragraph shingles, LSH banding, collapse into one chunk."""
+
+import hashlib
+import logging
+import re
+from dataclasses import replace
+
+import numpy as np
+
+from rag.config import DEDUP_BANDS, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE, DEDUP_THRESHOLD
+from rag.models import Chunk, ChunkBatch
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Mersenne prime for the universal hash family h(x) = (a*x + b) mod p
+_PRIME = np.uint64((1 << 61) - 1)
+_SEED = 1337
+
+
+def _paragraph(chunk: Chunk) -> str:
+    """Chunk text without the Subject/From/To header that chunking prepends."""
+    _, sep, para = chunk.text.partition("\n\n")
+    return para if sep else chunk.text
+
+
+def _shingles(text: str, size: int) -> set[str]:
+    """Word n-gram shingles (lowercased); texts shorter than `size` words form one shingle."""
+    tokens = [t.lower() for t in _TOKEN_PATTERN.findall(text)]
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i : i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _shingle_hashes(shingles: set[str]) -> np.ndarray:
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash_signatures(texts: list[str], *, num_perm: int, shingle_size: int) -> np.ndarray:
+    """MinHash signature matrix of shape (len(texts), num_perm)."""
+    rng = np.random.default_rng(_SEED)
+    # a < 2^31 and 32-bit shingle hashes keep a*x + b inside uint64
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = _shingle_hashes(_shingles(text, shingle_size))
+        signatures[row] = ((hashes[:, None] * a + b) % _PRIME).min(axis=0)
+    return signatures
+
+
+def _find(parent: list[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def near_duplicate_groups(
+    texts: list[str],
+    *,
+    threshold: float = DEDUP_THRESHOLD,
+    num_perm: int = DEDUP_NUM_PERM,
+    bands: int = DEDUP_BANDS,
+    shingle_size: int = DEDUP_SHINGLE_SIZE,
+) -> list[list[int]]:
+    """
+    Group indexes of texts whose estimated Jaccard similarity is >= threshold.
+    LSH banding proposes candidate pairs; each pair is confirmed on the full signature.
+    Groups are ordered by first member; members keep input order.
+    """
+    if not texts:
+        return []
+    if num_perm % bands:
+        raise ValueError(f"DEDUP_NUM_PERM ({num_perm}) must be divisible by DEDUP_BANDS ({bands})")
+    rows = num_perm // bands
+    signatures = minhash_signatures(texts, num_perm=num_perm, shingle_size=shingle_size)
+
+    parent = list(range(len(texts)))
+    for band in range(bands):
+        # bucket -> representatives not (yet) merged with an earlier representative
+        buckets: dict[bytes, list[int]] = {}
+        band_slice = signatures[:, band * rows : (band + 1) * rows]
+        for i in range(len(texts)):
+            reps = buckets.setdefault(band_slice[i].tobytes(), [])
+            merged = False
+            for j in reps:
+                root_i, root_j = _find(parent, i), _find(parent, j)
+                if root_i == root_j:
+                    merged = True
+                    break
+                if np.count_nonzero(signatures[i] == signatures[j]) >= threshold * num_perm:
+                    parent[max(root_i, root_j)] = min(root_i, root_j)
+                    merged = True
+                    break
+            if not merged:
+                reps.append(i)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return sorted(groups.values(), key=lambda g: g[0])
+
+
+def dedupe_chunks(chunks: list[Chunk], **kwargs) -> list[Chunk]:
+    """
+    Collapse near-duplicate paragraphs into one chunk (the first occurrence) that lists
+    every other occurrence in `duplicates`. Returns canonical chunks in original order.
+    Keyword arguments are passed to near_duplicate_groups.
+    """
+    groups = near_duplicate_groups([_paragraph(c) for c in chunks], **kwargs)
+    out: list[Chunk] = []
+    for group in groups:
+        canonical = chunks[group[0]]
+        if len(group) == 1:
+            out.append(canonical)
+            continue
+        duplicates = list(canonical.duplicates)
+        for i in group[1:]:
+            duplicates.append(chunks[i].source_ref())
+            duplicates.extend(chunks[i].duplicates)
+        out.append(replace(canonical, duplicates=duplicates))
+    logger.info(
+        "Dedup: %d chunks -> %d (%d near-duplicates collapsed)",
+        len(chunks),
+        len(out),
+        len(chunks) - len(out),
+    )
+    return out
+
+
+def dedupe_batch(batch: ChunkBatch, **kwargs) -> ChunkBatch:
+    """
+    dedupe_chunks for a ChunkBatch: the canonical rows, in original order, with collapsed
+    sources in `duplicates`. Paragraphs are compared without building chunk texts.
+    """
+    groups = near_duplicate_groups(batch.paragraphs, **kwargs)
+    out = batch.take(group[0] for group in groups)
+    for row, group in enumerate(groups):
+        if len(group) == 1:
+            continue
+        duplicates = list(batch.duplicates.get(group[0], []))
+        for i in group[1:]:
+            duplicates.append(batch.source_ref(i))
+            duplicates.extend(batch.duplicates.get(i, []))
+        out.duplicates[row] = duplicates
+    logger.info(
+        "Dedup: %d chunks -> %d (%d near-duplicates collapsed)",
+        len(batch),
+        len(out),
+        len(batch) - len(out),
+    )
+    return out
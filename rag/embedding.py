@@ -1,27 +1,147 @@
-"""Embedding via sentence-transformers; pad to Qdrant vector size (1536)."""
+"""Embedding via sentence-transformers (or its ONNX export, or offline hashing); pad to Qdrant vector size (1536)."""
 
 import logging
-from typing import List
+from typing import TYPE_CHECKING, Any, Callable, List
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-from rag.config import EMBEDDING_MODEL, QDRANT_VECTOR_SIZE
+from rag.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_DRIFT_CHECK,
+    EMBEDDING_LOCAL_ONLY,
+    EMBEDDING_MAX_DRIFT,
+    EMBEDDING_MODEL,
+    QDRANT_VECTOR_SIZE,
+)
+from rag.hashing_embedding import HashingEncoder, hashing_dimension, is_hashing_model
+
+if TYPE_CHECKING:  # imported on first model load: torch alone takes seconds
+    from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
-# Lazy singleton to avoid loading model multiple times
-_model: SentenceTransformer | None = None
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# Fixed sample for the startup drift check (email-like sentences of varying length)
+DRIFT_SAMPLE_TEXTS = [
+    "Subject: Meeting Request\nFrom: Helen Powell <helen.powell@tech.io>\nTo: Nico Clark <nico.clark@corp.org>\n\n"
+    "I would like to schedule a meeting to discuss our strategy for next quarter.",
+    "Please approve the budget for the upcoming fiscal year.",
+    "There's a professional development workshop scheduled for next month.",
+    "Thanks,\nTara Woods",
+    "Can we move the project deadline?",
+]
+
+# Lazy singletons to avoid loading model / backend multiple times
+_model: "SentenceTransformer | None" = None
+_encoder: Callable[[list[str]], np.ndarray] | None = None
+
+
+def load_sentence_transformer(model_name: str) -> "SentenceTransformer":
+    """Load a sentence-transformers model; with EMBEDDING_LOCAL_ONLY, only from the local cache."""
+    from sentence_transformers import SentenceTransformer
 
+    return SentenceTransformer(model_name, local_files_only=EMBEDDING_LOCAL_ONLY)
 
-def get_embedding_model() -> SentenceTransformer:
+
+def get_embedding_model() -> "SentenceTransformer":
     """Load and cache the sentence-transformers model."""
     global _model
+    if is_hashing_model(EMBEDDING_MODEL):
+        raise ValueError(f"EMBEDDING_MODEL={EMBEDDING_MODEL} is the hashing embedder, not a sentence-transformers one")
     if _model is None:
         logger.info("Loading embedding model: %s", EMBEDDING_MODEL)
-        _model = SentenceTransformer(EMBEDDING_MODEL)
+        _model = load_sentence_transformer(EMBEDDING_MODEL)
     return _model
 
 
+def _torch_encode(texts: list[str]) -> np.ndarray:
+    return get_embedding_model().encode(
+        texts, batch_size=EMBEDDING_BATCH_SIZE, convert_to_numpy=True
+    )
+
+
+def _load_encoder(backend: str) -> Callable[[list[str]], np.ndarray]:
+    """Return an encode(texts) -> ndarray callable for the given backend (any backend for a hashing model)."""
+    if is_hashing_model(EMBEDDING_MODEL):
+        dim = hashing_dimension(EMBEDDING_MODEL) or QDRANT_VECTOR_SIZE
+        if dim > QDRANT_VECTOR_SIZE:
+            raise ValueError(f"{EMBEDDING_MODEL} vectors are larger than QDRANT_VECTOR_SIZE={QDRANT_VECTOR_SIZE}")
+        logger.info("Using the hashing embedder (%d dimensions)", dim)
+        return HashingEncoder(dim).encode
+    if backend == "torch":
+        return _torch_encode
+    if backend in ("onnx", "onnx-int8"):
+        from rag.onnx_embedding import load_onnx_encoder
+
+        return load_onnx_encoder(EMBEDDING_MODEL, quantize=backend == "onnx-int8").encode
+    raise ValueError(
+        f"Unknown EMBEDDING_BACKEND {backend!r}; expected one of {', '.join(EMBEDDING_BACKENDS)}"
+    )
+
+
+def get_encoder() -> Callable[[list[str]], np.ndarray]:
+    """Load and cache the configured embedding backend (EMBEDDING_BACKEND)."""
+    global _encoder
+    if _encoder is None:
+        encoder = _load_encoder(EMBEDDING_BACKEND)
+        if EMBEDDING_DRIFT_CHECK and EMBEDDING_BACKEND != "torch" and not is_hashing_model(EMBEDDING_MODEL):
+            check_backend_drift(EMBEDDING_BACKEND, encoder=encoder)
+        _encoder = encoder
+    return _encoder
+
+
+def get_tokenizer() -> tuple[Any | None, int]:
+    """
+    The embedding model's tokenizer and max sequence length (tokens it reads; the rest of a
+    text is truncated). The hashing embedder has neither: (None, 0).
+    """
+    if is_hashing_model(EMBEDDING_MODEL):
+        return None, 0
+    owner = getattr(get_encoder(), "__self__", None)  # OnnxEncoder.encode carries its tokenizer
+    if owner is not None and hasattr(owner, "tokenizer"):
+        return owner.tokenizer, int(owner.max_seq_length)
+    model = get_embedding_model()
+    return model.tokenizer, int(model.max_seq_length)
+
+
+def check_backend_drift(
+    backend: str | None = None,
+    texts: list[str] | None = None,
+    *,
+    encoder: Callable[[list[str]], np.ndarray] | None = None,
+) -> float:
+    """
+    Embed a sample with the torch backend and with `backend` (or its already loaded
+    `encoder`); log and return the worst cosine drift (1 - cosine similarity).
+    Raises RuntimeError above EMBEDDING_MAX_DRIFT.
+    """
+    name = backend or EMBEDDING_BACKEND
+    sample = texts or DRIFT_SAMPLE_TEXTS
+    reference = _torch_encode(sample)
+    if encoder is None:
+        encoder = get_encoder() if name == EMBEDDING_BACKEND else _load_encoder(name)
+    candidate = encoder(sample)
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    drift = 1.0 - np.sum(ref * cand, axis=1)
+    worst = float(drift.max())
+    logger.info(
+        "Embedding drift %s vs torch on %d texts: mean=%.6f max=%.6f",
+        name,
+        len(sample),
+        float(drift.mean()),
+        worst,
+    )
+    if worst > EMBEDDING_MAX_DRIFT:
+        raise RuntimeError(
+            f"Embedding backend {name} drifts {worst:.4f} from torch (limit {EMBEDDING_MAX_DRIFT:.4f}); "
+            "its vectors would not match a collection built with torch"
+        )
+    return worst
+
+
 def _pad_vector(vector: list[float], target_size: int) -> list[float]:
     """Pad vector with zeros to target_size (for Qdrant 1536-dim)."""
     if len(vector) >= target_size:
@@ -33,8 +153,7 @@ def embed_texts(texts: list[str]) -> List[List[float]]:
     """Embed texts and pad each vector to QDRANT_VECTOR_SIZE (1536)."""
     if not texts:
         return []
-    model = get_embedding_model()
-    embeddings = model.encode(texts, convert_to_numpy=True)
+    embeddings = get_encoder()(texts)
     raw = embeddings.tolist()
     return [_pad_vector(v, QDRANT_VECTOR_SIZE) for v in raw]
 
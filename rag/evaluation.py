@@ -0,0 +1,364 @@
+"""Retrieval evaluation: labelled queries, recall@k / MRR, configuration sweeps and their Pareto frontier."""
+
+import itertools
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Sequence
+
+from rag.chunking import chunk_batch, resolve_strategy
+from rag.config import QDRANT_COLLECTION_PROFILE
+from rag.models import ParsedEmail, RetrieveResult
+from rag.stats import percentile
+from rag.synthetic import synthetic_emails
+
+logger = logging.getLogger(__name__)
+
+# Paraphrased topic questions for the subjects of the sample corpus (emails/)
+TOPIC_QUERIES = {
+    "Budget Approval": "Which emails ask for sign-off on spending for the fiscal year?",
+    "Client Feedback": "What did customers say about our work?",
+    "Deadline Extension": "Who needs more time to finish their deliverables?",
+    "Meeting Request": "Who wants to schedule a meeting to discuss strategy?",
+    "Performance Review": "Which emails are about evaluating an employee's results this year?",
+    "Project Update": "What is the latest progress on the project milestones?",
+    "Team Announcement": "What news was shared with the whole team?",
+    "Technical Issue": "Which emails report a system problem or outage?",
+    "Training Opportunity": "Is there a workshop for professional development?",
+    "Vendor Proposal": "Which supplier sent an offer for their services?",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class LabelledQuery:
+    """A question and the source files of the emails that answer it."""
+
+    query: str
+    relevant: frozenset[str]
+    kind: str = ""  # "topic", "person", "fact" or "" (loaded from a file)
+
+
+def corpus_queries(emails: list[ParsedEmail]) -> list[LabelledQuery]:
+    """
+    Queries labelled from the emails' own headers: per subject, a topic question (relevant:
+    every email with that subject), and per (sender, recipient, subject), a question naming
+    both people and the topic (relevant: their emails on it).
+    """
+    by_subject: dict[str, set[str]] = {}
+    by_pair: dict[tuple[str, str, str], set[str]] = {}
+    for e in emails:
+        by_subject.setdefault(e.subject, set()).add(e.source_file)
+        by_pair.setdefault((e.from_name, e.to_name, e.subject), set()).add(e.source_file)
+    queries = [
+        LabelledQuery(
+            TOPIC_QUERIES.get(subject) or f"Which emails are about {subject.lower()}?", frozenset(files), "topic"
+        )
+        for subject, files in sorted(by_subject.items())
+        if subject
+    ]
+    queries += [
+        LabelledQuery(f"What did {sender} write to {recipient} about {subject.lower()}?", frozenset(files), "person")
+        for (sender, recipient, subject), files in sorted(by_pair.items())
+        if sender and recipient and subject
+    ]
+    return queries
+
+
+def synthetic_corpus(n: int, *, seed: int = 0) -> tuple[list[ParsedEmail], list[LabelledQuery]]:
+    """`n` synthetic emails and their planted-fact questions (one relevant email each)."""
+    generated = synthetic_emails(n, seed=seed)
+    emails = [g.email for g in generated]
+    return emails, [LabelledQuery(g.question, frozenset([g.email.source_file]), "fact") for g in generated]
+
+
+def load_queries(path: Path) -> list[LabelledQuery]:
+    """Labelled queries from JSONL: {"query": ..., "relevant": [source_file, ...]} per line."""
+    queries = []
+    with path.open(encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if not entry.get("query") or not entry.get("relevant"):
+                raise ValueError(f"{path}:{n}: expected a query and a non-empty relevant list")
+            queries.append(LabelledQuery(entry["query"], frozenset(entry["relevant"]), entry.get("kind", "")))
+    return queries
+
+
+def email_ranking(results: list[RetrieveResult]) -> list[str]:
+    """Distinct source files in rank order; a collapsed chunk ranks every email it stands for."""
+    seen: dict[str, None] = {}
+    for r in results:
+        files = [s.get("source_file") for s in r.metadata.get("sources") or () if isinstance(s, dict)]
+        for f in [r.source_file, *files]:
+            if f:
+                seen.setdefault(f, None)
+    return list(seen)
+
+
+def recall_at_k(ranking: list[str], relevant: frozenset[str], k: int) -> float:
+    """Relevant emails among the first k, over min(k, relevant): 1.0 when k slots hold nothing but hits."""
+    if not relevant or k <= 0:
+        return 0.0
+    return len(relevant.intersection(ranking[:k])) / min(k, len(relevant))
+
+
+def reciprocal_rank(ranking: list[str], relevant: frozenset[str]) -> float:
+    for rank, f in enumerate(ranking, 1):
+        if f in relevant:
+            return 1.0 / rank
+    return 0.0
+
+
+@dataclass(frozen=True, slots=True)
+class IndexConfig:
+    """Settings that need their own index build."""
+
+    chunking: str = "paragraph"
+    profile: str = "default"
+    compact_dim: int = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.chunking}/{self.profile}/{f'compact{self.compact_dim}' if self.compact_dim else 'full'}"
+
+
+@dataclass(frozen=True, slots=True)
+class SearchConfig:
+    """Query-time settings, swept over one index."""
+
+    top_k: int = 5
+    hnsw_ef: int | None = None  # None: the collection's default
+    exact: bool = False
+    hierarchical: bool = True
+
+    @property
+    def label(self) -> str:
+        mode = "exact" if self.exact else f"ef={self.hnsw_ef or '-'}"
+        return f"k={self.top_k} {mode} {'hier' if self.hierarchical else 'flat'}"
+
+
+@dataclass(slots=True)
+class SweepResult:
+    """Quality, latency and memory of one (index, search) configuration over the labelled queries."""
+
+    index: IndexConfig
+    search: SearchConfig
+    queries: int
+    recall: float  # mean recall@k (k = search.top_k)
+    mrr: float
+    p50_ms: float
+    p99_ms: float
+    memory_mb: float  # RAM of the index's vectors and HNSW links (estimated from the collection config)
+    index_s: float  # build time of the index (shared by all its search configurations)
+
+    @property
+    def label(self) -> str:
+        return f"{self.index.label} {self.search.label}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"index": asdict(self.index), "search": asdict(self.search), "label": self.label} | {
+            key: getattr(self, key) for key in ("queries", "recall", "mrr", "p50_ms", "p99_ms", "memory_mb", "index_s")
+        }
+
+
+def index_grid(
+    chunking: Sequence[str | None] = (None,),
+    profiles: Sequence[str | None] = (None,),
+    compact_dims: Sequence[int | None] = (0,),
+) -> list[IndexConfig]:
+    """Every combination; None stands for the configured default (CHUNK_STRATEGY, QDRANT_COLLECTION_PROFILE)."""
+    return [
+        IndexConfig(resolve_strategy(c), p or QDRANT_COLLECTION_PROFILE, d or 0)
+        for c, p, d in itertools.product(chunking, profiles, compact_dims)
+    ]
+
+
+def search_grid(
+    top_ks: Sequence[int] = (5,),
+    hnsw_efs: Sequence[int | None] = (None,),
+    exact: Sequence[bool] = (False,),
+    hierarchical: Sequence[bool] = (True,),
+) -> list[SearchConfig]:
+    """Every combination, except ef values with exact search (exact ignores ef: one entry)."""
+    grid: dict[SearchConfig, None] = {}
+    for k, ef, ex, hier in itertools.product(top_ks, hnsw_efs, exact, hierarchical):
+        grid.setdefault(SearchConfig(k, None if ex else ef, ex, hier), None)
+    return list(grid)
+
+
+def index_memory_mb(client: Any, name: str) -> float:
+    """
+    RAM held by the vectors and level-0 HNSW links of `name` and its email index, from point
+    counts and the collection config: float32 vectors not kept on disk, plus 2 * m links of
+    4 bytes per point when the graph is in RAM. Payload storage is not counted.
+    """
+    from rag.store import email_index_name, resolve_collection
+
+    total = 0
+    for alias in (name, email_index_name(name)):
+        try:
+            info = client.get_collection(resolve_collection(client, alias))
+        except Exception:  # noqa: BLE001 - no email index: nothing to count
+            continue
+        points = info.points_count or 0
+        vectors = info.config.params.vectors
+        for params in vectors.values() if isinstance(vectors, dict) else [vectors]:
+            if not params.on_disk:
+                total += points * params.size * 4
+        hnsw = info.config.hnsw_config
+        if hnsw.m and not hnsw.on_disk:
+            total += points * 2 * hnsw.m * 4
+    return total / (1024 * 1024)
+
+
+def build_index(emails: list[ParsedEmail], config: IndexConfig, name: str) -> float:
+    """Chunk, embed and upload `emails` into `name` as `config` says; returns the build time in seconds."""
+    from rag.store import build_store_from_chunks
+
+    started = time.perf_counter()
+    build_store_from_chunks(
+        chunk_batch(emails, config.chunking),
+        name,
+        profile=config.profile,
+        email_vectors=True,
+        compact_dim=config.compact_dim,
+    )
+    return time.perf_counter() - started
+
+
+def run_queries(
+    queries: list[LabelledQuery],
+    vectors: list[list[float]],
+    name: str,
+    search: SearchConfig,
+    *,
+    repeat: int = 3,
+) -> tuple[float, float, list[float]]:
+    """
+    (mean recall@k, MRR, per-search latencies in ms) of `search` on collection `name`.
+    The first pass gives the rankings and warms caches; `repeat` more passes are timed.
+    Query vectors are embedded once by the caller: embedding costs the same in every configuration.
+    """
+    from rag.retrieve import retrieve
+
+    def search_one(query: LabelledQuery, vector: list[float]) -> list[RetrieveResult]:
+        return retrieve(
+            query.query,
+            top_k=search.top_k,
+            collection_name=name,
+            hnsw_ef=search.hnsw_ef,
+            exact=search.exact,
+            hierarchical=search.hierarchical,
+            query_vector=vector,
+        )
+
+    recall = mrr = 0.0
+    for query, vector in zip(queries, vectors):
+        ranking = email_ranking(search_one(query, vector))
+        recall += recall_at_k(ranking, query.relevant, search.top_k)
+        mrr += reciprocal_rank(ranking, query.relevant)
+    latencies = []
+    for _ in range(repeat):
+        for query, vector in zip(queries, vectors):
+            started = time.perf_counter()
+            search_one(query, vector)
+            latencies.append((time.perf_counter() - started) * 1000.0)
+    n = len(queries) or 1
+    return recall / n, mrr / n, latencies
+
+
+def sweep(
+    emails: list[ParsedEmail],
+    queries: list[LabelledQuery],
+    index_configs: list[IndexConfig],
+    search_configs: list[SearchConfig],
+    *,
+    repeat: int = 3,
+    collection_prefix: str = "eval_sweep",
+    keep: bool = False,
+) -> list[SweepResult]:
+    """
+    Build one index per index configuration (`<collection_prefix>_<n>`), run every search
+    configuration over the labelled queries on it, and drop it again unless `keep`.
+    """
+    from rag.embedding import embed_texts
+    from rag.store import drop_index, get_qdrant_client
+
+    if not queries:
+        raise ValueError("No labelled queries to evaluate")
+    client = get_qdrant_client()
+    vectors = embed_texts([q.query for q in queries])
+    results = []
+    for n, config in enumerate(index_configs, 1):
+        name = f"{collection_prefix}_{n}"
+        drop_index(client, name)
+        try:
+            index_s = build_index(emails, config, name)
+            memory_mb = index_memory_mb(client, name)
+            for search in search_configs:
+                recall, mrr, latencies = run_queries(queries, vectors, name, search, repeat=repeat)
+                latencies.sort()
+                result = SweepResult(
+                    index=config,
+                    search=search,
+                    queries=len(queries),
+                    recall=recall,
+                    mrr=mrr,
+                    p50_ms=percentile(latencies, 50),
+                    p99_ms=percentile(latencies, 99),
+                    memory_mb=memory_mb,
+                    index_s=index_s,
+                )
+                logger.info(
+                    "%s: recall@%d %.3f, MRR %.3f, p99 %.1f ms",
+                    result.label,
+                    search.top_k,
+                    recall,
+                    mrr,
+                    result.p99_ms,
+                )
+                results.append(result)
+        finally:
+            if not keep:
+                drop_index(client, name)
+    return results
+
+
+def _dominates(a: SweepResult, b: SweepResult) -> bool:
+    """a is at least as good as b on recall, MRR, p99 latency and memory, and better on one."""
+    no_worse = a.recall >= b.recall and a.mrr >= b.mrr and a.p99_ms <= b.p99_ms and a.memory_mb <= b.memory_mb
+    better = a.recall > b.recall or a.mrr > b.mrr or a.p99_ms < b.p99_ms or a.memory_mb < b.memory_mb
+    return no_worse and better
+
+
+def pareto_front(results: list[SweepResult]) -> list[SweepResult]:
+    """Configurations no other one dominates (recall and MRR up, p99 and memory down), fastest first."""
+    front = [r for r in results if not any(_dominates(other, r) for other in results)]
+    return sorted(front, key=lambda r: (r.p99_ms, -r.recall))
+
+
+def fastest_within(results: list[SweepResult], min_recall: float) -> SweepResult | None:
+    """The lowest-p99 configuration whose recall@k reaches `min_recall`, or None."""
+    passing = [r for r in results if r.recall >= min_recall]
+    return min(passing, key=lambda r: (r.p99_ms, r.memory_mb, -r.recall)) if passing else None
+
+
+def format_results(results: list[SweepResult], front: list[SweepResult] | None = None) -> str:
+    """Fixed-width table, best recall first; frontier rows are marked with *."""
+    on_front = {id(r) for r in (pareto_front(results) if front is None else front)}
+    width = max([len(r.label) for r in results] + [len("configuration")])
+    header = (
+        f"  {'configuration':<{width}} {'recall@k':>8} {'MRR':>6} {'p50 ms':>8} {'p99 ms':>8} "
+        f"{'memory MB':>9} {'index s':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in sorted(results, key=lambda r: (-r.recall, -r.mrr, r.p99_ms)):
+        mark = "*" if id(r) in on_front else " "
+        lines.append(
+            f"{mark} {r.label:<{width}} {r.recall:>8.3f} {r.mrr:>6.3f} {r.p50_ms:>8.2f} {r.p99_ms:>8.2f} "
+            f"{r.memory_mb:>9.2f} {r.index_s:>8.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,56 @@
+"""Extractive answers: the retrieved sentences that best match the question, built locally without an LLM."""
+
+import re
+
+from rag.config import ASK_EXTRACTIVE_SENTENCES
+from rag.models import RetrieveResult
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9][a-z0-9'-]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have how i in is it me of on or our "
+    "so that the their there this to was we were what when where which who why will with you your".split()
+)
+_HEADER = re.compile(r"^(?:Subject|From|To):", re.IGNORECASE)
+
+
+def _terms(text: str) -> set[str]:
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1}
+
+
+def _body(text: str) -> str:
+    """Chunk text without the Subject/From/To header that chunking prepends."""
+    lines = [line for line in text.splitlines() if not _HEADER.match(line.strip())]
+    return "\n".join(lines).strip()
+
+
+def extractive_answer(
+    query: str,
+    results: list[RetrieveResult],
+    *,
+    max_sentences: int | None = None,
+) -> str:
+    """
+    Pick the sentences of the retrieved chunks sharing the most terms with the question
+    (ties go to the better-ranked chunk, then to the earlier sentence) and quote them with
+    their source. Falls back to each top chunk's first sentence if nothing overlaps.
+    """
+    n = max_sentences or ASK_EXTRACTIVE_SENTENCES
+    if not results:
+        return "I have no relevant emails in the context to answer this question."
+    query_terms = _terms(query)
+    scored: list[tuple[int, int, int, str, str]] = []
+    for rank, r in enumerate(results):
+        sentences = [s.strip() for s in _SENTENCE_END.split(_body(r.text)) if s.strip()]
+        for pos, sentence in enumerate(sentences):
+            overlap = len(query_terms & _terms(sentence))
+            scored.append((-overlap, rank, pos, sentence, r.source_file))
+    if not scored:
+        return "I have no relevant emails in the context to answer this question."
+    picked = [s for s in sorted(scored) if s[0] < 0][:n]
+    if not picked:
+        picked = [s for s in sorted(scored, key=lambda s: (s[2], s[1])) if s[2] == 0][:n]
+    # Quote in retrieval order so the answer reads like the sources
+    picked.sort(key=lambda s: (s[1], s[2]))
+    lines = [f'- "{sentence}" ({source})' for _, _, _, sentence, source in picked]
+    return "Most relevant passages from the retrieved emails:\n" + "\n".join(lines)
@@ -0,0 +1,181 @@
+"""Filter language for `where`: compile to cached Qdrant filters; pick exact search for selective filters."""
+
+import json
+import logging
+import time
+from functools import lru_cache
+from typing import Any
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from rag.config import (
+    FILTER_CACHE_SIZE,
+    RETRIEVE_EXACT_MAX_POINTS,
+    RETRIEVE_EXACT_SELECTIVITY,
+    RETRIEVE_SELECTIVITY_TTL,
+)
+from rag.metadata_index import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = frozenset({"date"})
+_RANGE_OPS = {"$gt": "gt", "$gte": "gte", "$lt": "lt", "$lte": "lte"}
+_FIELD_OPS = frozenset({"$eq", "$ne", "$in", "$nin", "$prefix", *_RANGE_OPS})
+
+# (collection, filter key) -> (estimated matches, collection size, time measured)
+_estimates: dict[tuple[str, str], tuple[int, int, float]] = {}
+
+
+def where_key(where: dict[str, Any]) -> str:
+    """Canonical form of a where dict (key order does not matter); the compile cache key."""
+    return json.dumps(where, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def needs_metadata(where: Any) -> bool:
+    """True if the filter has $prefix conditions, which are expanded from the metadata index."""
+    if isinstance(where, list):
+        return any(needs_metadata(w) for w in where)
+    if not isinstance(where, dict):
+        return False
+    for key, cond in where.items():
+        if key.startswith("$"):
+            if needs_metadata(cond):
+                return True
+        elif isinstance(cond, dict) and "$prefix" in cond:
+            return True
+    return False
+
+
+def _expand_prefixes(where: Any, metadata: MetadataIndex | None) -> Any:
+    """Replace {"$prefix": p} with {"$in": [every known value of the field starting with p]}."""
+    if isinstance(where, list):
+        return [_expand_prefixes(w, metadata) for w in where]
+    if not isinstance(where, dict):
+        return where
+    out: dict[str, Any] = {}
+    for key, cond in where.items():
+        if key.startswith("$") or not isinstance(cond, dict) or "$prefix" not in cond:
+            out[key] = _expand_prefixes(cond, metadata)
+            continue
+        if metadata is None:
+            raise ValueError("$prefix filters need the metadata index; run `cli.py index` first")
+        prefix = str(cond["$prefix"]).lower()
+        rest = {op: v for op, v in cond.items() if op != "$prefix"}
+        out[key] = {**rest, "$in": sorted(v for v in metadata.values(key) if v.lower().startswith(prefix))}
+    return out
+
+
+def _field_conditions(
+    key: str,
+    cond: Any,
+) -> tuple[list[models.Condition], list[models.Condition]]:
+    """(must, must_not) conditions for one field."""
+    if not isinstance(cond, dict):
+        cond = {"$eq": cond}
+    unknown = set(cond) - _FIELD_OPS
+    if unknown:
+        raise ValueError(f"Unknown operator(s) for {key!r}: {', '.join(sorted(unknown))}")
+    must: list[models.Condition] = []
+    must_not: list[models.Condition] = []
+    if "$eq" in cond:
+        must.append(models.FieldCondition(key=key, match=models.MatchValue(value=cond["$eq"])))
+    if "$ne" in cond:
+        must_not.append(models.FieldCondition(key=key, match=models.MatchValue(value=cond["$ne"])))
+    if "$in" in cond:
+        must.append(models.FieldCondition(key=key, match=models.MatchAny(any=list(cond["$in"]))))
+    if "$nin" in cond:
+        must_not.append(models.FieldCondition(key=key, match=models.MatchAny(any=list(cond["$nin"]))))
+    if "$prefix" in cond:
+        raise ValueError("$prefix must be expanded before compiling")
+    bounds = {_RANGE_OPS[op]: v for op, v in cond.items() if op in _RANGE_OPS}
+    if bounds:
+        is_date = key in DATE_FIELDS or any(isinstance(v, str) for v in bounds.values())
+        rng = models.DatetimeRange(**bounds) if is_date else models.Range(**bounds)
+        must.append(models.FieldCondition(key=key, range=rng))
+    return must, must_not
+
+
+def _compile(where: dict[str, Any]) -> models.Filter:
+    must: list[Any] = []
+    must_not: list[Any] = []
+    for key, cond in where.items():
+        if key == "$and":
+            for sub in (_compile(c) for c in cond):
+                # Plain conjunctions are flattened; anything else nests as a sub-filter
+                if sub.must and not sub.should and not sub.must_not:
+                    must.extend(sub.must)
+                else:
+                    must.append(sub)
+        elif key == "$or":
+            must.append(models.Filter(should=[_compile(c) for c in cond]))
+        elif key == "$not":
+            must_not.append(_compile(cond))
+        elif key.startswith("$"):
+            raise ValueError(f"Unknown operator {key!r}; expected $and, $or, $not or a field name")
+        else:
+            field_must, field_must_not = _field_conditions(key, cond)
+            must.extend(field_must)
+            must_not.extend(field_must_not)
+    return models.Filter(must=must or None, must_not=must_not or None)
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _compile_cached(key: str) -> models.Filter:
+    return _compile(json.loads(key))
+
+
+def compile_where(
+    where: dict[str, Any] | None,
+    metadata: MetadataIndex | None = None,
+) -> models.Filter | None:
+    """
+    Compile a where dict into a Qdrant Filter; identical filters are compiled once (LRU cache),
+    so treat the result as read-only. Grammar:
+      {"field": value} or {"field": {"$eq": v}}           exact match
+      {"field": {"$ne": v}} / {"$in": [..]} / {"$nin": [..]}
+      {"field": {"$prefix": "Budget"}}                     expanded via the metadata index
+      {"date": {"$gte": "2024-01-01", "$lt": "2024-02-01"}}  ($gt/$gte/$lt/$lte; ISO dates)
+      {"$and": [...]}, {"$or": [...]}, {"$not": {...}}
+    Several fields in one dict are ANDed.
+    """
+    if not where:
+        return None
+    if needs_metadata(where):
+        where = _expand_prefixes(where, metadata)
+    return _compile_cached(where_key(where))
+
+
+def estimate_matches(
+    client: QdrantClient,
+    collection_name: str,
+    query_filter: models.Filter,
+) -> tuple[int, int]:
+    """
+    (estimated points matching the filter, points in the collection), from Qdrant's
+    approximate count (payload-index cardinality). Cached for RETRIEVE_SELECTIVITY_TTL seconds.
+    """
+    key = (collection_name, repr(query_filter))
+    cached = _estimates.get(key)
+    if cached and time.monotonic() - cached[2] < RETRIEVE_SELECTIVITY_TTL:
+        return cached[0], cached[1]
+    if len(_estimates) >= 4 * FILTER_CACHE_SIZE:
+        _estimates.clear()
+    matches = client.count(collection_name, count_filter=query_filter, exact=False).count
+    total = client.count(collection_name, exact=False).count
+    _estimates[key] = (matches, total, time.monotonic())
+    return matches, total
+
+
+def prefer_exact(client: QdrantClient, collection_name: str, query_filter: models.Filter | None) -> bool:
+    """
+    Exact search for selective filters: when at most RETRIEVE_EXACT_SELECTIVITY of the
+    collection (and no more than RETRIEVE_EXACT_MAX_POINTS points) match, scoring the filtered
+    subset directly is cheaper than walking the HNSW graph and avoids its recall loss.
+    """
+    if query_filter is None:
+        return False
+    matches, total = estimate_matches(client, collection_name, query_filter)
+    exact = matches <= RETRIEVE_EXACT_MAX_POINTS and matches <= RETRIEVE_EXACT_SELECTIVITY * max(total, 1)
+    logger.debug("Filter matches ~%d of %d points: %s search", matches, total, "exact" if exact else "HNSW")
+    return exact
@@ -1,15 +1,14 @@
 """Generation via Mistral API."""
 
 import logging
-from typing import Any
-
-from mistralai import Mistral
 
 from rag.config import MISTRAL_API_KEY, MISTRAL_MODEL
+from rag.llm import client_options, complete_chat, lazy_mistral
 from rag.models import RetrieveResult
 
 logger = logging.getLogger(__name__)
 
+
 SYSTEM_PROMPT = """You are a precise assistant that answers questions using ONLY the provided context from company emails.
 Rules:
 - Base your answer strictly on the given context. Do not use external knowledge.
@@ -18,6 +17,10 @@ Rules:
 - Keep answers concise and factual. Do not hallucinate or invent details."""
 
 
+_mistral = lazy_mistral(globals())
+__getattr__ = _mistral  # rag.generate.Mistral stays a (lazy) module attribute, so it can be patched
+
+
 def _format_context(results: list[RetrieveResult]) -> str:
     """Format retrieved chunks for the prompt."""
     parts = []
@@ -44,21 +47,25 @@ def generate(
     *,
     model: str | None = None,
     api_key: str | None = None,
+    timeout_ms: int | None = None,
 ) -> str:
     """
-    Call Mistral chat completion with context and query.
-    Raises if MISTRAL_API_KEY is missing or API call fails.
+    Call Mistral chat completion with context and query (retried / hedged, see rag.llm).
+    Raises if MISTRAL_API_KEY is missing or API call fails (or exceeds timeout_ms, if given).
     """
     key = api_key or MISTRAL_API_KEY
     if not key:
         raise ValueError("MISTRAL_API_KEY is not set. Set it in the environment or pass api_key=.")
 
-    client = Mistral(api_key=key)
+    client = _mistral()(api_key=key, **client_options())
     model_name = model or MISTRAL_MODEL
     messages = build_messages(query, context_results)
 
     try:
-        response = client.chat.complete(
+        response = complete_chat(
+            client,
+            operation="generate",
+            timeout_ms=timeout_ms,
             model=model_name,
             messages=messages,
         )
@@ -0,0 +1,116 @@
+"""Offline hashing embedder (EMBEDDING_MODEL=hashing): feature-hashed words, word bigrams and character trigrams."""
+
+import re
+
+import numpy as np
+
+HASHING_MODEL = "hashing"
+_MODEL_NAME = re.compile(rf"^{HASHING_MODEL}(?:-(\d+))?$")
+_MAX_WORD_BYTES = 32  # bytes of a word that count towards its hash
+_BLOCK_TEXTS = 2048  # texts hashed per pass (bounds the float64 bucket counts at 2048 * dim)
+# Relative weight of each feature family in a vector (words dominate; trigrams add typo / morphology overlap)
+_WORD_WEIGHT, _BIGRAM_WEIGHT, _TRIGRAM_WEIGHT = 1.0, 0.5, 0.25
+
+# Word bytes: ASCII letters and digits, and every non-ASCII byte (UTF-8 letters stay inside words)
+_WORD_BYTE = np.zeros(256, dtype=bool)
+_WORD_BYTE[[*range(ord("0"), ord("9") + 1), *range(ord("a"), ord("z") + 1), *range(128, 256)]] = True
+
+
+def hashing_dimension(model_name: str) -> int | None:
+    """Vector size for a hashing model name ("hashing" -> None: use the Qdrant size; "hashing-384" -> 384)."""
+    match = _MODEL_NAME.match(model_name.strip().lower())
+    if match is None:
+        raise ValueError(f"Not a hashing model: {model_name!r}; expected {HASHING_MODEL} or {HASHING_MODEL}-<dim>")
+    return int(match.group(1)) if match.group(1) else None
+
+
+def is_hashing_model(model_name: str) -> bool:
+    return _MODEL_NAME.match(model_name.strip().lower()) is not None
+
+
+# Odd 64-bit multipliers (fixed, so every process embeds a text the same way); products wrap mod 2**64
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_BIGRAM_MIX = np.uint64(0xC2B2AE3D27D4EB4F)
+# A word's hash is sum(byte * _WORD_POWERS[offset in word]), then mixed; powers of the FNV prime
+_WORD_POWERS = np.array([pow(0x100000001B3, k, 1 << 64) for k in range(_MAX_WORD_BYTES)], dtype=np.uint64)
+
+
+# (feature hashes, text of each feature, weight of the family)
+_Features = tuple[np.ndarray, np.ndarray, float]
+
+
+class HashingEncoder:
+    """
+    Bag of hashed features, no model: lowercased words, adjacent word pairs and character
+    trigrams (spaces and punctuation collapsed to one separator) are hashed with
+    multiply-shift hashing into `dim` signed buckets, and each vector is L2-normalized. Texts
+    sharing words score high under cosine similarity; there is no notion of synonyms.
+    Everything runs as whole-batch NumPy operations over the concatenated UTF-8 bytes, with
+    no per-text Python loop.
+    """
+
+    def __init__(self, dim: int):
+        if dim < 1:
+            raise ValueError(f"Hashing dimension must be positive, got {dim}")
+        self.dim = dim
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """(len(texts), dim) float32 array of unit vectors (all zeros for a text without features)."""
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for first in range(0, len(texts), _BLOCK_TEXTS):
+            block = texts[first : first + _BLOCK_TEXTS]
+            out[first : first + len(block)] = self._encode_block(block)
+        return out
+
+    def _encode_block(self, texts: list[str]) -> np.ndarray:
+        n = len(texts)
+        # One byte stream with each text between two separators; doc[i] is the text of byte i
+        raw = [t.lower().encode("utf-8") for t in texts]
+        data = np.frombuffer(b" " + b"  ".join(raw) + b" ", dtype=np.uint8)
+        lengths = np.fromiter((len(b) + 2 for b in raw), dtype=np.int64, count=n)
+        doc = np.repeat(np.arange(n, dtype=np.int64), lengths)
+        in_word = _WORD_BYTE[data]
+        data = np.where(in_word, data, np.uint8(ord(" ")))
+
+        cells, values = [], []
+        for hashes, docs, weight in (*self._words(data, in_word, doc), self._trigrams(data, doc)):
+            # Multiply-shift: the high 32 bits pick the bucket (no division), bit 31 the sign
+            buckets = ((hashes >> np.uint64(32)) * np.uint64(self.dim)) >> np.uint64(32)
+            cells.append(docs * self.dim + buckets.astype(np.int64))
+            sign_bits = ((hashes >> np.uint64(31)) & np.uint64(1)).astype(np.float32)
+            values.append(weight - (2 * weight) * sign_bits)
+        counts = np.bincount(np.concatenate(cells), weights=np.concatenate(values), minlength=n * self.dim)
+        vectors = counts.astype(np.float32).reshape(n, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def _words(self, data: np.ndarray, in_word: np.ndarray, doc: np.ndarray) -> list[_Features]:
+        """Hashed words and adjacent word pairs, with their texts and weights."""
+        starts = np.flatnonzero(in_word & ~np.concatenate(([False], in_word[:-1])))
+        if not len(starts):
+            return []
+        is_start = np.zeros(len(data), dtype=bool)
+        is_start[starts] = True
+        positions = np.flatnonzero(in_word)
+        first = is_start[positions]
+        word_of = np.cumsum(first) - 1
+        offset = np.minimum(positions - starts[word_of], _MAX_WORD_BYTES - 1)
+        with np.errstate(over="ignore"):
+            terms = data[positions].astype(np.uint64) * _WORD_POWERS[offset]
+            words = np.add.reduceat(terms, np.flatnonzero(first)) * _GOLDEN
+            word_docs = doc[starts]
+            # Pairs of consecutive words in the same text; the multiply makes (a, b) differ from (b, a)
+            same = word_docs[1:] == word_docs[:-1]
+            pairs = ((words[:-1][same] * _BIGRAM_MIX) ^ words[1:][same]) * _GOLDEN
+        return [(words, word_docs, _WORD_WEIGHT), (pairs, word_docs[1:][same], _BIGRAM_WEIGHT)]
+
+    def _trigrams(self, data: np.ndarray, doc: np.ndarray) -> _Features:
+        """Hashed character trigrams that lie within one text, with their texts and weight."""
+        wide = data.astype(np.uint32)
+        codes = (wide[:-2] << 16) | (wide[1:-1] << 8) | wide[2:]
+        keep = (doc[:-2] == doc[2:]) & (codes != 0x202020)  # not three separators
+        with np.errstate(over="ignore"):
+            # The 1 << 24 offset keeps trigram hashes apart from word hashes of the same bytes
+            hashes = (codes[keep].astype(np.uint64) + np.uint64(1 << 24)) * _GOLDEN
+        return hashes, doc[:-2][keep], _TRIGRAM_WEIGHT
@@ -3,8 +3,10 @@
 import logging
 import re
 from pathlib import Path
+from typing import Iterator
 
 from rag.config import EMAILS_DIR
+from rag.mailbox import is_mailbox, iso_date, iter_mailbox
 from rag.models import ParsedEmail
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,7 @@ logger = logging.getLogger(__name__)
 # Pattern: "From: Name <email>" or "To: Name <email>"
 FROM_TO_PATTERN = re.compile(r"^(From|To):\s*(.+?)\s*<(.+?)>\s*$", re.IGNORECASE)
 SUBJECT_PATTERN = re.compile(r"^Subject:\s*(.+)$", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"^Date:\s*(.+)$", re.IGNORECASE)
 
 
 def parse_email_content(content: str, source_file: str) -> ParsedEmail | None:
@@ -25,6 +28,7 @@ def parse_email_content(content: str, source_file: str) -> ParsedEmail | None:
     from_email = ""
     to_name = ""
     to_email = ""
+    date = ""
     body_lines: list[str] = []
     header_done = False
 
@@ -34,6 +38,10 @@ def parse_email_content(content: str, source_file: str) -> ParsedEmail | None:
             if sub_m:
                 subject = sub_m.group(1).strip()
                 continue
+            date_m = DATE_PATTERN.match(line.strip())
+            if date_m:
+                date = iso_date(date_m.group(1))
+                continue
             ft_m = FROM_TO_PATTERN.match(line.strip())
             if ft_m:
                 label, name, email = ft_m.group(1), ft_m.group(2).strip(), ft_m.group(3).strip()
@@ -61,6 +69,7 @@ def parse_email_content(content: str, source_file: str) -> ParsedEmail | None:
         to_name=to_name,
         to_email=to_email,
         body=body,
+        date=date,
     )
 
 
@@ -74,23 +83,40 @@ def load_email_file(path: Path) -> ParsedEmail | None:
         return None
 
 
-def load_all_emails(emails_dir: Path | None = None) -> list[ParsedEmail]:
+def iter_all_emails(emails_dir: Path | None = None) -> Iterator[ParsedEmail]:
     """
-    Load all email_*.txt files from the given directory.
-    Returns list of successfully parsed emails; logs and skips failures.
+    Parsed emails from the given directory, one at a time: the email_*.txt files first,
+    then, if the path is an mbox or .eml file, a Maildir, or a directory of .eml / mbox
+    files, the messages streamed through rag.mailbox (a warning if a directory holds both).
+    Logs and skips failures. Emails are yielded as they are parsed, so `index` never holds
+    the whole mailbox. A missing directory raises at the call, not on the first email.
     """
     directory = emails_dir or EMAILS_DIR
     if not directory.exists():
         raise FileNotFoundError(f"Emails directory not found: {directory}")
+    paths = sorted(directory.glob("email_*.txt")) if directory.is_dir() else []
+    mailbox = is_mailbox(directory)
+    if mailbox and paths:
+        logger.warning("%s holds both email_*.txt files and a mailbox; loading both", directory)
+    return _iter_emails(directory, paths, mailbox)
+
 
-    emails: list[ParsedEmail] = []
-    paths = sorted(directory.glob("email_*.txt"))
+def _iter_emails(directory: Path, paths: list[Path], mailbox: bool) -> Iterator[ParsedEmail]:
+    loaded = 0
     for path in paths:
         parsed = load_email_file(path)
         if parsed:
-            emails.append(parsed)
+            loaded += 1
+            yield parsed
         else:
             logger.warning("Skipped unparseable file: %s", path.name)
+    if mailbox:
+        for parsed in iter_mailbox(directory):
+            loaded += 1
+            yield parsed
+    logger.info("Loaded %d emails from %s", loaded, directory)
 
-    logger.info("Loaded %d emails from %s", len(emails), directory)
-    return emails
+
+def load_all_emails(emails_dir: Path | None = None) -> list[ParsedEmail]:
+    """All emails from the given directory as a list (see iter_all_emails)."""
+    return list(iter_all_emails(emails_dir))
@@ -0,0 +1,339 @@
+"""Resilient Mistral calls: jittered retries, hedged requests, a circuit breaker and a client-side rate limit."""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, TypeVar
+
+from rag.config import (
+    LLM_BACKOFF_BASE_MS,
+    LLM_BACKOFF_MAX_MS,
+    LLM_BREAKER_FAILURES,
+    LLM_BREAKER_RESET_S,
+    LLM_HEDGE,
+    LLM_HEDGE_MIN_SAMPLES,
+    LLM_HEDGE_QUANTILE,
+    LLM_MAX_RETRIES,
+    LLM_RATE_LIMIT_BURST,
+    LLM_RATE_LIMIT_RPS,
+    MISTRAL_SERVER_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_LATENCY_WINDOW = 200  # recent successful call latencies kept for the hedge delay
+
+
+class CircuitOpenError(RuntimeError):
+    """The breaker is open: recent calls failed, so optional calls are not attempted."""
+
+
+def client_options() -> dict[str, Any]:
+    """Keyword arguments for Mistral(...) besides the key: a custom server URL (e.g. a local mock)."""
+    return {"server_url": MISTRAL_SERVER_URL} if MISTRAL_SERVER_URL else {}
+
+
+def lazy_mistral(namespace: dict[str, Any]) -> Callable[..., Any]:
+    """
+    A getter for the Mistral client class that imports the SDK on first use (it takes about a
+    second) and caches it as `Mistral` in `namespace`, a module's globals. Also usable as that
+    module's __getattr__, so `module.Mistral` stays a patchable attribute.
+    """
+
+    def get(name: str = "Mistral") -> Any:
+        if name != "Mistral":
+            raise AttributeError(f"module {namespace['__name__']!r} has no attribute {name!r}")
+        if "Mistral" not in namespace:
+            from mistralai import Mistral
+
+            namespace["Mistral"] = Mistral
+        return namespace["Mistral"]
+
+    return get
+
+
+def retryable(error: BaseException) -> bool:
+    """Timeouts, network errors, 408, 429 and 5xx are worth retrying; other errors are not."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in (408, 429) or status >= 500
+    import httpx  # already loaded by the SDK that raised; kept out of rag.llm's import cost
+
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+def _retry_after_ms(error: BaseException) -> float:
+    """Retry-After (seconds) of a 429/503 response, in ms; 0 if absent."""
+    response = getattr(error, "raw_response", None)
+    try:
+        return max(0.0, float(response.headers.get("retry-after", 0))) * 1000.0
+    except (AttributeError, TypeError, ValueError):
+        return 0.0
+
+
+def backoff_ms(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^attempt)]."""
+    return random.uniform(0.0, min(LLM_BACKOFF_MAX_MS, LLM_BACKOFF_BASE_MS * (2**attempt)))
+
+
+class TokenBucket:
+    """Client-side rate limit: `rate` requests per second on average, bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout_s: float | None = None) -> bool:
+        """Take a token, waiting up to timeout_s (None: as long as needed); False if none came in time."""
+        if self.rate <= 0:
+            return True
+        give_up = None if timeout_s is None else time.monotonic() + timeout_s
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait_s = (1 - self._tokens) / self.rate
+            if give_up is not None:
+                if time.monotonic() + wait_s > give_up:
+                    return False
+            time.sleep(wait_s)
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. `failures` consecutive retryable failures open it; while open,
+    allow() is False for `reset_s` seconds, then one probe call is let through (half-open).
+    A success closes the breaker, a failed probe opens it again.
+    """
+
+    def __init__(self, failures: int, reset_s: float):
+        self.failures = max(1, failures)
+        self.reset_s = reset_s
+        self._consecutive = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or time.monotonic() - self._opened_at >= self.reset_s:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_s:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("LLM circuit breaker closed")
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._probing or (self._opened_at is None and self._consecutive >= self.failures):
+                if self._opened_at is None:
+                    logger.warning("LLM circuit breaker opened after %d consecutive failures", self._consecutive)
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class LatencyTracker:
+    """Latencies (ms) of recent successful calls; quantiles drive the hedge delay."""
+
+    def __init__(self, window: int = _LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, ms: float) -> None:
+        with self._lock:
+            self._samples.append(ms)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> float | None:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class LLMGuard:
+    """
+    Shared state for one LLM service: breaker, token bucket and latency history, and
+    call(), which runs a request with retries and optional hedging under that state.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_retries: int | None = None,
+        hedge: bool | None = None,
+        hedge_quantile: float | None = None,
+        hedge_min_samples: int | None = None,
+        breaker: CircuitBreaker | None = None,
+        bucket: TokenBucket | None = None,
+    ):
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.hedge = LLM_HEDGE if hedge is None else hedge
+        self.hedge_quantile = hedge_quantile or LLM_HEDGE_QUANTILE
+        self.hedge_min_samples = LLM_HEDGE_MIN_SAMPLES if hedge_min_samples is None else hedge_min_samples
+        self.breaker = breaker or CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_S)
+        self.bucket = bucket or TokenBucket(LLM_RATE_LIMIT_RPS, LLM_RATE_LIMIT_BURST)
+        self.latencies = LatencyTracker()
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        self.retries = 0
+        self.hedges = 0
+
+    def hedge_delay_ms(self) -> float | None:
+        """Observed latency quantile, once enough calls were seen; None: do not hedge yet."""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
+
+    def call(
+        self,
+        request: Callable[[int | None], T],
+        *,
+        operation: str = "llm",
+        timeout_ms: float | None = None,
+        optional: bool = False,
+    ) -> T:
+        """
+        Run request(attempt_timeout_ms) until it succeeds, retrying retryable errors with
+        jittered backoff (honouring Retry-After) within timeout_ms overall, if given.
+        While the breaker is open, optional calls raise CircuitOpenError without a request;
+        required calls get a single attempt (no retries or hedge) that doubles as a probe.
+        """
+        give_up = None if timeout_ms is None else time.monotonic() + timeout_ms / 1000.0
+        open_circuit = not self.breaker.allow()
+        if open_circuit and optional:
+            raise CircuitOpenError(f"{operation}: LLM circuit breaker is open")
+        attempts = 1 if open_circuit else self.max_retries + 1
+
+        def left_ms() -> float | None:
+            return None if give_up is None else (give_up - time.monotonic()) * 1000.0
+
+        attempt = 0
+        while True:
+            remaining = left_ms()
+            if not self.bucket.acquire(None if remaining is None else max(0.0, remaining) / 1000.0):
+                raise TimeoutError(f"{operation}: rate limit left no time for a request")
+            try:
+                result = self._attempt(request, left_ms(), hedge=not open_circuit)
+            except Exception as e:
+                if not retryable(e):
+                    self.breaker.record_success()  # the service answered; the request itself is at fault
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                delay = max(backoff_ms(attempt - 1), _retry_after_ms(e))
+                remaining = left_ms()
+                if attempt >= attempts or (remaining is not None and delay >= remaining):
+                    logger.warning("%s failed after %d attempt(s): %s", operation, attempt, e)
+                    raise
+                self.retries += 1
+                logger.warning("%s failed (%s); retry %d in %.0f ms", operation, e, attempt, delay)
+                time.sleep(delay / 1000.0)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def _attempt(self, request: Callable[[int | None], T], remaining_ms: float | None, *, hedge: bool) -> T:
+        """One attempt; with hedging, a second identical request after the hedge delay, first success wins."""
+        timeout = None if remaining_ms is None else max(1, int(remaining_ms))
+        delay = self.hedge_delay_ms() if hedge else None
+        started = time.perf_counter()
+        if delay is None or (remaining_ms is not None and delay >= remaining_ms):
+            result = request(timeout)
+            self.latencies.record((time.perf_counter() - started) * 1000.0)
+            return result
+
+        first = self._pool.submit(request, timeout)
+        done, _ = wait([first], timeout=delay / 1000.0)
+        pending: set[Future] = {first}
+        if not done and self.bucket.try_acquire():
+            self.hedges += 1
+            logger.info("LLM call slower than p%.0f (%.0f ms); sending a hedged request", 100 * self.hedge_quantile, delay)
+            hedge_timeout = None if timeout is None else max(1, timeout - int(delay))
+            pending.add(self._pool.submit(request, hedge_timeout))
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    self.latencies.record((time.perf_counter() - started) * 1000.0)
+                    return future.result()
+                error = error or future.exception()
+        assert error is not None
+        raise error
+
+
+_guard: LLMGuard | None = None
+_guard_lock = threading.Lock()
+
+
+def guard() -> LLMGuard:
+    """The process-wide guard shared by planning and generation (same service, same quota)."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = LLMGuard()
+        return _guard
+
+
+def complete_chat(
+    client: Any,
+    *,
+    operation: str,
+    timeout_ms: float | None = None,
+    optional: bool = False,
+    llm_guard: LLMGuard | None = None,
+    **request: Any,
+) -> Any:
+    """client.chat.complete(**request) through the guard; each attempt gets the time left as timeout_ms."""
+    return (llm_guard or guard()).call(
+        lambda attempt_timeout_ms: client.chat.complete(**request, timeout_ms=attempt_timeout_ms),
+        operation=operation,
+        timeout_ms=timeout_ms,
+        optional=optional,
+    )
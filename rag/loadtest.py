@@ -0,0 +1,122 @@
+"""Load driver: concurrent ask traffic with throughput and latency percentiles."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Sequence
+
+from rag.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS = (
+    "What did Helen Powell ask Nico about?",
+    "Which emails discuss the budget approval?",
+    "When is the next team meeting and what is on the agenda?",
+    "Summarize the training opportunities mentioned in the emails.",
+    "Who asked for feedback on the project proposal?",
+)
+
+
+@dataclass
+class LoadReport:
+    """Outcome of a load run; latencies cover successful requests only."""
+
+    concurrency: int
+    elapsed_s: float = 0.0
+    latencies_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+    degraded: int = 0
+    error_types: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies_ms) + self.errors
+
+    @property
+    def throughput(self) -> float:
+        """Completed requests per second (errors included)."""
+        return self.requests / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def percentiles(self, qs: Sequence[float] = (50, 90, 95, 99)) -> dict[float, float]:
+        ordered = sorted(self.latencies_ms)
+        return {q: percentile(ordered, q) for q in qs}
+
+    def summary(self) -> str:
+        pct = "  ".join(f"p{q:g}={ms:.0f}ms" for q, ms in self.percentiles().items())
+        lines = [
+            f"{self.requests} requests at concurrency {self.concurrency} in {self.elapsed_s:.1f}s "
+            f"({self.throughput:.1f} req/s)",
+            f"latency: {pct}  max={max(self.latencies_ms, default=0.0):.0f}ms",
+            f"errors: {self.errors}  degraded answers: {self.degraded}",
+        ]
+        if self.error_types:
+            lines.append("error types: " + ", ".join(f"{k}={v}" for k, v in sorted(self.error_types.items())))
+        return "\n".join(lines)
+
+
+def run_load(
+    ask: Callable[[str], Any],
+    questions: Sequence[str] = DEFAULT_QUESTIONS,
+    *,
+    concurrency: int = 8,
+    requests: int | None = 100,
+    duration_s: float | None = None,
+    warmup: int = 0,
+) -> LoadReport:
+    """
+    Call ask(question) from `concurrency` threads, cycling through questions, until
+    `requests` calls have been made or `duration_s` has passed (whichever comes first).
+    `warmup` calls run first, sequentially, and are not measured (model load, caches).
+    A result with a truthy `degraded` attribute (AskResponse) counts as degraded.
+    """
+    if not questions:
+        raise ValueError("No questions to send")
+    if requests is None and duration_s is None:
+        raise ValueError("Give requests or duration_s (or both)")
+    for i in range(warmup):
+        ask(questions[i % len(questions)])
+
+    report = LoadReport(concurrency=concurrency)
+    lock = threading.Lock()
+    issued = 0
+    started = time.perf_counter()
+    stop_at = None if duration_s is None else started + duration_s
+
+    def next_question() -> str | None:
+        nonlocal issued
+        with lock:
+            if requests is not None and issued >= requests:
+                return None
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                return None
+            issued += 1
+            return questions[(issued - 1) % len(questions)]
+
+    def worker() -> None:
+        while (question := next_question()) is not None:
+            t0 = time.perf_counter()
+            try:
+                result = ask(question)
+            except Exception as e:  # noqa: BLE001 - counted, the run goes on
+                with lock:
+                    report.errors += 1
+                    name = type(e).__name__
+                    report.error_types[name] = report.error_types.get(name, 0) + 1
+                logger.debug("Request failed: %s", e)
+                continue
+            ms = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                report.latencies_ms.append(ms)
+                if getattr(result, "degraded", False):
+                    report.degraded += 1
+
+    threads = [threading.Thread(target=worker, name=f"load-{i}") for i in range(max(1, concurrency))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    report.elapsed_s = time.perf_counter() - started
+    logger.info("Load run finished: %d requests, %.1f req/s", report.requests, report.throughput)
+    return report
@@ -0,0 +1,155 @@
+"""Precomputed email metadata: posting lists and counts per sender, recipient and subject."""
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from rag.config import METADATA_INDEX_DIR, QDRANT_COLLECTION_NAME
+from rag.models import ParsedEmail
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Indexed fields; each maps a normalized key to the emails (row numbers) that carry it
+FIELDS = ("from", "to", "subject")
+# Row column holding each field's payload value
+_ROW_FIELDS = {"source_file": 0, "subject": 1, "from": 2, "to": 3}
+
+
+def normalize(value: str) -> str:
+    """Lookup key: lowercased, surrounding quotes/angle brackets/punctuation and extra spaces removed."""
+    return " ".join(value.strip().strip("\"'<>.,;:?!").lower().split())
+
+
+def _person_keys(name: str, address: str) -> set[str]:
+    """A person is found by name, by address, or by the "Name <address>" display form."""
+    keys = {normalize(name), normalize(address), normalize(f"{name} <{address}>")}
+    keys.discard("")
+    return keys
+
+
+@dataclass
+class MetadataIndex:
+    """
+    One row per email (source_file, subject, from display, to display) and, per field,
+    posting lists from normalized key to row numbers. Counts are the posting list lengths.
+    """
+
+    rows: list[tuple[str, str, str, str]] = field(default_factory=list)
+    postings: dict[str, dict[str, list[int]]] = field(default_factory=lambda: {f: {} for f in FIELDS})
+    # Display form per person key (for answers), e.g. "helen powell" -> "Helen Powell <helen.powell@tech.io>"
+    display: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, emails: Iterable[ParsedEmail]) -> "MetadataIndex":
+        index = cls()
+        for email in emails:
+            index.add(email)
+        index.log_summary()
+        return index
+
+    def add(self, email: ParsedEmail) -> None:
+        """Append one email as the next row (lets `index` fill the index while streaming emails)."""
+        row = len(self.rows)
+        sender, recipient = email.from_display(), email.to_display()
+        self.rows.append((email.source_file, email.subject, sender, recipient))
+        for key in _person_keys(email.from_name, email.from_email):
+            self.postings["from"].setdefault(key, []).append(row)
+            self.display.setdefault(key, sender)
+        for key in _person_keys(email.to_name, email.to_email):
+            self.postings["to"].setdefault(key, []).append(row)
+            self.display.setdefault(key, recipient)
+        subject = normalize(email.subject)
+        if subject:
+            self.postings["subject"].setdefault(subject, []).append(row)
+            self.display.setdefault(subject, email.subject)
+
+    def log_summary(self) -> None:
+        logger.info(
+            "Metadata index: %d emails, %d senders, %d recipients, %d subjects",
+            len(self.rows),
+            len({self.display[k] for k in self.postings["from"]}),
+            len({self.display[k] for k in self.postings["to"]}),
+            len(self.postings["subject"]),
+        )
+
+    @classmethod
+    def merge(cls, indexes: Iterable["MetadataIndex"]) -> "MetadataIndex":
+        """One index over several (e.g. one per shard): rows concatenated, postings renumbered."""
+        merged = cls()
+        for index in indexes:
+            offset = len(merged.rows)
+            merged.rows.extend(index.rows)
+            for field_name, postings in index.postings.items():
+                target = merged.postings.setdefault(field_name, {})
+                for key, rows in postings.items():
+                    target.setdefault(key, []).extend(row + offset for row in rows)
+            for key, shown in index.display.items():
+                merged.display.setdefault(key, shown)
+        return merged
+
+    def lookup(self, field_name: str, value: str) -> list[int] | None:
+        """Rows whose `field_name` matches value (None if the value is unknown)."""
+        return self.postings[field_name].get(normalize(value))
+
+    def count(self, field_name: str, value: str) -> int:
+        return len(self.lookup(field_name, value) or [])
+
+    def values(self, field_name: str) -> set[str]:
+        """Distinct payload values of a field exactly as stored in Qdrant (every spelling, not one per key)."""
+        if field_name not in _ROW_FIELDS:
+            raise ValueError(f"No metadata values for field {field_name!r}")
+        column = _ROW_FIELDS[field_name]
+        return {row[column] for row in self.rows}
+
+    def top(self, field_name: str, n: int = 5) -> list[tuple[str, int]]:
+        """Most frequent values of a field as (display, count); aliases of one person count once."""
+        counts: dict[str, int] = {}
+        for key, rows in self.postings[field_name].items():
+            name = self.display.get(key, key)
+            counts[name] = max(counts.get(name, 0), len(rows))
+        return sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+    def to_dict(self) -> dict:
+        return {
+            "format_version": FORMAT_VERSION,
+            "rows": self.rows,
+            "postings": self.postings,
+            "display": self.display,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MetadataIndex":
+        if data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported metadata index version: {data.get('format_version')}")
+        return cls(
+            rows=[tuple(r) for r in data["rows"]],
+            postings=data["postings"],
+            display=data["display"],
+        )
+
+
+def metadata_index_path(collection_name: str | None = None) -> Path:
+    return METADATA_INDEX_DIR / f"{collection_name or QDRANT_COLLECTION_NAME}.json"
+
+
+def save_metadata_index(index: MetadataIndex, collection_name: str | None = None) -> Path:
+    """Write atomically (temp file + rename) so a reader never sees a partial index."""
+    path = metadata_index_path(collection_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(index.to_dict(), ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    logger.info("Saved metadata index to %s", path)
+    return path
+
+
+def load_metadata_index(collection_name: str | None = None) -> MetadataIndex | None:
+    """The saved index for a collection, or None if `index` has not written one yet."""
+    path = metadata_index_path(collection_name)
+    if not path.exists():
+        return None
+    return MetadataIndex.from_dict(json.loads(path.read_text(encoding="utf-8")))
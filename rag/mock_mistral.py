@@ -0,0 +1,272 @@
+"""
+Local stand-in for the Mistral chat API (OpenAI-compatible /v1/chat/completions) for offline
+load and latency tests: sampled latency, streaming, injected errors, deterministic answers.
+
+  python -m rag.mock_mistral --port 8089 --latency lognormal:400:0.5 --error-rate 0.02
+  MISTRAL_SERVER_URL=http://127.0.0.1:8089 MISTRAL_API_KEY=mock python cli.py ask "..."
+"""
+
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+_SOURCE = re.compile(r"\[Source \d+ — ([^|\]]+?)\s*(?:\||\])")
+_QUESTION = re.compile(r"^Question:\s*(.+)$", re.MULTILINE)
+_STREAM_CHUNKS = 8  # streamed responses are split into this many content deltas
+LATENCY_SPECS = "constant:MS, uniform:LO:HI, lognormal:MEDIAN:SIGMA or exponential:MEAN (milliseconds)"
+
+
+@dataclass(frozen=True)
+class LatencyModel:
+    """Response time distribution, parsed from "kind:args" (see LATENCY_SPECS)."""
+
+    kind: str = "constant"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        kind, _, rest = spec.partition(":")
+        args = [float(x) for x in rest.split(":") if x]
+        needed = {"constant": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+        if kind not in needed or len(args) != needed[kind]:
+            raise ValueError(f"Bad latency spec {spec!r}; expected {LATENCY_SPECS}")
+        return cls(kind, *args)
+
+    def sample_ms(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return self.a * math.exp(rng.gauss(0.0, self.b))
+        if self.kind == "exponential":
+            return rng.expovariate(1.0 / self.a) if self.a > 0 else 0.0
+        return self.a
+
+
+def plan_reply(question: str) -> str:
+    """Deterministic planner JSON: the question, plus its parts when it joins topics with "and" / ";"."""
+    parts = [p.strip(" ?.") for p in re.split(r";|\band\b", question) if p.strip(" ?.")]
+    queries = [question] + (parts if len(parts) > 1 else [])
+    return json.dumps({"queries": queries})
+
+
+def answer_reply(prompt: str) -> str:
+    """Deterministic answer naming the question and the sources the prompt carried."""
+    question = _QUESTION.findall(prompt)
+    sources = list(dict.fromkeys(s.strip() for s in _SOURCE.findall(prompt)))
+    cited = f" ({', '.join(sources)})" if sources else ""
+    return f"Mock answer to {question[-1] if question else prompt[:80]!r} from {len(sources)} source(s){cited}."
+
+
+def reply_for(messages: list[dict[str, Any]]) -> str:
+    """Planner requests (system prompt asks for "queries" JSON) get plan JSON; the rest get an answer."""
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    user = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    return plan_reply(user) if '"queries"' in system else answer_reply(user)
+
+
+class MockMistralServer:
+    """
+    Threaded HTTP server answering POST /v1/chat/completions like Mistral. Each request
+    sleeps a latency sampled from `latency`; a fraction `error_rate` gets one of
+    `error_statuses` instead (429s carry Retry-After when `retry_after_s` is set).
+    "stream": true returns server-sent events with the latency spread over the chunks.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        *,
+        latency: str | LatencyModel = "constant:0",
+        error_rate: float = 0.0,
+        error_statuses: tuple[int, ...] = (503,),
+        retry_after_s: float | None = None,
+        seed: int = 0,
+    ):
+        self.latency = LatencyModel.parse(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.retry_after_s = retry_after_s
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _draw(self) -> tuple[float, int | None]:
+        """(latency ms, error status or None) for one request; one lock keeps a seeded run reproducible."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency.sample_ms(self._rng)
+            if self._rng.random() < self.error_rate:
+                self.errors += 1
+                return delay, self._rng.choice(self.error_statuses)
+            return delay, None
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send_json(self, status: int, body: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"message": "invalid JSON"})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"message": f"no route {self.path}"})
+                    return
+                delay_ms, error = server._draw()
+                if error is not None:
+                    time.sleep(delay_ms / 1000.0)
+                    headers = {}
+                    if error == 429 and server.retry_after_s is not None:
+                        headers["Retry-After"] = f"{server.retry_after_s:g}"
+                    self._send_json(error, {"message": f"injected error {error}"}, headers)
+                    return
+                content = reply_for(request.get("messages", []))
+                model = request.get("model", "mock")
+                if request.get("stream"):
+                    self._stream(content, model, delay_ms)
+                    return
+                time.sleep(delay_ms / 1000.0)
+                self._send_json(200, _completion(content, model))
+
+            def _stream(self, content: str, model: str, delay_ms: float) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                size = max(1, math.ceil(len(content) / _STREAM_CHUNKS))
+                pieces = [content[i : i + size] for i in range(0, len(content), size)] or [""]
+                for i, piece in enumerate(pieces):
+                    time.sleep(delay_ms / 1000.0 / len(pieces))
+                    last = i == len(pieces) - 1
+                    chunk = _chunk(piece, model, role=(i == 0), finish=last)
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug("mock mistral: " + format, *args)
+
+        return Handler
+
+    def start(self) -> "MockMistralServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-mistral", daemon=True)
+        self._thread.start()
+        logger.info("Mock Mistral server on %s (latency %s, error rate %.2f)", self.url, self.latency, self.error_rate)
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockMistralServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def _usage(content: str) -> dict[str, int]:
+    tokens = max(1, len(content.split()))
+    return {"prompt_tokens": 1, "completion_tokens": tokens, "total_tokens": tokens + 1}
+
+
+def _completion(content: str, model: str) -> dict[str, Any]:
+    return {
+        "id": "cmpl-mock",
+        "object": "chat.completion",
+        "model": model,
+        "created": int(time.time()),
+        "usage": _usage(content),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+def _chunk(piece: str, model: str, *, role: bool, finish: bool) -> dict[str, Any]:
+    delta: dict[str, Any] = {"content": piece}
+    if role:
+        delta["role"] = "assistant"
+    chunk: dict[str, Any] = {
+        "id": "cmpl-mock",
+        "object": "chat.completion.chunk",
+        "model": model,
+        "created": int(time.time()),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": "stop" if finish else None}],
+    }
+    if finish:
+        chunk["usage"] = _usage(piece)
+    return chunk
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Local Mistral-compatible chat server for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", default="constant:0", help=LATENCY_SPECS)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument(
+        "--error-status",
+        type=int,
+        action="append",
+        help="Injected status code (repeatable; default 503)",
+    )
+    parser.add_argument("--retry-after", type=float, default=None, help="Retry-After seconds on injected 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    server = MockMistralServer(
+        args.host,
+        args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_statuses=tuple(args.error_status or (503,)),
+        retry_after_s=args.retry_after,
+        seed=args.seed,
+    ).start()
+    print(f"Mock Mistral listening on {server.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 """Typed data structures for the RAG pipeline."""
 
+import sys
+from array import array
 from dataclasses import dataclass, field
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ParsedEmail:
     """A single email parsed from disk."""
 
@@ -15,6 +17,7 @@ class ParsedEmail:
     to_name: str
     to_email: str
     body: str
+    date: str = ""  # ISO 8601 (UTC offset kept) from the Date header; empty if absent
 
     def from_display(self) -> str:
         """Display string for 'from' (e.g. 'Name <email>')."""
@@ -25,7 +28,42 @@ class ParsedEmail:
         return f"{self.to_name} <{self.to_email}>"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class SourceRef:
+    """Origin of a chunk's paragraph (one per email when near-duplicates are collapsed)."""
+
+    source_file: str
+    subject: str
+    from_: str
+    to: str
+    paragraph_index: int = 0
+    date: str = ""
+
+    def to_dict(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "source_file": self.source_file,
+            "subject": self.subject,
+            "from": self.from_,
+            "to": self.to,
+            "paragraph_index": self.paragraph_index,
+        }
+        if self.date:
+            out["date"] = self.date
+        return out
+
+
+def chunk_header(subject: str, from_: str, to: str) -> str:
+    """The Subject/From/To lines chunking prepends to every paragraph of an email."""
+    return f"Subject: {subject}\nFrom: {from_}\nTo: {to}\n\n"
+
+
+def _collapse(values: list[str]) -> str | list[str]:
+    """Unique values in order; a single value stays a plain string."""
+    unique = list(dict.fromkeys(values))
+    return unique[0] if len(unique) == 1 else unique
+
+
+@dataclass(slots=True)
 class Chunk:
     """A single chunk with text and metadata for embedding and storage."""
 
@@ -36,24 +74,218 @@ class Chunk:
     from_: str  # sender display (name or email)
     to: str  # receiver display
     paragraph_index: int = 0
+    # Near-duplicate paragraphs collapsed into this chunk at index time (see rag.dedup)
+    duplicates: list[SourceRef] = field(default_factory=list)
+    date: str = ""  # ISO 8601 sent date of the email, if known
 
     def to_metadata(self) -> dict[str, str]:
-        """Payload metadata dict (string values only) for Qdrant."""
-        return {
+        """Payload metadata dict (string values only) for Qdrant; `date` only when known."""
+        metadata = {
             "source_file": self.source_file,
             "subject": self.subject,
             "from": self.from_,
             "to": self.to,
         }
+        if self.date:
+            metadata["date"] = self.date
+        return metadata
+
+    def source_ref(self) -> SourceRef:
+        return SourceRef(
+            source_file=self.source_file,
+            subject=self.subject,
+            from_=self.from_,
+            to=self.to,
+            paragraph_index=self.paragraph_index,
+            date=self.date,
+        )
+
+    def to_payload(self) -> dict[str, Any]:
+        """
+        Qdrant payload: text plus metadata. A collapsed chunk stores each filter field as the
+        list of distinct values over all its sources (keyword filters match any element),
+        canonical source first, plus the full `sources` list.
+        """
+        payload: dict[str, Any] = {"text": self.text, **self.to_metadata()}
+        if self.duplicates:
+            refs = [self.source_ref(), *self.duplicates]
+            payload["source_file"] = _collapse([r.source_file for r in refs])
+            payload["subject"] = _collapse([r.subject for r in refs])
+            payload["from"] = _collapse([r.from_ for r in refs])
+            payload["to"] = _collapse([r.to for r in refs])
+            dates = [r.date for r in refs if r.date]
+            if dates:
+                payload["date"] = _collapse(dates)
+            payload["sources"] = [r.to_dict() for r in refs]
+        return payload
+
+
+@dataclass(slots=True)
+class ChunkBatch:
+    """
+    Chunks stored by column for large corpora. Each email's header strings (interned) and
+    its Subject/From/To text header are stored once, in the email columns; each chunk is
+    a row of (email id, paragraph index, paragraph) in arrays. Chunk text, ids and payloads
+    are built on demand, and slices share the email columns with the batch they came from.
+    Indexing a batch gives a Chunk, iterating gives every Chunk in order.
+    """
+
+    # Email columns, indexed by email id
+    source_files: list[str] = field(default_factory=list)
+    subjects: list[str] = field(default_factory=list)
+    froms: list[str] = field(default_factory=list)
+    tos: list[str] = field(default_factory=list)
+    dates: list[str] = field(default_factory=list)
+    headers: list[str] = field(default_factory=list)
+    # Chunk columns, indexed by row
+    email_ids: array = field(default_factory=lambda: array("I"))
+    paragraph_indexes: array = field(default_factory=lambda: array("I"))
+    paragraphs: list[str] = field(default_factory=list)
+    # Sparse per-row extras: collapsed near-duplicates, ids not of the form "<source_file>_<paragraph>"
+    duplicates: dict[int, list[SourceRef]] = field(default_factory=dict)
+    chunk_ids: dict[int, str] = field(default_factory=dict)
+    _email_keys: dict[tuple[str, ...], int] = field(default_factory=dict, repr=False)
 
+    def __len__(self) -> int:
+        return len(self.paragraphs)
 
-@dataclass
+    def email_id(
+        self,
+        source_file: str,
+        subject: str,
+        from_: str,
+        to: str,
+        date: str = "",
+        header: str | None = None,
+    ) -> int:
+        """Id of the email with these headers, added (strings interned) on first sight."""
+        if header is None:
+            header = chunk_header(subject, from_, to)
+        key = (source_file, subject, from_, to, date, header)
+        found = self._email_keys.get(key)
+        if found is not None:
+            return found
+        eid = len(self.source_files)
+        self._email_keys[key] = eid
+        self.source_files.append(sys.intern(source_file))
+        self.subjects.append(sys.intern(subject))
+        self.froms.append(sys.intern(from_))
+        self.tos.append(sys.intern(to))
+        self.dates.append(sys.intern(date))
+        self.headers.append(header)
+        return eid
+
+    def add_email(self, email: ParsedEmail, paragraphs: Iterable[str]) -> None:
+        """Append one row per paragraph of `email` (paragraph indexes 0, 1, ...)."""
+        eid = self.email_id(email.source_file, email.subject, email.from_display(), email.to_display(), email.date)
+        for i, para in enumerate(paragraphs):
+            self.email_ids.append(eid)
+            self.paragraph_indexes.append(i)
+            self.paragraphs.append(para)
+
+    def add_chunk(self, chunk: Chunk) -> None:
+        """Append a Chunk; text without the usual header keeps its own (empty) header."""
+        header = chunk_header(chunk.subject, chunk.from_, chunk.to)
+        if chunk.text.startswith(header):
+            para = chunk.text[len(header) :]
+        else:
+            header, para = "", chunk.text
+        row = len(self)
+        self.email_ids.append(
+            self.email_id(chunk.source_file, chunk.subject, chunk.from_, chunk.to, chunk.date, header)
+        )
+        self.paragraph_indexes.append(chunk.paragraph_index)
+        self.paragraphs.append(para)
+        if chunk.duplicates:
+            self.duplicates[row] = list(chunk.duplicates)
+        if chunk.chunk_id != f"{chunk.source_file}_{chunk.paragraph_index}":
+            self.chunk_ids[row] = chunk.chunk_id
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Chunk]) -> "ChunkBatch":
+        batch = cls()
+        for chunk in chunks:
+            batch.add_chunk(chunk)
+        return batch
+
+    def text(self, row: int) -> str:
+        return self.headers[self.email_ids[row]] + self.paragraphs[row]
+
+    def texts(self) -> list[str]:
+        """Text of every row (header + paragraph), e.g. for embedding."""
+        headers, ids = self.headers, self.email_ids
+        return [headers[ids[row]] + para for row, para in enumerate(self.paragraphs)]
+
+    def chunk_id(self, row: int) -> str:
+        if row in self.chunk_ids:
+            return self.chunk_ids[row]
+        return f"{self.source_files[self.email_ids[row]]}_{self.paragraph_indexes[row]}"
+
+    def source_ref(self, row: int) -> SourceRef:
+        eid = self.email_ids[row]
+        return SourceRef(
+            source_file=self.source_files[eid],
+            subject=self.subjects[eid],
+            from_=self.froms[eid],
+            to=self.tos[eid],
+            paragraph_index=self.paragraph_indexes[row],
+            date=self.dates[eid],
+        )
+
+    def __getitem__(self, row: int) -> Chunk:
+        if row < 0:
+            row += len(self)
+        eid = self.email_ids[row]
+        return Chunk(
+            chunk_id=self.chunk_id(row),
+            text=self.text(row),
+            source_file=self.source_files[eid],
+            subject=self.subjects[eid],
+            from_=self.froms[eid],
+            to=self.tos[eid],
+            paragraph_index=self.paragraph_indexes[row],
+            duplicates=self.duplicates.get(row, []),
+            date=self.dates[eid],
+        )
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return (self[row] for row in range(len(self)))
+
+    def payloads(self) -> list[dict[str, Any]]:
+        """Qdrant payload of every row (see Chunk.to_payload)."""
+        return [chunk.to_payload() for chunk in self]
+
+    def take(self, rows: Iterable[int]) -> "ChunkBatch":
+        """The given rows, in that order, as a batch sharing this batch's email columns."""
+        rows = list(rows)
+        ids, para_idx, paragraphs = self.email_ids, self.paragraph_indexes, self.paragraphs
+        return ChunkBatch(
+            source_files=self.source_files,
+            subjects=self.subjects,
+            froms=self.froms,
+            tos=self.tos,
+            dates=self.dates,
+            headers=self.headers,
+            email_ids=array("I", (ids[r] for r in rows)),
+            paragraph_indexes=array("I", (para_idx[r] for r in rows)),
+            paragraphs=[paragraphs[r] for r in rows],
+            duplicates={new: self.duplicates[old] for new, old in enumerate(rows) if old in self.duplicates},
+            chunk_ids={new: self.chunk_ids[old] for new, old in enumerate(rows) if old in self.chunk_ids},
+            _email_keys=self._email_keys,
+        )
+
+    def slice(self, start: int, stop: int) -> "ChunkBatch":
+        return self.take(range(start, min(stop, len(self))))
+
+
+@dataclass(slots=True)
 class RetrieveResult:
-    """One retrieved chunk with metadata and optional distance."""
+    """One retrieved chunk with metadata, optional distance and its Qdrant point id (if from Qdrant)."""
 
     text: str
     metadata: dict[str, Any]
     distance: float | None = None
+    point_id: str | None = None
 
     @property
     def source_file(self) -> str:
@@ -70,3 +302,25 @@ class RetrieveResult:
     @property
     def to(self) -> str:
         return self.metadata.get("to", "")
+
+
+@dataclass(slots=True)
+class AskResponse:
+    """
+    Answer of RAGPipeline.ask and its context; unpacks like an (answer, results) tuple.
+    degradations lists what a deadline forced, in the order applied (see rag.deadline);
+    timings_ms holds the wall time of each stage that ran; queries the planned searches.
+    """
+
+    answer: str
+    results: list[RetrieveResult]
+    degradations: list[str] = field(default_factory=list)
+    timings_ms: dict[str, float] = field(default_factory=dict)
+    queries: list[str] = field(default_factory=list)
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.degradations)
+
+    def __iter__(self):
+        return iter((self.answer, self.results))
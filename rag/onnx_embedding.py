@@ -0,0 +1,162 @@
+"""ONNX Runtime embedding backend: export the sentence-transformers model once, optionally int8-quantize, run on CPU."""
+
+import json
+import logging
+import re
+from pathlib import Path
+
+import numpy as np
+
+from rag.config import EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_DIR, EMBEDDING_NUM_THREADS
+
+logger = logging.getLogger(__name__)
+
+ONNX_OPSET = 14
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+EXPORT_INFO_FILE = "export.json"
+
+
+def export_dir(model_name: str) -> Path:
+    """Cache directory for a model's ONNX export (tokenizer files live alongside)."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_")
+    return EMBEDDING_CACHE_DIR / safe / "onnx"
+
+
+def _export_fp32(model_name: str, out_dir: Path) -> None:
+    """
+    Trace the full sentence-transformers stack (transformer + pooling + normalize)
+    so ONNX outputs are the same sentence embeddings the torch backend returns.
+    """
+    import torch
+
+    from rag.embedding import load_sentence_transformer
+
+    st_model = load_sentence_transformer(model_name)
+    st_model.eval()
+
+    class _SentenceEmbedding(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            features = self.model({"input_ids": input_ids, "attention_mask": attention_mask})
+            return features["sentence_embedding"]
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = st_model.tokenizer
+    tokenizer.save_pretrained(str(out_dir))
+    max_seq_length = int(st_model.max_seq_length)
+    dummy = tokenizer(
+        ["export sample", "a second, slightly longer export sample"],
+        padding=True,
+        truncation=True,
+        max_length=max_seq_length,
+        return_tensors="pt",
+    )
+    with torch.no_grad():
+        torch.onnx.export(
+            _SentenceEmbedding(st_model),
+            (dummy["input_ids"], dummy["attention_mask"]),
+            str(out_dir / FP32_FILE),
+            input_names=["input_ids", "attention_mask"],
+            output_names=["sentence_embedding"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "sentence_embedding": {0: "batch"},
+            },
+            opset_version=ONNX_OPSET,
+        )
+    info = {
+        "model": model_name,
+        "max_seq_length": max_seq_length,
+        "dimension": int(st_model.get_sentence_embedding_dimension()),
+    }
+    (out_dir / EXPORT_INFO_FILE).write_text(json.dumps(info, indent=2), encoding="utf-8")
+    logger.info("Exported %s to ONNX at %s", model_name, out_dir)
+
+
+def export_onnx(model_name: str, *, quantize: bool = False) -> Path:
+    """
+    Export model to ONNX under EMBEDDING_CACHE_DIR (once) and return the model file path.
+    With quantize=True, also produce a dynamic int8 variant (weights int8, activations quantized on the fly).
+    """
+    out_dir = export_dir(model_name)
+    fp32_path = out_dir / FP32_FILE
+    if not fp32_path.exists():
+        _export_fp32(model_name, out_dir)
+    if not quantize:
+        return fp32_path
+
+    int8_path = out_dir / INT8_FILE
+    if not int8_path.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+        logger.info("Quantized ONNX model to int8: %s", int8_path)
+    return int8_path
+
+
+class OnnxEncoder:
+    """Sentence encoder backed by an ONNX Runtime CPU session; needs no torch and no network."""
+
+    def __init__(self, model_path: Path, *, num_threads: int = 0, batch_size: int = 32):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = model_path.parent
+        info = json.loads((model_dir / EXPORT_INFO_FILE).read_text(encoding="utf-8"))
+        self.max_seq_length: int = info["max_seq_length"]
+        self.dimension: int = info["dimension"]
+        self.batch_size = batch_size
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self._session = ort.InferenceSession(
+            str(model_path), options, providers=["CPUExecutionProvider"]
+        )
+        # Tokenizer files were saved next to the export, so this never touches the hub
+        self._tokenizer = AutoTokenizer.from_pretrained(str(model_dir), local_files_only=True)
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Embed texts; batches are length-sorted so padding per batch stays small."""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        out = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start : start + self.batch_size]
+            enc = self._tokenizer(
+                [texts[i] for i in idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {
+                "input_ids": enc["input_ids"].astype(np.int64),
+                "attention_mask": enc["attention_mask"].astype(np.int64),
+            }
+            out[idx] = self._session.run(["sentence_embedding"], feeds)[0]
+        return out
+
+
+def load_onnx_encoder(model_name: str, *, quantize: bool = False) -> OnnxEncoder:
+    """Export (if needed) and open an ONNX Runtime encoder for model_name."""
+    path = export_onnx(model_name, quantize=quantize)
+    logger.info(
+        "Loading ONNX embedding backend: %s (threads=%s)",
+        path,
+        EMBEDDING_NUM_THREADS or "default",
+    )
+    return OnnxEncoder(path, num_threads=EMBEDDING_NUM_THREADS, batch_size=EMBEDDING_BATCH_SIZE)
@@ -1,17 +1,49 @@
 """End-to-end RAG pipeline: index and query."""
 
 import logging
+import time
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
 
-from rag.chunking import chunk_emails
-from rag.config import EMAILS_DIR, TOP_K
+from rag.answer_store import AnswerStore
+from rag.chunking import chunk_batch, resolve_strategy
+from rag.config import (
+    ANSWER_STORE_ENABLED,
+    ASK_DEADLINE_MS,
+    ASK_GENERATE_MS_PER_RESULT,
+    ASK_MIN_GENERATE_MS,
+    ASK_MIN_PLAN_MS,
+    ASK_PLAN_SHARE,
+    ASK_RETRIEVE_SHARE,
+    DEDUP_ENABLED,
+    EMAILS_DIR,
+    QDRANT_COLLECTION_NAME,
+    QUERY_LOG_ENABLED,
+    ROUTER_ENABLED,
+    SEMANTIC_CACHE_ENABLED,
+    TOP_K,
+)
+from rag.deadline import (
+    DROP_QUERIES,
+    EXTRACTIVE_ANSWER,
+    LOWER_TOP_K,
+    SKIP_PLANNING,
+    Deadline,
+    run_with_timeout,
+)
+from rag.dedup import dedupe_batch
+from rag.extractive import extractive_answer
 from rag.generate import generate
-from rag.ingest import load_all_emails
-from rag.models import Chunk, ParsedEmail, RetrieveResult
+from rag.ingest import iter_all_emails, load_all_emails
+from rag.llm import CircuitOpenError, retryable
+from rag.metadata_index import MetadataIndex, load_metadata_index, save_metadata_index
+from rag.models import AskResponse, Chunk, ParsedEmail, RetrieveResult
+from rag.profiling import stage
+from rag.query_log import QueryLog, frequent_questions, normalize_question, scope_key, window_start
 from rag.query_plan import plan_queries
-from rag.retrieve import retrieve
-from rag.store import build_store_from_chunks
+from rag.router import route
+from rag.semantic_cache import SemanticCache
+from rag.sharding import Shard, configured_shards, fan_out, route_shards, select_shards, shard_emails
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +67,66 @@ def _merge_and_dedupe_results(
     return merged[:top_k]
 
 
+def _elapsed_ms(started: float) -> float:
+    return (time.perf_counter() - started) * 1000.0
+
+
+def _via(response: AskResponse) -> str:
+    """How a response was produced, from its stage timings: "store", "cache", "route" or "rag"."""
+    if "answer_store" in response.timings_ms:
+        return "store"
+    if "semantic_cache" in response.timings_ms:
+        return "cache"
+    return "route" if "route" in response.timings_ms else "rag"
+
+
+def _recorded(emails: Iterable[ParsedEmail], metadata: MetadataIndex) -> Iterator[ParsedEmail]:
+    """Pass emails through, adding each to the metadata index on the way."""
+    for email in emails:
+        metadata.add(email)
+        yield email
+
+
+def _plan_within(query: str, deadline: Deadline | None, degradations: list[str]) -> list[str]:
+    """Planned queries; under a deadline, the question as asked if planning has no time or runs over."""
+    if deadline is None:
+        return plan_queries(query)
+    allowance = deadline.share_ms(ASK_PLAN_SHARE)
+    if allowance < ASK_MIN_PLAN_MS:
+        logger.info("Planning budget %.0f ms is below ASK_MIN_PLAN_MS; searching the question as asked", allowance)
+    else:
+        try:
+            return run_with_timeout(allowance, plan_queries, query, timeout_ms=int(allowance))
+        except TimeoutError:
+            logger.warning("Query planning exceeded its %.0f ms budget; searching the question as asked", allowance)
+    degradations.append(SKIP_PLANNING)
+    return [query]
+
+
+def _generate_within(
+    query: str,
+    results: list[RetrieveResult],
+    deadline: Deadline | None,
+    degradations: list[str],
+) -> str:
+    """Generated answer; under a deadline, an extractive one if generation cannot finish in time."""
+    if deadline is None:
+        return generate(query, results)
+    remaining = deadline.remaining_ms()
+    if remaining < ASK_MIN_GENERATE_MS:
+        logger.info("%.0f ms left is below ASK_MIN_GENERATE_MS; answering extractively", remaining)
+    else:
+        try:
+            return run_with_timeout(remaining, generate, query, results, timeout_ms=int(remaining))
+        except Exception as e:
+            # Timeouts, an open breaker and transient API errors fall back; anything else is a bug
+            if not isinstance(e, (TimeoutError, CircuitOpenError)) and not retryable(e):
+                raise
+            logger.warning("Generation did not finish within the deadline (%s); answering extractively", e)
+    degradations.append(EXTRACTIVE_ANSWER)
+    return extractive_answer(query, results)
+
+
 class RAGPipeline:
     """
     Single entry point: build index from emails, then answer questions
@@ -45,46 +137,325 @@ class RAGPipeline:
         self,
         emails_dir: Path | None = None,
         collection_name: str | None = None,
+        *,
+        dedup: bool | None = None,
+        collection_profile: str | None = None,
+        shards: list[Shard] | None = None,
+        chunking: str | None = None,
     ):
         self.emails_dir = emails_dir or EMAILS_DIR
         self.collection_name = collection_name
+        self.dedup = DEDUP_ENABLED if dedup is None else dedup
+        self.collection_profile = collection_profile
+        self.chunking = resolve_strategy(chunking)  # CHUNK_STRATEGY unless given
+        # Shard collections (SHARDS / SHARD_HASH_BUCKETS); empty = one unsharded collection
+        self.shards = configured_shards(collection_name) if shards is None else shards
+        self._metadata: MetadataIndex | None = None
+        self._shard_metadata: dict[str, MetadataIndex | None] | None = None
+        self.query_log = QueryLog() if QUERY_LOG_ENABLED else None
+        self.answers = AnswerStore() if ANSWER_STORE_ENABLED else None
+        self.semantic_cache = SemanticCache(collection_name, self.shards) if SEMANTIC_CACHE_ENABLED else None
+
+    @property
+    def answer_collection(self) -> str:
+        """Key of this pipeline's answers in the answer store."""
+        return self.collection_name or QDRANT_COLLECTION_NAME
+
+    def index(self, shard: str | None = None) -> None:
+        """
+        Load emails, chunk, embed (padded to 1536), and store in Qdrant; save the metadata index.
+        When sharded, each shard (or only `shard`) is built into its own collection, one after
+        another; a failed shard does not stop the others, and is reported at the end.
+        """
+        if not self.shards:
+            if shard is not None:
+                raise ValueError("No shards configured (set SHARDS or SHARD_HASH_BUCKETS)")
+            emails = iter_all_emails(self.emails_dir)
+            self._index_emails(emails, self.collection_name, self.emails_dir)
+            self._drop_answers()
+            return
+        shared: list[ParsedEmail] | None = None  # EMAILS_DIR, loaded once for all hash shards
+        failed: list[str] = []
+        for target in select_shards(self.shards, None if shard is None else [shard]):
+            try:
+                if target.emails_dir is not None:
+                    emails = iter_all_emails(target.emails_dir)
+                else:
+                    # Hash shards split one mailbox, so it is parsed once and kept as a list
+                    if shared is None:
+                        with stage("load emails"):
+                            shared = load_all_emails(self.emails_dir)
+                    emails = shard_emails(target, shared)
+                logger.info("Indexing shard %s into %s", target.name, target.collection)
+                self._index_emails(emails, target.collection, target.emails_dir or self.emails_dir)
+            except Exception:
+                logger.exception("Indexing shard %s failed", target.name)
+                failed.append(target.name)
+        self._metadata = None
+        self._shard_metadata = None
+        self._drop_answers()
+        if failed:
+            raise RuntimeError(f"Indexing failed for shard(s): {', '.join(failed)}")
+
+    def _drop_answers(self) -> None:
+        """Precomputed answers describe the old index; `precompute` rebuilds them."""
+        if self.answers is not None:
+            self.answers.clear(self.answer_collection)
+
+    def precompute(
+        self,
+        *,
+        top: int | None = None,
+        min_count: int | None = None,
+        window_days: float | None = None,
+    ) -> int:
+        """
+        Answer the most frequent logged questions (PRECOMPUTE_TOP asked at least
+        PRECOMPUTE_MIN_COUNT times in the last PRECOMPUTE_WINDOW_DAYS) and store the answers,
+        so `ask` returns them instantly. Run after each `index`. Answers that were degraded or
+        found nothing are not stored; a failing question is logged and skipped.
+        Returns how many answers were stored.
+        """
+        if self.answers is None:
+            raise ValueError("Answer store is disabled (ANSWER_STORE=0)")
+        log = self.query_log or QueryLog()
+        questions = frequent_questions(log.entries(since=window_start(window_days)), top=top, min_count=min_count)
+        stored = 0
+        for question, where, shards, count in questions:
+            try:
+                # No deadline: there is no one waiting, so take the full-quality answer
+                response = self.ask(question, where=where, shards=shards, deadline_ms=0, use_store=False, log=False)
+            except Exception as e:  # noqa: BLE001 - one bad question must not stop the job
+                logger.warning("Precompute: %r failed: %s", question, e)
+                continue
+            if response.degradations or not response.results:
+                continue
+            self.answers.put(
+                self.answer_collection, question, scope_key(where, shards), response.answer, response.results
+            )
+            stored += 1
+            logger.debug("Precomputed %r (asked %d times)", question, count)
+        logger.info("Precomputed %d of %d frequent questions", stored, len(questions))
+        return stored
 
-    def index(self) -> None:
-        """Load emails, chunk, embed (padded to 1536), and store in Qdrant."""
-        emails = load_all_emails(self.emails_dir)
-        if not emails:
-            raise ValueError(f"No emails loaded from {self.emails_dir}")
-        chunks = chunk_emails(emails)
-        build_store_from_chunks(chunks, collection_name=self.collection_name)
+    def _index_emails(self, emails: Iterable[ParsedEmail], collection_name: str | None, source: Path) -> None:
+        """
+        One pass over `emails` (a stream from iter_all_emails): each email is added to the
+        metadata index and chunked, then dropped, so memory holds the chunk batch, not the mailbox.
+        """
+        metadata = MetadataIndex()
+        with stage("load + chunk"):
+            chunks = chunk_batch(_recorded(emails, metadata), self.chunking)
+        if not metadata.rows:
+            raise ValueError(f"No emails loaded from {source}")
+        metadata.log_summary()
+        if self.dedup:
+            with stage("dedup"):
+                chunks = dedupe_batch(chunks)
+        with stage("embed + upload"):
+            from rag.store import build_store_from_chunks  # Qdrant client: imported on first use
+
+            build_store_from_chunks(
+                chunks,
+                collection_name=collection_name,
+                profile=self.collection_profile,
+            )
+        # Written after the vector index is live, so routed answers never describe a failed build
+        with stage("save metadata"):
+            save_metadata_index(metadata, collection_name)
+        self._metadata = metadata
         logger.info("Indexing complete: %d chunks", len(chunks))
 
+    def shard_metadata(self) -> dict[str, MetadataIndex | None]:
+        """Saved metadata index per shard name (loaded once); None for a shard not indexed yet."""
+        if self._shard_metadata is None:
+            self._shard_metadata = {s.name: load_metadata_index(s.collection) for s in self.shards}
+        return self._shard_metadata
+
+    def metadata(self) -> MetadataIndex | None:
+        """
+        The metadata index saved by the last `index` run (loaded once), or None.
+        When sharded, the shards' indexes merged into one.
+        """
+        if self._metadata is None:
+            if self.shards:
+                found = [m for m in self.shard_metadata().values() if m is not None]
+                self._metadata = MetadataIndex.merge(found) if found else None
+            else:
+                self._metadata = load_metadata_index(self.collection_name)
+        return self._metadata
+
+    def target_shards(self, where: dict[str, Any] | None = None, names: list[str] | None = None) -> list[Shard]:
+        """Shards a query searches: the named ones (default all), minus those `where` rules out."""
+        return route_shards(select_shards(self.shards, names), where, self.shard_metadata())
+
+    def _search(
+        self,
+        query: str,
+        top_k: int,
+        targets: list[Shard] | None,
+        **kwargs: Any,
+    ) -> list[RetrieveResult]:
+        """retrieve() on the collection, or on every target shard in parallel (top_k merged by score)."""
+        from rag.retrieve import retrieve  # Qdrant client: routed answers never load it
+
+        if targets is None:
+            return retrieve(query, top_k=top_k, collection_name=self.collection_name, **kwargs)
+        vector = None
+        if len(targets) > 1:
+            from rag.embedding import embed_query
+
+            vector = embed_query(query)  # once, not once per shard
+        return fan_out(
+            lambda shard: retrieve(
+                query, top_k=top_k, collection_name=shard.collection, query_vector=vector, **kwargs
+            ),
+            targets,
+            top_k,
+        )
+
+    def route(self, query: str) -> tuple[str, list[RetrieveResult]] | None:
+        """
+        Answer counting / listing questions about senders, recipients and subjects from the
+        metadata index (exact, no LLM or vector search). None if the question needs RAG.
+        """
+        return route(query, self.metadata())
+
     def ask(
         self,
         query: str,
         top_k: int | None = None,
         *,
         where: dict[str, Any] | None = None,
-    ) -> tuple[str, list[RetrieveResult]]:
+        hnsw_ef: int | None = None,
+        exact: bool | None = None,
+        hierarchical: bool | None = None,
+        deadline_ms: float | None = None,
+        shards: list[str] | None = None,
+        use_store: bool = True,
+        log: bool = True,
+    ) -> AskResponse:
         """
-        Plan search queries via Mistral (structured JSON), retrieve for each query,
-        merge and dedupe results, then generate answer from context.
-        Returns (answer, list of retrieved results).
+        Structured metadata questions are answered by `route` when ROUTER_ENABLED and no
+        `where` filter is given. Otherwise plan search queries via Mistral (structured JSON),
+        retrieve for each query, merge and dedupe results, then generate answer from context.
+        hnsw_ef / exact tune search accuracy per call; hierarchical=False searches all
+        paragraphs instead of candidate emails first (see retrieve).
+
+        deadline_ms (default ASK_DEADLINE_MS; 0 = none) bounds the call: planning may use
+        ASK_PLAN_SHARE of the budget, retrieval ASK_RETRIEVE_SHARE, generation the rest.
+        As time runs short it degrades step by step: skip planning, lower top_k (and drop
+        planned queries), then answer extractively from the top chunks instead of generating.
+        Returns AskResponse (unpacks as (answer, results)); degradations lists what was applied.
+
+        When sharded, each query searches the shards named in `shards` (default: all) that
+        `where` does not rule out, in parallel, and their results are merged by score.
+        Naming shards also skips the router, whose counts cover every shard.
+
+        With default search settings, a question `precompute` answered ahead of time comes
+        straight from the answer store, and with SEMANTIC_CACHE a rephrasing of a question
+        answered before (same where and shards) reuses that answer; use_store=False bypasses
+        both. With QUERY_LOG, every call is appended to the query log unless log=False.
         """
+        started = time.perf_counter()
+        response = None
+        scope = scope_key(where, shards)
+        reuse = use_store and top_k in (None, TOP_K) and hnsw_ef is None and exact is None and hierarchical is None
+        if reuse and self.answers is not None:
+            stored = self.answers.get(self.answer_collection, normalize_question(query), scope)
+            if stored is not None:
+                response = AskResponse(*stored, timings_ms={"answer_store": _elapsed_ms(started)})
+        vector = None
+        if response is None and reuse and self.semantic_cache is not None:
+            from rag.embedding import embed_query  # sentence-transformers: imported on first use
+
+            vector = embed_query(query)
+            cached = self.semantic_cache.get(vector, scope)
+            if cached is not None:
+                response = AskResponse(*cached, timings_ms={"semantic_cache": _elapsed_ms(started)})
+        if response is None:
+            response = self._answer(query, top_k, where, hnsw_ef, exact, hierarchical, deadline_ms, shards, started)
+            if vector is not None and _via(response) == "rag" and response.results and not response.degraded:
+                self.semantic_cache.put(vector, scope, response.answer, response.results)
+        if log and self.query_log is not None:
+            self.query_log.record(
+                query, response, where=where, shards=shards, planned=response.queries, via=_via(response)
+            )
+        return response
+
+    def _answer(
+        self,
+        query: str,
+        top_k: int | None,
+        where: dict[str, Any] | None,
+        hnsw_ef: int | None,
+        exact: bool | None,
+        hierarchical: bool | None,
+        deadline_ms: float | None,
+        shards: list[str] | None,
+        started: float,
+    ) -> AskResponse:
+        if ROUTER_ENABLED and not where and shards is None:
+            routed = self.route(query)
+            if routed is not None:
+                return AskResponse(*routed, timings_ms={"route": _elapsed_ms(started)})
+        budget = ASK_DEADLINE_MS if deadline_ms is None else deadline_ms
+        deadline = Deadline(budget) if budget > 0 else None
+        response = AskResponse(answer="", results=[])
         k = top_k if top_k is not None else TOP_K
-        planned = plan_queries(query)
+        metadata = self.metadata() if where else None
+
+        t0 = time.perf_counter()
+        planned = _plan_within(query, deadline, response.degradations)
+        response.timings_ms["plan"] = _elapsed_ms(t0)
+        response.queries = planned
+
+        if deadline is not None:
+            # Generation time left after retrieval's share buys ASK_GENERATE_MS_PER_RESULT per context chunk
+            generate_ms = deadline.remaining_ms() - deadline.share_ms(ASK_RETRIEVE_SHARE)
+            affordable = max(1, int((generate_ms - ASK_MIN_GENERATE_MS) // ASK_GENERATE_MS_PER_RESULT))
+            if affordable < k:
+                logger.info("Deadline: top_k lowered from %d to %d", k, affordable)
+                response.degradations.append(LOWER_TOP_K)
+                k = affordable
+
+        targets = self.target_shards(where, shards) if self.shards else None
+
+        t0 = time.perf_counter()
         per_query_k = max(2, (k + len(planned) - 1) // len(planned))
         results_list: list[list[RetrieveResult]] = []
-        for q in planned:
+        for i, q in enumerate(planned):
+            if i and deadline is not None:
+                if deadline.remaining_ms() < ASK_MIN_GENERATE_MS + k * ASK_GENERATE_MS_PER_RESULT:
+                    logger.info("Deadline: searched %d of %d planned queries", i, len(planned))
+                    response.degradations.append(DROP_QUERIES)
+                    break
             results_list.append(
-                retrieve(
+                self._search(
                     q,
-                    top_k=per_query_k,
+                    per_query_k,
+                    targets,
                     where=where,
-                    collection_name=self.collection_name,
+                    hnsw_ef=hnsw_ef,
+                    exact=exact,
+                    hierarchical=hierarchical,
+                    metadata=metadata,
                 )
             )
-        results = _merge_and_dedupe_results(results_list, k)
-        if not results:
-            return "I have no relevant emails in the context to answer this question.", []
-        answer = generate(query, results)
-        return answer, results
+        response.results = _merge_and_dedupe_results(results_list, k)
+        response.timings_ms["retrieve"] = _elapsed_ms(t0)
+        if not response.results:
+            response.answer = "I have no relevant emails in the context to answer this question."
+            return response
+
+        t0 = time.perf_counter()
+        response.answer = _generate_within(query, response.results, deadline, response.degradations)
+        response.timings_ms["generate"] = _elapsed_ms(t0)
+        if response.degradations:
+            logger.info(
+                "Answered in %.0f ms under a %.0f ms deadline with degradations: %s",
+                _elapsed_ms(started),
+                budget,
+                ", ".join(response.degradations),
+            )
+        return response
@@ -0,0 +1,181 @@
+"""Built-in profiling for CLI commands: sampled CPU stacks (collapsed format), tracemalloc, stage wall times."""
+
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from rag.config import PROFILE_INTERVAL_MS, PROFILE_TOP, PROJECT_ROOT
+
+logger = logging.getLogger(__name__)
+
+# The profiler of the running command, if any; stage() is a no-op without one
+_active: "Profiler | None" = None
+
+
+def _frame_label(code: types.CodeType) -> str:
+    """Frame label: function (path:line), the path relative to the project or its last two components."""
+    path = code.co_filename
+    try:
+        short = os.path.relpath(path, PROJECT_ROOT)
+        if short.startswith(".."):
+            raise ValueError
+    except ValueError:
+        short = "/".join(Path(path).parts[-2:])
+    return f"{code.co_name} ({short}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """
+    A sampler thread records every thread's Python stack each `interval_ms` (wall-clock
+    sampling: waiting on I/O shows up too), tracemalloc tracks the allocation peak and
+    sites, and stage() records wall time per named stage.
+    """
+
+    def __init__(self, interval_ms: float | None = None, *, trace_memory: bool = True):
+        self.interval_s = (interval_ms or PROFILE_INTERVAL_MS) / 1000.0
+        self.trace_memory = trace_memory
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.stages: dict[str, float] = {}
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_bytes = 0
+        self.allocation_sites: list[tuple[str, int, int]] = []  # (file:line, size, count)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+        self._cpu_started = 0.0
+
+    def start(self) -> "Profiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.wall_s = time.perf_counter() - self._started
+        self.cpu_s = time.process_time() - self._cpu_started
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            )
+            stats = snapshot.statistics("lineno")[:PROFILE_TOP]
+            self.allocation_sites = [
+                (f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size, s.count) for s in stats
+            ]
+            tracemalloc.stop()
+
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                labels.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000.0
+
+    def top_functions(self, n: int | None = None) -> list[tuple[str, int, int]]:
+        """(function, self samples, inclusive samples), most self samples first."""
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for label in set(frames):
+                inclusive[label] += count
+        return [(label, c, inclusive[label]) for label, c in own.most_common(n or PROFILE_TOP)]
+
+    def collapsed(self) -> str:
+        """One "frame;frame;... count" line per distinct stack (flamegraph.pl, speedscope, inferno)."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self) -> str:
+        lines = [
+            f"wall {self.wall_s:.2f}s  cpu {self.cpu_s:.2f}s  samples {self.samples} "
+            f"every {self.interval_s * 1000:.0f}ms  peak traced memory {self.peak_bytes / 2**20:.1f} MiB",
+        ]
+        if self.stages:
+            lines += ["", f"{'stage':<24}{'ms':>10}"]
+            lines += [f"{name:<24}{ms:>10.0f}" for name, ms in self.stages.items()]
+        top = self.top_functions()
+        if top:
+            lines += ["", f"{'self':>6}{'total':>7}  function (samples, all threads)"]
+            lines += [f"{own:>6}{total:>7}  {label}" for label, own, total in top]
+        if self.allocation_sites:
+            lines += ["", f"{'KiB':>10}{'blocks':>9}  allocation site (live at the end)"]
+            lines += [f"{size / 1024:>10.0f}{count:>9}  {site}" for site, size, count in self.allocation_sites]
+        return "\n".join(lines)
+
+    def write(self, out_dir: Path, name: str) -> tuple[Path, Path]:
+        """Write <name>.collapsed and <name>.txt (the summary) to out_dir."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        collapsed = out_dir / f"{name}.collapsed"
+        summary = out_dir / f"{name}.txt"
+        collapsed.write_text(self.collapsed(), encoding="utf-8")
+        summary.write_text(self.summary() + "\n", encoding="utf-8")
+        return collapsed, summary
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage into the running profile (no-op when not profiling)."""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+
+def record_stages(timings_ms: dict[str, float]) -> None:
+    """Add stage times measured elsewhere (e.g. AskResponse.timings_ms) to the running profile."""
+    if _active is not None:
+        for name, ms in timings_ms.items():
+            _active.stages[name] = _active.stages.get(name, 0.0) + ms
+
+
+@contextmanager
+def profiled(command: str, out_dir: Path, *, interval_ms: float | None = None) -> Iterator[Profiler]:
+    """Profile the enclosed command; on exit write its files and log the summary."""
+    global _active
+    profiler = Profiler(interval_ms).start()
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = None
+        profiler.stop()
+        name = f"{command}-{time.strftime('%Y%m%d-%H%M%S')}"
+        collapsed, summary = profiler.write(out_dir, name)
+        print(profiler.summary(), file=sys.stderr)
+        logger.info("Profile written to %s (flamegraph input) and %s", collapsed, summary)
@@ -0,0 +1,157 @@
+"""Compact first-pass vectors: a PCA (or truncation) projection learned at index time, stored per collection version."""
+
+import base64
+import logging
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+from rag.config import INDEX_PROJECTION_DIR
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+
+logger = logging.getLogger(__name__)
+
+FULL_VECTOR = "full"
+COMPACT_VECTOR = "compact"
+PROJECTION_METHODS = ("pca", "truncate")
+PROJECTION_FILE = "projection.npz"
+# Reserved point (no vectors, so never a search hit) that carries the projection inside its collection
+PROJECTION_POINT_ID = str(uuid.uuid5(uuid.NAMESPACE_URL, "rag:projection"))
+
+# Physical collection name -> projection (only found ones: a missing file may be copied in later)
+_cache: dict[str, "Projection"] = {}
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Affine map full -> compact: (v - mean) @ components.T."""
+
+    method: str
+    mean: np.ndarray  # (full_dim,)
+    components: np.ndarray  # (compact_dim, full_dim)
+
+    @property
+    def dim(self) -> int:
+        return int(self.components.shape[0])
+
+    def project(self, vectors: np.ndarray | list[list[float]]) -> np.ndarray:
+        """Project an (n, full_dim) batch to (n, dim) float32."""
+        v = np.asarray(vectors, dtype=np.float32)
+        return ((v - self.mean) @ self.components.T).astype(np.float32)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, method=np.array(self.method), mean=self.mean, components=self.components)
+
+    def to_payload(self) -> dict[str, Any]:
+        """Payload of the reserved projection point: float32 arrays as base64 (exact, half the size of JSON)."""
+        return {
+            "projection": {
+                "method": self.method,
+                "shape": list(self.components.shape),
+                "mean": base64.b64encode(self.mean.astype(np.float32).tobytes()).decode("ascii"),
+                "components": base64.b64encode(self.components.astype(np.float32).tobytes()).decode("ascii"),
+            }
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict[str, Any]) -> "Projection":
+        data = payload["projection"]
+        components = np.frombuffer(base64.b64decode(data["components"]), dtype=np.float32)
+        return cls(
+            method=data["method"],
+            mean=np.frombuffer(base64.b64decode(data["mean"]), dtype=np.float32).copy(),
+            components=components.reshape(data["shape"]).copy(),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        with np.load(path) as data:
+            return cls(
+                method=str(data["method"]),
+                mean=data["mean"].astype(np.float32),
+                components=data["components"].astype(np.float32),
+            )
+
+
+def fit_projection(sample: np.ndarray | list[list[float]], dim: int, method: str = "pca") -> Projection:
+    """
+    Learn a projection to `dim` dimensions from a sample of full vectors.
+    "pca": top principal components of the sample (needs more than `dim` rows).
+    "truncate": keep the first `dim` coordinates (Matryoshka-trained models).
+    """
+    x = np.asarray(sample, dtype=np.float64)
+    full_dim = x.shape[1]
+    if not 0 < dim < full_dim:
+        raise ValueError(f"Compact dimension must be in 1..{full_dim - 1}, got {dim}")
+    if method == "truncate":
+        return Projection(
+            method=method,
+            mean=np.zeros(full_dim, dtype=np.float32),
+            components=np.eye(dim, full_dim, dtype=np.float32),
+        )
+    if method != "pca":
+        raise ValueError(f"Unknown projection method {method!r}; expected one of {', '.join(PROJECTION_METHODS)}")
+    if len(x) <= dim:
+        raise ValueError(f"PCA to {dim} dimensions needs more than {dim} sample vectors, got {len(x)}")
+    mean = x.mean(axis=0)
+    # Right singular vectors of the centered sample are the principal axes, by decreasing variance
+    _, singular, vt = np.linalg.svd(x - mean, full_matrices=False)
+    variance = singular**2
+    kept = float(variance[:dim].sum() / variance.sum()) if variance.sum() > 0 else 1.0
+    logger.info("PCA %d -> %d dims on %d vectors keeps %.1f%% of variance", full_dim, dim, len(x), 100 * kept)
+    return Projection(method=method, mean=mean.astype(np.float32), components=vt[:dim].astype(np.float32))
+
+
+def projection_path(collection: str) -> Path:
+    """Artifact of one physical collection (a blue/green version has its own)."""
+    return INDEX_PROJECTION_DIR / f"{collection}.npz"
+
+
+def save_projection(collection: str, projection: Projection, client: "QdrantClient | None" = None) -> None:
+    """
+    Write the projection next to its collection version: the host-local artifact and, with a
+    client, the reserved point in the collection itself, which every other host can read.
+    """
+    projection.save(projection_path(collection))
+    _cache[collection] = projection
+    if client is not None:
+        from qdrant_client.http import models
+
+        client.upsert(
+            collection,
+            points=[models.PointStruct(id=PROJECTION_POINT_ID, vector={}, payload=projection.to_payload())],
+            wait=True,
+        )
+
+
+def load_projection(collection: str, client: "QdrantClient | None" = None) -> Projection | None:
+    """
+    Projection of a physical collection (cached once found): the local artifact, else (with a
+    client) the reserved point stored in the collection. None if neither exists.
+    """
+    if collection in _cache:
+        return _cache[collection]
+    path = projection_path(collection)
+    if path.exists():
+        projection = Projection.load(path)
+    elif client is not None:
+        points = client.retrieve(collection, [PROJECTION_POINT_ID], with_payload=True, with_vectors=False)
+        if not points or "projection" not in (points[0].payload or {}):
+            return None
+        projection = Projection.from_payload(points[0].payload)
+    else:
+        return None
+    _cache[collection] = projection
+    return projection
+
+
+def delete_projection(collection: str) -> None:
+    _cache.pop(collection, None)
+    projection_path(collection).unlink(missing_ok=True)
@@ -0,0 +1,117 @@
+"""Query log: one compact JSON line per ask (question, filters, plan, retrieved sources, stage times); frequent-question mining."""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterator
+
+from rag.config import PRECOMPUTE_MIN_COUNT, PRECOMPUTE_TOP, PRECOMPUTE_WINDOW_DAYS, QUERY_LOG_PATH
+from rag.models import AskResponse
+
+logger = logging.getLogger(__name__)
+
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercased, whitespace collapsed, trailing ?/!/. dropped: "What's new? " == "what's new"."""
+    return _SPACE.sub(" ", question).strip().rstrip("?!. ").lower()
+
+
+def scope_key(where: dict[str, Any] | None, shards: list[str] | None = None) -> str:
+    """Canonical form of what a question was asked against (filters, shards); "" for everything."""
+    if not where and not shards:
+        return ""
+    scope = {"where": where or None, "shards": sorted(shards) if shards else None}
+    return json.dumps(scope, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class QueryLog:
+    """
+    Append-only JSONL log, one line per ask. Lines are small (no answer text, no chunk text):
+    ts, q (normalized), where, shards, planned, sources (retrieved source files in rank
+    order), ms (stage timings), via ("rag", "cache", "route" or "store") and degradations if any.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or QUERY_LOG_PATH
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        question: str,
+        response: AskResponse,
+        *,
+        where: dict[str, Any] | None = None,
+        shards: list[str] | None = None,
+        planned: list[str] | None = None,
+        via: str = "rag",
+    ) -> None:
+        entry: dict[str, Any] = {
+            "ts": round(time.time(), 3),
+            "q": normalize_question(question),
+            "where": where or None,
+            "shards": shards or None,
+            "planned": planned or None,
+            "sources": [r.source_file for r in response.results],
+            "ms": {stage: round(ms, 1) for stage, ms in response.timings_ms.items()},
+            "via": via,
+        }
+        if response.degradations:
+            entry["degradations"] = response.degradations
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            # Losing a log line must never fail the question
+            logger.warning("Could not append to query log %s: %s", self.path, e)
+
+    def entries(self, *, since: float | None = None) -> Iterator[dict[str, Any]]:
+        """Logged entries, oldest first (optionally only those at or after `since`); bad lines skipped."""
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or entry.get("ts", 0) >= since:
+                    yield entry
+
+
+def frequent_questions(
+    entries: Iterator[dict[str, Any]],
+    *,
+    top: int | None = None,
+    min_count: int | None = None,
+) -> list[tuple[str, dict[str, Any] | None, list[str] | None, int]]:
+    """
+    The most asked (question, where, shards) combinations as (question, where, shards, count),
+    most frequent first. Routed questions are left out: the router already answers them instantly.
+    """
+    limit = PRECOMPUTE_TOP if top is None else top
+    floor = PRECOMPUTE_MIN_COUNT if min_count is None else min_count
+    counts: Counter[tuple[str, str]] = Counter()
+    scopes: dict[tuple[str, str], tuple[dict[str, Any] | None, list[str] | None]] = {}
+    for entry in entries:
+        if entry.get("via") == "route" or not entry.get("q"):
+            continue
+        key = (entry["q"], scope_key(entry.get("where"), entry.get("shards")))
+        counts[key] += 1
+        scopes.setdefault(key, (entry.get("where"), entry.get("shards")))
+    ranked = [(key, n) for key, n in counts.most_common() if n >= floor][:limit]
+    return [(q, *scopes[(q, scope)], n) for (q, scope), n in ranked]
+
+
+def window_start(days: float | None = None) -> float | None:
+    """Epoch seconds where the PRECOMPUTE_WINDOW_DAYS window starts (None: whole log)."""
+    window = PRECOMPUTE_WINDOW_DAYS if days is None else days
+    return time.time() - window * 86400 if window > 0 else None
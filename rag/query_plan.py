@@ -5,12 +5,12 @@ import logging
 import re
 from typing import Any
 
-from mistralai import Mistral
-
 from rag.config import MISTRAL_API_KEY, MISTRAL_MODEL
+from rag.llm import CircuitOpenError, client_options, complete_chat, lazy_mistral
 
 logger = logging.getLogger(__name__)
 
+
 PLAN_SYSTEM = """You are a search query planner for a company email corpus.
 Given a user question, output 1 or more search queries that will be run against an email search index (semantic search).
 - Each query should be a short phrase or question that would retrieve relevant emails (e.g. "budget approval request", "meeting schedule Q3").
@@ -18,6 +18,10 @@ Given a user question, output 1 or more search queries that will be run against
 - Output only valid JSON, no other text. Use this exact schema: {"queries": ["query1", "query2", ...]}"""
 
 
+_mistral = lazy_mistral(globals())
+__getattr__ = _mistral  # rag.query_plan.Mistral stays a (lazy) module attribute, so it can be patched
+
+
 def _extract_json(raw: str) -> str:
     """Extract JSON from response, stripping markdown code blocks if present."""
     raw = raw.strip()
@@ -33,17 +37,20 @@ def plan_queries(
     *,
     model: str | None = None,
     api_key: str | None = None,
+    timeout_ms: int | None = None,
 ) -> list[str]:
     """
     Ask Mistral to produce a list of search queries from the user question.
     Returns a list of query strings to run against the RAG index.
-    On API or parse failure, returns [user_question] as fallback.
+    On API or parse failure, returns [user_question] as fallback; while the LLM circuit
+    breaker is open (see rag.llm) planning is skipped the same way, without a request.
+    timeout_ms bounds the API call (default: the SDK's timeout).
     """
     key = api_key or MISTRAL_API_KEY
     if not key:
         raise ValueError("MISTRAL_API_KEY is not set. Set it in the environment or pass api_key=.")
 
-    client = Mistral(api_key=key)
+    client = _mistral()(api_key=key, **client_options())
     model_name = model or MISTRAL_MODEL
     messages = [
         {"role": "system", "content": PLAN_SYSTEM},
@@ -51,10 +58,17 @@ def plan_queries(
     ]
 
     try:
-        response = client.chat.complete(
+        response = complete_chat(
+            client,
+            operation="query plan",
+            timeout_ms=timeout_ms,
+            optional=True,
             model=model_name,
             messages=messages,
         )
+    except CircuitOpenError:
+        logger.info("Mistral looks unhealthy (circuit open); skipping query planning")
+        return [user_question]
     except Exception as e:
         logger.warning("Query plan API error, using original question: %s", e)
         return [user_question]
@@ -1,36 +1,107 @@
-"""Retrieval: embed query (padded), search Qdrant with optional payload filters."""
+"""Retrieval: embed query (padded), search Qdrant with optional payload filters (flat or email -> paragraph)."""
 
 import logging
 from typing import Any
 
+from qdrant_client import QdrantClient
 from qdrant_client.http import models
+from qdrant_client.http.exceptions import UnexpectedResponse
 
-from rag.config import QDRANT_COLLECTION_NAME, TOP_K
+from rag.config import (
+    QDRANT_COLLECTION_NAME,
+    QDRANT_EXACT_SEARCH,
+    QDRANT_HNSW_EF,
+    RETRIEVE_AUTO_EXACT,
+    RETRIEVE_CANDIDATE_EMAILS,
+    RETRIEVE_HIERARCHICAL,
+    TOP_K,
+)
 from rag.embedding import embed_query
+from rag.filters import compile_where, needs_metadata, prefer_exact
+from rag.metadata_index import MetadataIndex, load_metadata_index
 from rag.models import RetrieveResult
-from rag.store import get_qdrant_client
+from rag.store import (
+    email_index_missing,
+    email_index_name,
+    get_qdrant_client,
+    is_missing_collection,
+    mark_email_index_missing,
+    search_points,
+)
 
 logger = logging.getLogger(__name__)
 
+# Payload fields every result carries as plain strings (see RetrieveResult)
+RESULT_FIELDS = ("source_file", "subject", "from", "to")
 
-def _where_to_qdrant_filter(where: dict[str, Any]) -> models.Filter | None:
-    """Convert simple where dict to Qdrant Filter. Supports $eq and $and."""
-    if not where:
+
+def _first(value: Any) -> Any:
+    """Canonical value of a payload field (collapsed chunks store lists, canonical first)."""
+    if isinstance(value, list):
+        return value[0] if value else ""
+    return value
+
+
+def _to_result(hit: models.ScoredPoint) -> RetrieveResult:
+    """
+    RetrieveResult from a hit, reusing its payload dict as the metadata (no copy per hit):
+    text is popped out, collapsed list fields are reduced to their canonical value.
+    """
+    metadata = hit.payload or {}
+    text = metadata.pop("text", "")
+    for key in RESULT_FIELDS:
+        metadata[key] = _first(metadata.get(key, ""))
+    if "date" in metadata:
+        metadata["date"] = _first(metadata["date"])
+    return RetrieveResult(text=text, metadata=metadata, distance=hit.score, point_id=str(hit.id))
+
+
+def two_stage_search(
+    client: QdrantClient,
+    collection_name: str,
+    query_vector: list[float],
+    limit: int,
+    *,
+    query_filter: models.Filter | None = None,
+    candidate_emails: int | None = None,
+    search_params: models.SearchParams | None = None,
+) -> list[models.ScoredPoint] | None:
+    """
+    Coarse stage: top `candidate_emails` emails from the email-level index (same filter).
+    Fine stage: paragraphs of only those emails, via a source_file filter, ranked by the
+    paragraph score. Returns None when the collection has no email index (search flat).
+    """
+    n_emails = max(limit, candidate_emails or RETRIEVE_CANDIDATE_EMAILS)
+    try:
+        emails = client.query_points(
+            collection_name=email_index_name(collection_name),
+            query=query_vector,
+            limit=n_emails,
+            query_filter=query_filter,
+            search_params=search_params,
+            with_payload=["source_file"],
+        ).points
+    except (UnexpectedResponse, ValueError) as e:
+        if not is_missing_collection(e):
+            raise
+        logger.warning("No email index for %s; falling back to flat retrieval", collection_name)
+        mark_email_index_missing(client, collection_name)
         return None
-    if "$and" in where:
-        must = []
-        for cond in where["$and"]:
-            sub = _where_to_qdrant_filter(cond)
-            if sub and sub.must:
-                must.extend(sub.must)
-        return models.Filter(must=must) if must else None
-    # Single key: {"subject": "Meeting Request"} or {"subject": {"$eq": "..."}}
-    must = []
-    for key, val in where.items():
-        if isinstance(val, dict) and "$eq" in val:
-            val = val["$eq"]
-        must.append(models.FieldCondition(key=key, match=models.MatchValue(value=val)))
-    return models.Filter(must=must)
+    files = [(p.payload or {}).get("source_file") for p in emails]
+    files = [f for f in files if f]
+    if not files:
+        return []
+    candidates = models.FieldCondition(key="source_file", match=models.MatchAny(any=files))
+    # The compiled filter is shared (cached); nest it rather than extend its conditions
+    must: list[Any] = [candidates, query_filter] if query_filter else [candidates]
+    return search_points(
+        client,
+        collection_name,
+        query_vector,
+        limit,
+        query_filter=models.Filter(must=must),
+        search_params=search_params,
+    )
 
 
 def retrieve(
@@ -39,42 +110,63 @@ def retrieve(
     *,
     where: dict[str, Any] | None = None,
     collection_name: str | None = None,
+    hnsw_ef: int | None = None,
+    exact: bool | None = None,
+    hierarchical: bool | None = None,
+    candidate_emails: int | None = None,
+    metadata: MetadataIndex | None = None,
+    query_vector: list[float] | None = None,
 ) -> list[RetrieveResult]:
     """
     Embed query (padded to 1536), search Qdrant, return top-k results.
-    where: e.g. {"subject": "Meeting Request"} or {"subject": {"$eq": "..."}}
+    where: e.g. {"subject": "Meeting Request"}, {"from": {"$in": [...]}},
+    {"date": {"$gte": "2024-01-01"}}, {"$or": [...]}; see rag.filters.compile_where.
+    $prefix conditions use `metadata` (default: the saved index of the collection).
+    hnsw_ef / exact: per-call search accuracy (defaults: QDRANT_HNSW_EF, QDRANT_EXACT_SEARCH);
+    with neither set, selective filters switch to exact search (RETRIEVE_AUTO_EXACT).
+    hierarchical: email-level candidates first, then their paragraphs (default:
+    RETRIEVE_HIERARCHICAL; see two_stage_search).
+    query_vector: the query already embedded (e.g. once for all shards of a fan-out).
     """
     k = top_k if top_k is not None else TOP_K
-    query_vector = embed_query(query)
+    if query_vector is None:
+        query_vector = embed_query(query)
     client = get_qdrant_client()
     name = collection_name or QDRANT_COLLECTION_NAME
 
-    query_filter = _where_to_qdrant_filter(where) if where else None
-
-    response = client.query_points(
-        collection_name=name,
-        query=query_vector,
-        limit=k,
-        query_filter=query_filter,
-        with_payload=True,
+    if metadata is None and needs_metadata(where):
+        metadata = load_metadata_index(name)
+    query_filter = compile_where(where, metadata)
+    ef = hnsw_ef if hnsw_ef is not None else QDRANT_HNSW_EF
+    exact_search = QDRANT_EXACT_SEARCH if exact is None else exact
+    if exact is None and ef is None and not exact_search and RETRIEVE_AUTO_EXACT:
+        exact_search = prefer_exact(client, name, query_filter)
+    search_params = (
+        models.SearchParams(hnsw_ef=ef, exact=exact_search) if ef is not None or exact_search else None
     )
 
-    out: list[RetrieveResult] = []
-    for hit in response.points:
-        payload = hit.payload or {}
-        text = payload.get("text", "")
-        metadata = {
-            "source_file": payload.get("source_file", ""),
-            "subject": payload.get("subject", ""),
-            "from": payload.get("from", ""),
-            "to": payload.get("to", ""),
-        }
-        out.append(
-            RetrieveResult(
-                text=text,
-                metadata=metadata,
-                distance=hit.score,
-            )
+    use_hierarchy = RETRIEVE_HIERARCHICAL if hierarchical is None else hierarchical
+    points = None
+    if use_hierarchy and not email_index_missing(client, name):
+        points = two_stage_search(
+            client,
+            name,
+            query_vector,
+            k,
+            query_filter=query_filter,
+            candidate_emails=candidate_emails,
+            search_params=search_params,
+        )
+    if points is None:
+        points = search_points(
+            client,
+            name,
+            query_vector,
+            k,
+            query_filter=query_filter,
+            search_params=search_params,
         )
+
+    out = [_to_result(hit) for hit in points]
     logger.debug("Retrieved %d results for query (k=%d)", len(out), k)
     return out
@@ -0,0 +1,143 @@
+"""Query router: answer structured metadata questions (counts, listings, top senders) from the metadata index."""
+
+import logging
+import re
+from dataclasses import dataclass
+
+from rag.config import ROUTER_MAX_LIST
+from rag.metadata_index import MetadataIndex, normalize
+from rag.models import RetrieveResult
+
+logger = logging.getLogger(__name__)
+
+_EMAILS = r"(?:e-?mails?|messages?|mails?)"
+_COUNT = re.compile(rf"^how many {_EMAILS}\b(?P<rest>.*)$")
+_LIST = re.compile(
+    rf"^(?:(?:list|show|find|get|give)(?: me)?(?: all)?(?: of)?(?: the)? {_EMAILS}"
+    rf"|which {_EMAILS})\b(?P<rest>.*)$"
+)
+_TOP = re.compile(
+    rf"^(?:who (?P<verb>sent|wrote|received|got) the most {_EMAILS}"
+    r"|(?:who are )?(?:the )?(?:top|most active) (?P<role>senders|recipients))\b(?P<rest>.*)$"
+)
+# A clause value runs until the next clause keyword or the end of the question
+_STOP = r"(?=\s+(?:to|from|by|with|sent|received|and|having|titled)\b|$)"
+_SUBJECT = r"\b(?:with |having |under )?(?:the )?(?:subject(?: line)?|titled)(?: of| is)?\s+"
+_CLAUSES: list[tuple[str, re.Pattern[str]]] = [
+    ("subject", re.compile(_SUBJECT + r"\"(?P<v>[^\"]+)\"")),
+    ("subject", re.compile(_SUBJECT + rf"(?P<v>.+?){_STOP}")),
+    ("from", re.compile(r"\b(?:did|has|have) (?P<v>.+?) (?:send|sent|write|written)\b")),
+    ("to", re.compile(r"\b(?:did|has|have) (?P<v>.+?) (?:receive|received|get|got)\b")),
+    ("from", re.compile(rf"\b(?:from|by) (?P<v>.+?){_STOP}")),
+    ("to", re.compile(rf"\bto (?P<v>.+?){_STOP}")),
+]
+# Words that may remain after the clauses are removed without changing the question's meaning
+_FILLER = frozenset(
+    "were was are is there been be have has had did do does in total all overall altogether "
+    "so far ever sent received got i we you the of".split()
+)
+_FIELD_LABEL = {"from": "from", "to": "to", "subject": "with subject"}
+
+
+@dataclass(frozen=True)
+class StructuredQuery:
+    """A recognized question: count or list emails matching field constraints, or top values of a field."""
+
+    intent: str  # "count", "list" or "top"
+    constraints: tuple[tuple[str, str], ...] = ()
+    field: str = ""  # for "top"
+
+
+def _parse_constraints(rest: str) -> tuple[tuple[str, str], ...] | None:
+    """Field constraints of the rest of a question, or None if non-filler words remain (a semantic question)."""
+    constraints: list[tuple[str, str]] = []
+    text = f" {rest} "
+    for field_name, pattern in _CLAUSES:
+        match = pattern.search(text)
+        while match:
+            constraints.append((field_name, match.group("v").strip()))
+            text = text[: match.start()] + " " + text[match.end() :]
+            match = pattern.search(text)
+    leftover = [w for w in re.findall(r"[\w'-]+", text) if w not in _FILLER]
+    return None if leftover else tuple(constraints)
+
+
+def parse_structured(question: str) -> StructuredQuery | None:
+    """Recognize a structured question; None means it needs full RAG."""
+    q = " ".join(question.strip().lower().rstrip("?.! ").split())
+    match = _TOP.match(q)
+    if match:
+        if _parse_constraints(match.group("rest")) != ():
+            return None
+        role = match.group("role") or ""
+        received = match.group("verb") in ("received", "got") or role == "recipients"
+        return StructuredQuery(intent="top", field="to" if received else "from")
+    for intent, pattern in (("count", _COUNT), ("list", _LIST)):
+        match = pattern.match(q)
+        if match:
+            constraints = _parse_constraints(match.group("rest"))
+            return None if constraints is None else StructuredQuery(intent=intent, constraints=constraints)
+    return None
+
+
+def _emails(n: int) -> str:
+    return f"{n} email{'s' if n != 1 else ''}"
+
+
+def _result(row: tuple[str, str, str, str]) -> RetrieveResult:
+    source_file, subject, sender, recipient = row
+    return RetrieveResult(
+        text=f"Subject: {subject}\nFrom: {sender}\nTo: {recipient}",
+        metadata={"source_file": source_file, "subject": subject, "from": sender, "to": recipient},
+    )
+
+
+def answer_structured(
+    query: StructuredQuery,
+    index: MetadataIndex,
+) -> tuple[str, list[RetrieveResult]] | None:
+    """
+    Evaluate a structured query against the metadata index. Returns (answer, matching emails,
+    at most ROUTER_MAX_LIST) or None if a constraint names an unknown sender/recipient/subject,
+    in which case the caller falls back to RAG (the name may be phrased differently).
+    """
+    if query.intent == "top":
+        top = index.top(query.field)
+        label = "senders" if query.field == "from" else "recipients"
+        lines = [f"{i}. {name} — {_emails(n)}" for i, (name, n) in enumerate(top, 1)]
+        return f"Top {label}:\n" + "\n".join(lines), []
+
+    rows: set[int] | None = None
+    described: list[str] = []
+    for field_name, value in query.constraints:
+        posting = index.lookup(field_name, value)
+        if posting is None:
+            return None
+        rows = set(posting) if rows is None else rows & set(posting)
+        shown = index.display.get(normalize(value), value)
+        if field_name == "subject":
+            shown = f'"{shown}"'
+        described.append(f"{_FIELD_LABEL[field_name]} {shown}")
+    matched = sorted(rows) if rows is not None else list(range(len(index.rows)))
+    results = [_result(index.rows[i]) for i in matched[:ROUTER_MAX_LIST]]
+    n = len(matched)
+    summary = _emails(n) + (" " + " and ".join(described) if described else " in total")
+    if query.intent == "count":
+        return summary + ".", results
+    lines = [f"- {r.subject} — {r.from_} → {r.to} ({r.source_file})" for r in results]
+    if n > len(results):
+        lines.append(f"... and {n - len(results)} more")
+    return summary + (":\n" + "\n".join(lines) if lines else "."), results
+
+
+def route(question: str, index: MetadataIndex | None) -> tuple[str, list[RetrieveResult]] | None:
+    """Answer from the metadata index when the question is structured; None means use full RAG."""
+    if index is None:
+        return None
+    query = parse_structured(question)
+    if query is None:
+        return None
+    answered = answer_structured(query, index)
+    if answered is not None:
+        logger.info("Routed %r to the metadata index (%s)", question, query.intent)
+    return answered
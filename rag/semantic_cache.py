@@ -0,0 +1,205 @@
+"""Semantic answer cache: prior answers found by question embedding, reused while their cited chunks still exist."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from rag.config import SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL_S
+from rag.metadata_index import metadata_index_path
+from rag.models import RetrieveResult
+from rag.sharding import Shard, shard_collection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """Counters since the cache was created; a lookup is either a hit or a miss."""
+
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0  # close enough, but a cited chunk is gone or changed (counted as a miss too)
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"semantic cache: {self.hits}/{self.lookups} hits ({self.hit_rate:.0%}), "
+            f"{self.stale} stale, {self.expired} expired, {self.evictions} evicted"
+        )
+
+
+@dataclass(slots=True)
+class _Entry:
+    slot: int
+    scope: str
+    answer: str
+    results: list[RetrieveResult]
+    version: tuple[int, ...]
+    created: float = field(default_factory=time.monotonic)
+
+
+def chunks_present(results: list[RetrieveResult], collection_name: str | None) -> bool:
+    """
+    Whether every cited chunk is still in the live index with the same text: one Qdrant
+    retrieve by point id per collection (shard results are looked up in their shard).
+    """
+    from rag.store import get_collection_name, get_qdrant_client  # Qdrant client: only on a version change
+
+    wanted: dict[str, dict[str, str]] = {}
+    for r in results:
+        if r.point_id is None:
+            return False
+        shard = r.metadata.get("shard")
+        name = shard_collection(collection_name, shard) if shard else get_collection_name(collection_name)
+        wanted.setdefault(name, {})[r.point_id] = r.text
+    try:
+        client = get_qdrant_client()
+        for name, texts in wanted.items():
+            points = client.retrieve(collection_name=name, ids=list(texts), with_payload=["text"])
+            found = {str(p.id): (p.payload or {}).get("text") for p in points}
+            if any(found.get(point_id) != text for point_id, text in texts.items()):
+                return False
+    except Exception as e:  # noqa: BLE001 - an unverifiable answer is just not reused
+        logger.warning("Could not verify cached sources: %s", e)
+        return False
+    return True
+
+
+class SemanticCache:
+    """
+    Answers of one pipeline keyed by the embedded question. Lookups compare the question
+    vector with every cached one (a single matrix product over at most SEMANTIC_CACHE_SIZE
+    rows) and take the most similar entry of the same scope (where + shards) if its cosine
+    similarity reaches SEMANTIC_CACHE_THRESHOLD. Each entry remembers the index version it
+    was answered on (the metadata index files, rewritten by every `index`); after a re-index
+    it is served only if its cited chunks are still present, unchanged. Entries expire after
+    SEMANTIC_CACHE_TTL_S and the least recently used go first when the cache is full.
+    Thread-safe; in-process only.
+    """
+
+    def __init__(
+        self,
+        collection_name: str | None = None,
+        shards: list[Shard] | None = None,
+        *,
+        threshold: float | None = None,
+        size: int | None = None,
+        ttl_s: float | None = None,
+    ):
+        self.collection_name = collection_name
+        self.shards = shards or []
+        self.threshold = SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.size = max(1, SEMANTIC_CACHE_SIZE if size is None else size)
+        self.ttl_s = SEMANTIC_CACHE_TTL_S if ttl_s is None else ttl_s
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()  # by slot, least recently used first
+        self._vectors: np.ndarray | None = None  # (size, dim) unit rows; free slots are zero
+        self._free: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def index_version(self) -> tuple[int, ...]:
+        """Modification times of the collection's (or shards') metadata index files."""
+        names = [s.collection for s in self.shards] or [self.collection_name]
+        version = []
+        for name in names:
+            path = metadata_index_path(name)
+            version.append(path.stat().st_mtime_ns if path.exists() else 0)
+        return tuple(version)
+
+    def get(self, vector: list[float], scope: str = "") -> tuple[str, list[RetrieveResult]] | None:
+        """The (answer, results) of the closest cached question in `scope`, or None."""
+        query = _unit(vector)
+        with self._lock:
+            entry = self._closest(query, scope)
+        if entry is None:
+            self._count(hit=False)
+            return None
+        version = self.index_version()
+        if entry.version != version:
+            if not chunks_present(entry.results, self.collection_name):
+                with self._lock:
+                    if self._entries.get(entry.slot) is entry:
+                        self._drop(entry.slot)
+                    self.stats.stale += 1
+                self._count(hit=False)
+                return None
+            entry.version = version  # verified against this index; no need to check again
+        self._count(hit=True)
+        return entry.answer, entry.results
+
+    def put(self, vector: list[float], scope: str, answer: str, results: list[RetrieveResult]) -> None:
+        row = _unit(vector)
+        version = self.index_version()
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != row.shape[0]:
+                self._vectors = np.zeros((self.size, row.shape[0]), dtype=np.float32)
+                self._entries.clear()
+                self._free = list(range(self.size - 1, -1, -1))
+            if not self._free:
+                slot, _ = self._entries.popitem(last=False)
+                self._vectors[slot] = 0.0
+                self._free.append(slot)
+                self.stats.evictions += 1
+            slot = self._free.pop()
+            self._vectors[slot] = row
+            self._entries[slot] = _Entry(slot, scope, answer, list(results), version)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
+            self._free = []
+
+    def _closest(self, query: np.ndarray, scope: str) -> _Entry | None:
+        if not self._entries or self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+            return None
+        scores = self._vectors @ query
+        now = time.monotonic()
+        for slot in np.argsort(-scores):
+            slot = int(slot)
+            if scores[slot] < self.threshold:
+                return None
+            entry = self._entries.get(slot)
+            if entry is None or entry.scope != scope:
+                continue
+            if self.ttl_s > 0 and now - entry.created > self.ttl_s:
+                self._drop(slot)
+                self.stats.expired += 1
+                continue
+            self._entries.move_to_end(slot)
+            return entry
+        return None
+
+    def _drop(self, slot: int) -> None:
+        if self._entries.pop(slot, None) is not None:
+            self._vectors[slot] = 0.0
+            self._free.append(slot)
+
+    def _count(self, *, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+
+def _unit(vector: list[float]) -> np.ndarray:
+    row = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(row))
+    return row / norm if norm else row
@@ -0,0 +1,185 @@
+"""Sharded collections: one per mailbox or source_file hash bucket; routed or fanned-out search merged with a heap."""
+
+import hashlib
+import heapq
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from rag.config import QDRANT_COLLECTION_NAME, SHARD_FANOUT_WORKERS, SHARD_HASH_BUCKETS, SHARDS
+from rag.metadata_index import MetadataIndex
+from rag.models import ParsedEmail, RetrieveResult
+
+logger = logging.getLogger(__name__)
+
+SHARD_SEPARATOR = "__"  # shard collection = <collection>__<shard name>
+# Fields whose equality / $in values can rule a mailbox shard out (via its metadata index)
+_ROUTING_FIELDS = ("from", "to", "subject")
+
+
+@dataclass(frozen=True)
+class Shard:
+    """
+    One independently indexed slice of the corpus, stored in its own collection (with its
+    own email index, metadata index and blue/green versions). A mailbox shard reads
+    `emails_dir`; a hash shard holds the EMAILS_DIR emails whose source_file hashes to `bucket`.
+    """
+
+    name: str
+    collection: str
+    emails_dir: Path | None = None
+    bucket: int | None = None
+    buckets: int = 0
+
+
+def shard_collection(collection_name: str | None, shard_name: str) -> str:
+    return f"{collection_name or QDRANT_COLLECTION_NAME}{SHARD_SEPARATOR}{shard_name}"
+
+
+def hash_bucket(source_file: str, buckets: int) -> int:
+    """Stable bucket of a source file (same across processes and runs, unlike hash())."""
+    digest = hashlib.blake2b(source_file.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % buckets
+
+
+def parse_shards(spec: str) -> list[tuple[str, Path]]:
+    """ "sales=/mail/sales.mbox,hr=/mail/hr" -> [("sales", Path(...)), ("hr", Path(...))]."""
+    out: list[tuple[str, Path]] = []
+    for item in (part.strip() for part in spec.split(",")):
+        if not item:
+            continue
+        name, sep, path = item.partition("=")
+        name = name.strip()
+        if not sep or not name or not path.strip() or not name.replace("-", "").replace("_", "").isalnum():
+            raise ValueError(f"Bad shard {item!r}; expected name=path (name: letters, digits, - and _)")
+        if any(name == seen for seen, _ in out):
+            raise ValueError(f"Duplicate shard name {name!r}")
+        out.append((name, Path(path.strip())))
+    return out
+
+
+def configured_shards(
+    collection_name: str | None = None,
+    *,
+    spec: str | None = None,
+    buckets: int | None = None,
+) -> list[Shard]:
+    """Shards from SHARDS (mailbox shards) or SHARD_HASH_BUCKETS (hash shards); [] when unsharded."""
+    spec = SHARDS if spec is None else spec
+    buckets = SHARD_HASH_BUCKETS if buckets is None else buckets
+    if spec.strip():
+        return [
+            Shard(name=name, collection=shard_collection(collection_name, name), emails_dir=path)
+            for name, path in parse_shards(spec)
+        ]
+    return [
+        Shard(name=f"h{i}", collection=shard_collection(collection_name, f"h{i}"), bucket=i, buckets=buckets)
+        for i in range(max(0, buckets))
+    ]
+
+
+def select_shards(shards: list[Shard], names: Iterable[str] | None) -> list[Shard]:
+    """The named shards (all of them for None); unknown names raise."""
+    if names is None:
+        return list(shards)
+    wanted = list(names)
+    known = {s.name for s in shards}
+    unknown = [n for n in wanted if n not in known]
+    if unknown:
+        raise ValueError(f"Unknown shard(s) {', '.join(unknown)}; configured: {', '.join(sorted(known)) or 'none'}")
+    return [s for s in shards if s.name in wanted]
+
+
+def shard_emails(shard: Shard, emails: list[ParsedEmail]) -> list[ParsedEmail]:
+    """The emails of a hash shard (a mailbox shard keeps all of its own emails)."""
+    if shard.bucket is None:
+        return emails
+    return [e for e in emails if hash_bucket(e.source_file, shard.buckets) == shard.bucket]
+
+
+def _pinned_values(where: dict[str, Any], field_name: str) -> list[str] | None:
+    """Values `field_name` must equal under every match of a (conjunctive) where; None if unconstrained."""
+    conditions = [where, *[c for c in where.get("$and", []) if isinstance(c, dict)]]
+    for cond in conditions:
+        value = cond.get(field_name)
+        if value is None:
+            continue
+        if not isinstance(value, dict):
+            return [str(value)]
+        if "$eq" in value:
+            return [str(value["$eq"])]
+        if "$in" in value:
+            return [str(v) for v in value["$in"]]
+    return None
+
+
+def route_shards(
+    shards: list[Shard],
+    where: dict[str, Any] | None,
+    metadata: dict[str, MetadataIndex | None] | None = None,
+) -> list[Shard]:
+    """
+    Shards that can hold matches for `where`. A source_file pinned by $eq / $in selects its
+    hash buckets; a sender, recipient or subject pinned the same way skips mailbox shards
+    whose metadata index does not know the value. Without such conditions (or metadata
+    for a shard), the shard stays in.
+    """
+    if not where:
+        return list(shards)
+    files = _pinned_values(where, "source_file")
+    pinned = {f: v for f in _ROUTING_FIELDS if (v := _pinned_values(where, f)) is not None}
+    out = []
+    for shard in shards:
+        if files is not None and shard.bucket is not None:
+            if not any(hash_bucket(f, shard.buckets) == shard.bucket for f in files):
+                continue
+        index = (metadata or {}).get(shard.name)
+        if index is not None and any(
+            all(index.lookup(f, v) is None for v in values) for f, values in pinned.items()
+        ):
+            continue
+        out.append(shard)
+    logger.debug("Routed to %d of %d shards", len(out), len(shards))
+    return out
+
+
+def fan_out(
+    search: Callable[[Shard], list[RetrieveResult]],
+    shards: list[Shard],
+    top_k: int,
+    *,
+    workers: int | None = None,
+) -> list[RetrieveResult]:
+    """
+    Run search(shard) on every shard in parallel and merge the per-shard rankings (each best
+    first) into the global top_k with a k-way heap merge. Results are tagged with
+    metadata["shard"]. A failing shard is logged and skipped; if every shard fails, the
+    first error is raised.
+    """
+    if not shards:
+        return []
+    errors: list[Exception] = []
+
+    def run(shard: Shard) -> list[RetrieveResult]:
+        try:
+            results = search(shard)
+        except Exception as e:  # noqa: BLE001 - one shard down must not fail the query
+            logger.warning("Shard %s failed: %s", shard.name, e)
+            errors.append(e)
+            return []
+        for r in results:
+            r.metadata["shard"] = shard.name
+        return results
+
+    if len(shards) == 1:
+        ranked = [run(shards[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(shards), workers or SHARD_FANOUT_WORKERS)) as pool:
+            ranked = list(pool.map(run, shards))
+    if len(errors) == len(shards):
+        raise errors[0]
+    merged = heapq.merge(*ranked, key=lambda r: r.distance or 0.0, reverse=True)
+    return list(itertools.islice(merged, top_k))
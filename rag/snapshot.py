@@ -0,0 +1,380 @@
+"""Portable index snapshots: export vectors + payloads from Qdrant and re-import them without re-embedding."""
+
+import gzip
+import json
+import logging
+import shutil
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from rag.config import (
+    EMBEDDING_BACKEND,
+    EMBEDDING_MODEL,
+    INDEX_EMAIL_VECTORS,
+    QDRANT_COLLECTION_NAME,
+    SNAPSHOT_BATCH_SIZE,
+    SNAPSHOT_UPLOAD_PARALLEL,
+    collection_profile,
+)
+from rag.metadata_index import MetadataIndex, load_metadata_index, save_metadata_index
+from rag.projection import (
+    COMPACT_VECTOR,
+    FULL_VECTOR,
+    PROJECTION_FILE,
+    Projection,
+    load_projection,
+    save_projection,
+)
+from rag.store import (
+    CHUNK_POINTS,
+    EmailVectors,
+    build_email_index,
+    discard_version,
+    finalize_collection,
+    get_qdrant_client,
+    prepare_collection,
+    publish_collection,
+    resolve_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)  # 1: payloads as one JSON object of columns (payloads.json)
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+PAYLOADS_FILE = "payloads.jsonl"
+COLUMNS_FILE = "payloads.json"  # format 1
+METADATA_FILE = "metadata.json"  # the collection's metadata index (router, $prefix filters)
+SNAPSHOT_DTYPES = ("float32", "float16", "int8")
+
+
+def _open_write(path: Path, compress: bool):
+    return gzip.open(str(path) + ".gz", "wb", compresslevel=6) if compress else open(path, "wb")
+
+
+def _open_read(path: Path):
+    gz = Path(str(path) + ".gz")
+    return gzip.open(gz, "rb") if gz.exists() else open(path, "rb")
+
+
+def _stored_dim(vectors: np.ndarray) -> int:
+    """Columns up to the last non-zero one: trailing zero padding is not written to disk."""
+    nonzero = np.flatnonzero(np.any(vectors != 0, axis=0))
+    return int(nonzero[-1]) + 1 if nonzero.size else vectors.shape[1]
+
+
+def _quantize(block: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray | None]:
+    """Cast a float32 block; int8 uses a symmetric per-row scale."""
+    if dtype == "int8":
+        scales = np.abs(block).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(block / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    return block.astype(dtype), None
+
+
+def export_snapshot(
+    out_dir: Path,
+    collection_name: str | None = None,
+    *,
+    dtype: str = "float32",
+    compress: bool = False,
+    batch_size: int | None = None,
+    client: QdrantClient | None = None,
+) -> dict[str, Any]:
+    """
+    Write a collection to out_dir, one scroll batch at a time: vectors into an (n, dim) .npy
+    matrix memory-mapped on disk (zero padding trimmed; float32, float16 or int8 + per-row
+    scales), payloads as JSON lines (with the point id), and a manifest recording model,
+    backend and dimensions. compress=True gzips the files afterwards (disables mmap on import).
+    For a collection with compact vectors only the full vectors are written, plus the
+    projection, so import can recompute the compact ones; raises if there is none. The
+    collection's metadata index is included when this host has one. Returns the manifest.
+    """
+    if dtype not in SNAPSHOT_DTYPES:
+        raise ValueError(f"dtype must be one of {', '.join(SNAPSHOT_DTYPES)}, got {dtype!r}")
+    client = client or get_qdrant_client()
+    name = collection_name or QDRANT_COLLECTION_NAME
+    limit = batch_size or SNAPSHOT_BATCH_SIZE
+    source = resolve_collection(client, name)  # one version throughout, even if the alias moves
+    info = client.get_collection(source)
+    params = info.config.params.vectors
+    named = isinstance(params, dict)
+    vector_size = int(params[FULL_VECTOR].size if named else params.size)
+    compact_dim = int(params[COMPACT_VECTOR].size) if named and COMPACT_VECTOR in params else 0
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if compact_dim:
+        projection = load_projection(source, client)
+        if projection is None:
+            raise RuntimeError(f"{name} has compact vectors but no projection; re-index it before exporting")
+        projection.save(out_dir / PROJECTION_FILE)
+    count = client.count(source, count_filter=CHUNK_POINTS, exact=True).count
+    started = time.perf_counter()
+
+    vectors: np.ndarray | None = None  # memory-mapped vectors.npy, created with the first batch
+    scales = (
+        np.lib.format.open_memmap(out_dir / SCALES_FILE, mode="w+", dtype=np.float32, shape=(count,))
+        if dtype == "int8"
+        else None
+    )
+    stored_dim = vector_size
+    row = 0
+    offset = None
+    with _open_write(out_dir / PAYLOADS_FILE, compress) as payloads:
+        while True:
+            points, offset = client.scroll(
+                source,
+                scroll_filter=CHUNK_POINTS,
+                limit=limit,
+                offset=offset,
+                with_payload=True,
+                with_vectors=[FULL_VECTOR] if named else True,
+            )
+            if not points:
+                break
+            if row + len(points) > count:
+                raise RuntimeError(f"{name} grew while being exported; stop writes to it and retry")
+            block = np.asarray([p.vector[FULL_VECTOR] if named else p.vector for p in points], dtype=np.float32)
+            if vectors is None:
+                stored_dim = _stored_dim(block)
+                vectors = np.lib.format.open_memmap(
+                    out_dir / VECTORS_FILE, mode="w+", dtype=dtype, shape=(count, stored_dim)
+                )
+            elif np.any(block[:, stored_dim:]):
+                raise ValueError(
+                    f"Vectors in {name} have non-zero values beyond dimension {stored_dim}; "
+                    "padding detection from the first batch does not hold for this collection"
+                )
+            quantized, block_scales = _quantize(block[:, :stored_dim], dtype)
+            vectors[row : row + len(points)] = quantized
+            if scales is not None:
+                scales[row : row + len(points)] = block_scales
+            lines = (
+                json.dumps({"id": _point_id(p.id), **(p.payload or {})}, ensure_ascii=False)
+                for p in points
+            )
+            payloads.write(("\n".join(lines) + "\n").encode("utf-8"))
+            row += len(points)
+            if offset is None:
+                break
+
+    if vectors is None:
+        vectors = np.lib.format.open_memmap(out_dir / VECTORS_FILE, mode="w+", dtype=dtype, shape=(0, vector_size))
+    stored_dim = int(vectors.shape[1])
+    _finish_array(out_dir / VECTORS_FILE, vectors, row, compress)
+    if scales is not None:
+        _finish_array(out_dir / SCALES_FILE, scales, row, compress)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "collection": name,
+        "model": EMBEDDING_MODEL,
+        "backend": EMBEDDING_BACKEND,
+        "vector_size": vector_size,
+        "stored_dim": stored_dim,
+        "compact_dim": compact_dim,
+        "distance": "cosine",
+        "dtype": dtype,
+        "compressed": compress,
+        "count": row,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    metadata = load_metadata_index(name)
+    if metadata is not None:
+        with _open_write(out_dir / METADATA_FILE, compress) as f:
+            f.write(json.dumps(metadata.to_dict(), ensure_ascii=False).encode("utf-8"))
+    else:
+        logger.warning("No metadata index for %s on this host; the snapshot will not carry one", name)
+    manifest["metadata_index"] = metadata is not None
+    (out_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    logger.info(
+        "Exported %d points from %s to %s in %.1fs (%s, dim %d of %d)",
+        row,
+        name,
+        out_dir,
+        time.perf_counter() - started,
+        dtype,
+        stored_dim,
+        vector_size,
+    )
+    return manifest
+
+
+def _point_id(point_id: Any) -> int | str:
+    return point_id if isinstance(point_id, int) else str(point_id)
+
+
+def _finish_array(path: Path, array: np.memmap, rows: int, compress: bool) -> None:
+    """
+    Flush a memory-mapped .npy; if the collection shrank during the export, rewrite it with
+    the rows actually written. compress=True streams it into path.gz and removes the .npy.
+    """
+    array.flush()
+    if rows < len(array):
+        trimmed = path.with_suffix(".tmp.npy")
+        out = np.lib.format.open_memmap(trimmed, mode="w+", dtype=array.dtype, shape=(rows, *array.shape[1:]))
+        out[:] = array[:rows]
+        out.flush()
+        del out
+        trimmed.replace(path)
+    del array
+    if compress:
+        with open(path, "rb") as src, _open_write(path, True) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        path.unlink()
+
+
+def _load_metadata(path: Path) -> MetadataIndex:
+    with _open_read(path) as f:
+        return MetadataIndex.from_dict(json.loads(f.read().decode("utf-8")))
+
+
+def read_manifest(snapshot_dir: Path) -> dict[str, Any]:
+    path = snapshot_dir / MANIFEST_FILE
+    if not path.exists():
+        raise FileNotFoundError(f"Snapshot manifest not found: {path}")
+    manifest = json.loads(path.read_text(encoding="utf-8"))
+    if manifest.get("format_version") not in READABLE_VERSIONS:
+        raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+    return manifest
+
+
+def _load_array(snapshot_dir: Path, filename: str, compressed: bool) -> np.ndarray:
+    """Uncompressed arrays are memory-mapped, so import streams from the page cache."""
+    if compressed:
+        with _open_read(snapshot_dir / filename) as f:
+            return np.load(f)
+    return np.load(snapshot_dir / filename, mmap_mode="r")
+
+
+def _iter_blocks(
+    vectors: np.ndarray, scales: np.ndarray | None, vector_size: int, block_rows: int
+) -> Iterator[np.ndarray]:
+    """Dequantize and re-pad blocks of rows to the collection's vector size."""
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start : start + block_rows], dtype=np.float32)
+        if scales is not None:
+            block = block * scales[start : start + block_rows, None]
+        padded = np.zeros((len(block), vector_size), dtype=np.float32)
+        padded[:, : block.shape[1]] = block
+        yield padded
+
+
+def _iter_records(snapshot_dir: Path, manifest: dict[str, Any]) -> Iterator[tuple[int | str, dict[str, Any]]]:
+    """(id, payload) per point, in vector order: JSON lines, or the format-1 payload columns."""
+    if manifest["format_version"] == 1:
+        with _open_read(snapshot_dir / COLUMNS_FILE) as f:
+            columns: dict[str, list[Any]] = json.loads(f.read().decode("utf-8"))
+        ids = columns.pop("id")
+        for i, point_id in enumerate(ids):
+            yield point_id, {k: v[i] for k, v in columns.items() if v[i] is not None}
+        return
+    with _open_read(snapshot_dir / PAYLOADS_FILE) as f:
+        for line in f:
+            if line.strip():
+                payload = json.loads(line)
+                yield payload.pop("id"), payload
+
+
+def _iter_points(
+    records: Iterator[tuple[int | str, dict[str, Any]]],
+    blocks: Iterator[np.ndarray],
+    projection: Projection | None,
+    emails: EmailVectors | None,
+) -> Iterator[models.PointStruct]:
+    """
+    Pair each dequantized row with its record (plus the compact vector when there is a
+    projection); the email-level vectors are accumulated on the same pass.
+    """
+    for padded in blocks:
+        compact = projection.project(padded) if projection is not None else None
+        for i, (full, (point_id, payload)) in enumerate(zip(padded, records)):
+            if emails is not None:
+                emails.add(payload, full)
+            vector = full.tolist()
+            if compact is not None:
+                vector = {FULL_VECTOR: vector, COMPACT_VECTOR: compact[i].tolist()}
+            yield models.PointStruct(id=point_id, vector=vector, payload=payload)
+
+
+def import_snapshot(
+    snapshot_dir: Path,
+    collection_name: str | None = None,
+    *,
+    client: QdrantClient | None = None,
+    parallel: int | None = None,
+    batch_size: int | None = None,
+    force: bool = False,
+    profile: str | None = None,
+) -> int:
+    """
+    Recreate a collection from a snapshot and bulk-load it with batched uploads
+    (`parallel` upload processes). No embedding model is loaded. Refuses snapshots made
+    with a different EMBEDDING_MODEL unless force=True, since queries would not match.
+    `profile` names a collection profile (default: QDRANT_COLLECTION_PROFILE).
+    A failed import deletes the version it was writing. The snapshot's metadata index, if
+    any, is saved for the imported collection. Returns the number of points loaded.
+    """
+    manifest = read_manifest(snapshot_dir)
+    if manifest["model"] != EMBEDDING_MODEL and not force:
+        raise ValueError(
+            f"Snapshot was built with {manifest['model']!r} but EMBEDDING_MODEL is {EMBEDDING_MODEL!r}; "
+            "pass force=True to import anyway"
+        )
+    client = client or get_qdrant_client()
+    name = collection_name or manifest["collection"]
+    size = int(manifest["vector_size"])
+    compressed = bool(manifest["compressed"])
+    batch = batch_size or SNAPSHOT_BATCH_SIZE
+    started = time.perf_counter()
+
+    vectors = _load_array(snapshot_dir, VECTORS_FILE, compressed)
+    scales = _load_array(snapshot_dir, SCALES_FILE, compressed) if manifest["dtype"] == "int8" else None
+    count = len(vectors)
+
+    projection = Projection.load(snapshot_dir / PROJECTION_FILE) if manifest.get("compact_dim") else None
+    collection = collection_profile(profile)
+    target = prepare_collection(
+        client, name, size=size, profile=collection, compact_dim=projection.dim if projection else 0
+    )
+    # The email-level index is derived data: rebuilt from the vectors as they are uploaded
+    emails = EmailVectors() if INDEX_EMAIL_VECTORS else None
+    try:
+        client.upload_points(
+            collection_name=target,
+            points=_iter_points(
+                _iter_records(snapshot_dir, manifest), _iter_blocks(vectors, scales, size, batch), projection, emails
+            ),
+            batch_size=batch,
+            parallel=parallel or SNAPSHOT_UPLOAD_PARALLEL,
+            wait=True,
+        )
+        if projection is not None:
+            save_projection(target, projection, client)
+        finalize_collection(client, target, profile=collection)
+        # Warm-up queries would need the embedding model; the point-count check still gates the swap
+        publish_collection(client, name, target, expected_count=count, warmup_queries=[])
+    except BaseException:
+        discard_version(client, name, target)
+        raise
+    if manifest.get("metadata_index"):
+        save_metadata_index(_load_metadata(snapshot_dir / METADATA_FILE), name)
+    else:
+        logger.warning(
+            "Snapshot has no metadata index; routing and $prefix filters stay off for %s until `cli.py index`", name
+        )
+    if emails is not None:
+        build_email_index(client, name, emails, size=size, profile=collection)
+    logger.info(
+        "Imported %d points into %s in %.1fs",
+        count,
+        target,
+        time.perf_counter() - started,
+    )
+    return count
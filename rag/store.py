@@ -1,94 +1,652 @@
-"""Qdrant vector store: add chunks, search with optional payload filters."""
+"""Qdrant vector store: add chunks, search with optional payload filters; blue/green versions behind an alias."""
 
+import itertools
 import logging
+import threading
+import time
 import uuid
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Iterator
 
+import numpy as np
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
+from qdrant_client.http.exceptions import UnexpectedResponse
 
 from rag.config import (
+    INDEX_BLUE_GREEN,
+    INDEX_COMPACT_DIM,
+    INDEX_COMPACT_METHOD,
+    INDEX_COMPACT_SAMPLE,
+    INDEX_EMAIL_VECTORS,
+    INDEX_EMBED_BATCH_SIZE,
+    INDEX_RETAIN_VERSIONS,
+    INDEX_WARMUP_QUERIES,
     QDRANT_API_KEY,
     QDRANT_COLLECTION_NAME,
+    QDRANT_INDEXING_TIMEOUT,
     QDRANT_TIMEOUT,
-    QDRANT_UPSERT_BATCH_SIZE,
     QDRANT_URL,
     QDRANT_VECTOR_SIZE,
+    RETRIEVE_LAYOUT_TTL,
+    RETRIEVE_RESCORE_FACTOR,
+    TOP_K,
+    CollectionProfile,
+    collection_profile,
 )
+from rag.bulk_upload import BulkUploader
 from rag.embedding import embed_texts, embedding_dimension
-from rag.models import Chunk
+from rag.models import Chunk, ChunkBatch
+from rag.projection import (
+    COMPACT_VECTOR,
+    FULL_VECTOR,
+    Projection,
+    delete_projection,
+    PROJECTION_POINT_ID,
+    fit_projection,
+    load_projection,
+    save_projection,
+)
 
 logger = logging.getLogger(__name__)
 
+PAYLOAD_INDEX_FIELDS = ("subject", "from", "to", "source_file")
+DATETIME_INDEX_FIELDS = ("date",)
+VERSION_SEPARATOR = "__v"
+EMAIL_INDEX_SUFFIX = "_emails"
+EMAIL_PAYLOAD_FIELDS = ("source_file", "subject", "from", "to", "date")
+DEFAULT_INDEXING_THRESHOLD_KB = 20000  # Qdrant's default, restored after a deferred bulk load
+MEMORY_LOCATION = ":memory:"
+# Every point but the reserved one that carries a collection's projection
+CHUNK_POINTS = models.Filter(must_not=[models.HasIdCondition(has_id=[PROJECTION_POINT_ID])])
+PATH_PREFIX = "path:"
+
+# Alias (or collection) -> (looked up at, physical collection, compact vector size or 0)
+_layouts: dict[str, tuple[float, str, int]] = {}
+# Physical chunk collections found to have no email-level index (searched flat); forgotten
+# whenever an index is published or an email index is built
+_no_email_index: set[str] = set()
+
+# Embedded client per location: one process-wide instance, so index and queries see the same data
+_embedded: dict[str, "EmbeddedClient"] = {}
+_embedded_lock = threading.Lock()
+
+
+class EmbeddedClient:
+    """
+    In-process Qdrant (qdrant-client local mode) with calls serialized by a lock: local mode
+    is not thread-safe, and upload workers and concurrent asks share one instance.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
 
-def get_qdrant_client() -> QdrantClient:
-    """Return Qdrant client from env (url + optional api_key + timeout)."""
-    kwargs: dict[str, Any] = {"url": QDRANT_URL, "timeout": QDRANT_TIMEOUT}
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def locked(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                return attr(*args, **kwargs)
+
+        return locked
+
+
+def _embedded_client(location: str) -> EmbeddedClient:
+    with _embedded_lock:
+        if location not in _embedded:
+            if location == MEMORY_LOCATION:
+                client = QdrantClient(location=MEMORY_LOCATION)
+            else:
+                client = QdrantClient(path=location[len(PATH_PREFIX) :])
+            logger.info("Using embedded Qdrant (%s)", location)
+            _embedded[location] = EmbeddedClient(client)
+        return _embedded[location]
+
+
+def get_qdrant_client(location: str | None = None) -> QdrantClient:
+    """
+    Return Qdrant client from env (url + optional api_key + timeout). QDRANT_URL=":memory:"
+    or "path:<dir>" selects embedded Qdrant instead (no server; e.g. offline tests, load runs).
+    `location` overrides QDRANT_URL (e.g. "path:./qdrant_data" for snapshot import --local).
+    """
+    url = location or QDRANT_URL
+    if url == MEMORY_LOCATION or url.startswith(PATH_PREFIX):
+        return _embedded_client(url)
+    kwargs: dict[str, Any] = {"url": url, "timeout": QDRANT_TIMEOUT}
     if QDRANT_API_KEY:
         kwargs["api_key"] = QDRANT_API_KEY
     return QdrantClient(**kwargs)
 
 
-def build_store_from_chunks(
-    chunks: list[Chunk],
-    collection_name: str | None = None,
+def create_collection(
+    client: QdrantClient,
+    name: str,
     *,
-    _persist: bool = True,
+    size: int,
+    profile: CollectionProfile | None = None,
+    compact_dim: int = 0,
 ) -> None:
     """
-    Create or recreate collection, embed chunks (padded to 1536), upsert to Qdrant.
-    Uses sentence-transformers for embedding; vectors are padded to QDRANT_VECTOR_SIZE.
+    Create a cosine collection tuned by `profile` (default: QDRANT_COLLECTION_PROFILE)
+    with keyword payload indexes on the filterable fields.
+    compact_dim > 0: named vectors "full" (kept on disk, only read for rescoring) and
+    "compact" (the first-pass search vector).
     """
-    client = get_qdrant_client()
-    name = collection_name or QDRANT_COLLECTION_NAME
-    size = embedding_dimension()
-
-    # Delete existing collection for idempotent re-index
-    try:
-        client.delete_collection(name)
-        logger.info("Deleted existing collection %s", name)
-    except Exception:  # noqa: S110
-        pass
-
+    profile = profile or collection_profile()
+    full = models.VectorParams(
+        size=size,
+        distance=models.Distance.COSINE,
+        on_disk=(profile.on_disk_vectors or bool(compact_dim)) or None,
+    )
+    vectors_config: models.VectorParams | dict[str, models.VectorParams] = full
+    if compact_dim:
+        vectors_config = {
+            FULL_VECTOR: full,
+            COMPACT_VECTOR: models.VectorParams(
+                size=compact_dim,
+                distance=models.Distance.COSINE,
+                on_disk=profile.on_disk_vectors or None,
+            ),
+        }
     client.create_collection(
         collection_name=name,
-        vectors_config=models.VectorParams(size=size, distance=models.Distance.COSINE),
+        vectors_config=vectors_config,
+        hnsw_config=models.HnswConfigDiff(
+            m=0 if profile.defer_indexing else profile.hnsw_m,
+            ef_construct=profile.hnsw_ef_construct,
+            full_scan_threshold=profile.full_scan_threshold,
+            on_disk=profile.hnsw_on_disk or None,
+        ),
+        optimizers_config=models.OptimizersConfigDiff(
+            default_segment_number=profile.default_segment_number,
+            max_segment_size=profile.max_segment_size,
+            memmap_threshold=profile.memmap_threshold,
+            indexing_threshold=0 if profile.defer_indexing else profile.indexing_threshold,
+        ),
+        on_disk_payload=profile.on_disk_payload or None,
     )
 
     # Payload indexes required for filtering by subject, from, to, source_file
-    for field in ("subject", "from", "to", "source_file"):
+    for field in PAYLOAD_INDEX_FIELDS:
         client.create_payload_index(
             collection_name=name,
             field_name=field,
             field_schema=models.PayloadSchemaType.KEYWORD,
         )
+    # Date-range filters ($gte / $lt on "date")
+    for field in DATETIME_INDEX_FIELDS:
+        client.create_payload_index(
+            collection_name=name,
+            field_name=field,
+            field_schema=models.PayloadSchemaType.DATETIME,
+        )
 
-    # Qdrant expects int or UUID; use stable UUID from chunk_id
-    point_ids = [uuid.uuid5(uuid.NAMESPACE_DNS, c.chunk_id) for c in chunks]
-    payloads = [
-        {
-            "text": c.text,
-            "source_file": c.source_file,
-            "subject": c.subject,
-            "from": c.from_,
-            "to": c.to,
-        }
-        for c in chunks
-    ]
-    embeddings = embed_texts([c.text for c in chunks])
-
-    batch_size = QDRANT_UPSERT_BATCH_SIZE
-    for i in range(0, len(chunks), batch_size):
-        batch_ids = point_ids[i : i + batch_size]
-        batch_vectors = embeddings[i : i + batch_size]
-        batch_payloads = payloads[i : i + batch_size]
-        points = [
-            models.PointStruct(id=pid, vector=vec, payload=payload)
-            for pid, vec, payload in zip(batch_ids, batch_vectors, batch_payloads)
-        ]
-        client.upsert(collection_name=name, points=points)
-        logger.debug("Upserted batch %d–%d", i + 1, min(i + batch_size, len(chunks)))
-    logger.info("Indexed %d chunks into Qdrant collection %s", len(chunks), name)
+
+def finalize_collection(
+    client: QdrantClient,
+    name: str,
+    *,
+    profile: CollectionProfile | None = None,
+    timeout: float | None = None,
+) -> None:
+    """
+    After a bulk load: re-enable HNSW and indexing if the profile deferred them, then wait
+    (up to QDRANT_INDEXING_TIMEOUT) for the collection to turn green so it is not served
+    while segments are still unindexed.
+    """
+    profile = profile or collection_profile()
+    if profile.defer_indexing:
+        client.update_collection(
+            collection_name=name,
+            hnsw_config=models.HnswConfigDiff(m=profile.hnsw_m),
+            optimizers_config=models.OptimizersConfigDiff(
+                indexing_threshold=profile.indexing_threshold or DEFAULT_INDEXING_THRESHOLD_KB,
+            ),
+        )
+        logger.info("Enabled HNSW indexing on %s (m=%d)", name, profile.hnsw_m)
+    deadline = time.monotonic() + (QDRANT_INDEXING_TIMEOUT if timeout is None else timeout)
+    while True:
+        status = client.get_collection(name).status
+        if status == models.CollectionStatus.GREEN:
+            return
+        if status == models.CollectionStatus.RED:
+            raise RuntimeError(f"Collection {name} is red after bulk load")
+        if time.monotonic() >= deadline:
+            logger.warning("Collection %s still %s after waiting for indexing; continuing", name, status)
+            return
+        time.sleep(1.0)
+
+
+def new_version_name(alias: str) -> str:
+    """Versioned physical collection behind an alias, e.g. email_chunks__v20240101120000123456."""
+    return f"{alias}{VERSION_SEPARATOR}{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}"
+
+
+def alias_target(client: QdrantClient, alias: str) -> str | None:
+    """Collection an alias currently points to, or None."""
+    for a in client.get_aliases().aliases:
+        if a.alias_name == alias:
+            return a.collection_name
+    return None
+
+
+def resolve_collection(client: QdrantClient, name: str) -> str:
+    """Physical collection behind `name` (the alias target, or `name` itself)."""
+    return alias_target(client, name) or name
+
+
+def prepare_collection(
+    client: QdrantClient,
+    name: str,
+    *,
+    size: int,
+    profile: CollectionProfile | None = None,
+    compact_dim: int = 0,
+) -> str:
+    """
+    Create the collection an index build writes into and return its name.
+    Blue/green (INDEX_BLUE_GREEN): a new versioned collection; the live alias keeps serving.
+    Otherwise: delete and recreate `name` in place.
+    """
+    if INDEX_BLUE_GREEN:
+        target = new_version_name(name)
+    else:
+        target = name
+        # Delete existing collection for idempotent re-index
+        try:
+            client.delete_collection(name)
+            logger.info("Deleted existing collection %s", name)
+        except Exception:  # noqa: S110
+            pass
+        delete_projection(name)
+        _layouts.pop(name, None)
+    create_collection(client, target, size=size, profile=profile, compact_dim=compact_dim)
+    return target
+
+
+def vector_layout(client: QdrantClient, name: str) -> tuple[str, int]:
+    """
+    (physical collection behind `name`, size of its compact vectors or 0), read from the
+    collection config and reused for RETRIEVE_LAYOUT_TTL seconds (an alias swap in this
+    process forgets it at once).
+    """
+    now = time.monotonic()
+    cached = _layouts.get(name)
+    if cached and now - cached[0] < RETRIEVE_LAYOUT_TTL:
+        return cached[1], cached[2]
+    target = resolve_collection(client, name)
+    vectors = client.get_collection(target).config.params.vectors
+    compact_dim = vectors[COMPACT_VECTOR].size if isinstance(vectors, dict) and COMPACT_VECTOR in vectors else 0
+    _layouts[name] = (now, target, compact_dim)
+    return target, compact_dim
+
+
+def is_missing_collection(error: Exception) -> bool:
+    """Whether a Qdrant error means the collection does not exist (server 404, or local mode's ValueError)."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    return isinstance(error, ValueError) and "not found" in str(error)
+
+
+def search_points(
+    client: QdrantClient,
+    name: str,
+    vector: list[float],
+    limit: int,
+    *,
+    query_filter: models.Filter | None = None,
+    search_params: models.SearchParams | None = None,
+) -> list[models.ScoredPoint]:
+    """
+    query_points on a chunk collection. If the collection version behind `name` has compact
+    vectors, search them for RETRIEVE_RESCORE_FACTOR * limit candidates and rescore those
+    with the full vector (one request; Qdrant prefetch).
+    """
+    target, compact_dim = vector_layout(client, name)
+    try:
+        return _query(client, target, compact_dim, vector, limit, query_filter, search_params)
+    except (UnexpectedResponse, ValueError) as e:
+        if not is_missing_collection(e) or target == name:
+            raise
+    # The cached version was swapped out and garbage-collected by another process: look it up again
+    _layouts.pop(name, None)
+    target, compact_dim = vector_layout(client, name)
+    return _query(client, target, compact_dim, vector, limit, query_filter, search_params)
+
+
+def _query(
+    client: QdrantClient,
+    target: str,
+    compact_dim: int,
+    vector: list[float],
+    limit: int,
+    query_filter: models.Filter | None,
+    search_params: models.SearchParams | None,
+) -> list[models.ScoredPoint]:
+    """
+    One query_points on a physical collection version, so its vectors and its projection
+    always come from the same build.
+    """
+    if not compact_dim:
+        return client.query_points(
+            collection_name=target,
+            query=vector,
+            limit=limit,
+            query_filter=query_filter,
+            search_params=search_params,
+            with_payload=True,
+        ).points
+    projection = load_projection(target, client)
+    if projection is None:
+        raise RuntimeError(f"{target} has {compact_dim}-dim compact vectors but no projection; re-index it")
+    return client.query_points(
+        collection_name=target,
+        prefetch=models.Prefetch(
+            query=projection.project([vector])[0].tolist(),
+            using=COMPACT_VECTOR,
+            limit=limit * max(1, RETRIEVE_RESCORE_FACTOR),
+            filter=query_filter,
+            params=search_params,
+        ),
+        query=vector,
+        using=FULL_VECTOR,
+        limit=limit,
+        with_payload=True,
+    ).points
+
+
+def warm_up(client: QdrantClient, name: str, queries: list[str]) -> None:
+    """Run warm-up queries against `name`; raise if any returns nothing (the index is not servable)."""
+    if not queries:
+        return
+    vectors = embed_texts(queries)
+    for query, vector in zip(queries, vectors):
+        started = time.perf_counter()
+        hits = search_points(client, name, vector, TOP_K)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not hits:
+            raise RuntimeError(f"Warm-up query {query!r} returned no results from {name}")
+        logger.info("Warm-up %r on %s: %d hits in %.1f ms", query, name, len(hits), elapsed_ms)
+
+
+def swap_alias(client: QdrantClient, alias: str, target: str) -> None:
+    """Point `alias` at `target` in one atomic alias update."""
+    operations: list[Any] = []
+    if alias_target(client, alias) is not None:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    elif any(c.name == alias for c in client.get_collections().collections):
+        # Legacy layout: a real collection holds the alias name; it must go before the alias can exist
+        logger.warning("Replacing plain collection %s with an alias (one-time migration)", alias)
+        client.delete_collection(alias)
+    operations.append(
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=target, alias_name=alias)
+        )
+    )
+    client.update_collection_aliases(change_aliases_operations=operations)
+    _layouts.pop(alias, None)
+    logger.info("Alias %s -> %s", alias, target)
+
+
+def gc_versions(client: QdrantClient, alias: str, *, keep: int | None = None) -> list[str]:
+    """Delete old versions of `alias`, keeping the newest `keep` (INDEX_RETAIN_VERSIONS) and the live one."""
+    retain = max(1, INDEX_RETAIN_VERSIONS if keep is None else keep)
+    live = alias_target(client, alias)
+    prefix = f"{alias}{VERSION_SEPARATOR}"
+    versions = sorted(
+        (c.name for c in client.get_collections().collections if c.name.startswith(prefix)),
+        reverse=True,
+    )
+    deleted = []
+    for name in versions[retain:]:
+        if name == live:
+            continue
+        client.delete_collection(name)
+        delete_projection(name)
+        deleted.append(name)
+    if deleted:
+        logger.info("Garbage-collected %d old version(s) of %s: %s", len(deleted), alias, deleted)
+    return deleted
+
+
+def publish_collection(
+    client: QdrantClient,
+    name: str,
+    target: str,
+    *,
+    expected_count: int,
+    warmup_queries: list[str] | None = None,
+) -> None:
+    """
+    Make a freshly built `target` live under `name`: verify the point count, run warm-up
+    queries, swap the alias atomically, then garbage-collect old versions.
+    No-op for in-place builds (target == name). On failure the alias is left untouched.
+    """
+    _no_email_index.clear()
+    if target == name:
+        return
+    count = client.count(target, count_filter=CHUNK_POINTS, exact=True).count
+    if count != expected_count:
+        raise RuntimeError(f"{target} has {count} points, expected {expected_count}; alias not swapped")
+    warm_up(client, target, INDEX_WARMUP_QUERIES if warmup_queries is None else warmup_queries)
+    swap_alias(client, name, target)
+    gc_versions(client, name)
+
+
+def discard_version(client: QdrantClient, name: str, target: str) -> None:
+    """Delete a version built for `name` that never went live (after a failed build); in-place builds are kept."""
+    if target == name or alias_target(client, name) == target:
+        return
+    try:
+        client.delete_collection(target)
+    except Exception as e:
+        logger.warning("Could not delete unpublished collection %s: %s", target, e)
+        return
+    delete_projection(target)
+    _layouts.pop(target, None)
+    logger.info("Deleted unpublished collection %s", target)
+
+
+def drop_index(client: QdrantClient, alias: str) -> list[str]:
+    """Delete `alias`, every version behind it and its email index (e.g. a throwaway evaluation index)."""
+    deleted = []
+    for name in (alias, email_index_name(alias)):
+        _layouts.pop(name, None)
+        if alias_target(client, name) is not None:
+            client.update_collection_aliases(
+                change_aliases_operations=[
+                    models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=name))
+                ]
+            )
+        prefix = f"{name}{VERSION_SEPARATOR}"
+        for collection in client.get_collections().collections:
+            if collection.name == name or collection.name.startswith(prefix):
+                client.delete_collection(collection.name)
+                delete_projection(collection.name)
+                deleted.append(collection.name)
+    return deleted
+
+
+def email_index_missing(client: QdrantClient, name: str) -> bool:
+    """Whether the collection behind `name` was found to have no email-level index."""
+    return vector_layout(client, name)[0] in _no_email_index
+
+
+def mark_email_index_missing(client: QdrantClient, name: str) -> None:
+    """Remember that the collection behind `name` has no email-level index, until the next build or publish."""
+    _no_email_index.add(vector_layout(client, name)[0])
+
+
+def email_index_name(collection_name: str) -> str:
+    """Alias of the email-level index that belongs to a chunk collection."""
+    return f"{collection_name}{EMAIL_INDEX_SUFFIX}"
+
+
+class EmailVectors:
+    """
+    Accumulate one vector per email from its chunk vectors (running sum -> mean).
+    A collapsed near-duplicate chunk counts towards every email listed in its `sources`.
+    """
+
+    def __init__(self) -> None:
+        self._sums: dict[str, np.ndarray] = {}
+        self._counts: dict[str, int] = {}
+        self._payloads: dict[str, dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._sums)
+
+    def add(self, payload: dict[str, Any], vector: list[float] | np.ndarray) -> None:
+        sources = payload.get("sources") or [payload]
+        vec = np.asarray(vector, dtype=np.float32)
+        for source in sources:
+            if not isinstance(source, dict):
+                continue
+            key = source.get("source_file")
+            if not key or not isinstance(key, str):
+                continue
+            if key in self._sums:
+                self._sums[key] += vec
+                self._counts[key] += 1
+            else:
+                self._sums[key] = vec.copy()
+                self._counts[key] = 1
+                # Empty fields are left out ("date" is datetime-indexed and "" does not parse)
+                self._payloads[key] = {f: source[f] for f in EMAIL_PAYLOAD_FIELDS if source.get(f)}
+
+    def points(self) -> Iterator[models.PointStruct]:
+        """PointStructs with the mean vector and email metadata (plus chunk count)."""
+        for key, total in self._sums.items():
+            yield models.PointStruct(
+                id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"email:{key}")),
+                vector=(total / self._counts[key]).tolist(),
+                payload={**self._payloads[key], "chunks": self._counts[key]},
+            )
+
+
+def build_email_index(
+    client: QdrantClient,
+    collection_name: str,
+    emails: EmailVectors,
+    *,
+    size: int,
+    profile: CollectionProfile | None = None,
+) -> str:
+    """Write email-level vectors into a new version of the email index and publish it."""
+    name = email_index_name(collection_name)
+    target = prepare_collection(client, name, size=size, profile=profile)
+    with BulkUploader(client, target) as uploader:
+        uploader.add(emails.points())
+        uploader.flush()
+    finalize_collection(client, target, profile=profile)
+    logger.info("Indexed %d email vectors into %s", len(emails), target)
+    publish_collection(client, name, target, expected_count=len(emails), warmup_queries=[])
+    _no_email_index.clear()  # publish clears it too, but not before the index exists
+    return target
+
+
+def _embedded_slices(chunks: ChunkBatch, first: int, step: int) -> Iterator[tuple[ChunkBatch, list[list[float]]]]:
+    """(chunks, embeddings) per slice: `first` chunks, then `step` at a time."""
+    start = 0
+    size = first
+    while start < len(chunks):
+        batch = chunks.slice(start, start + size)
+        yield batch, embed_texts(batch.texts())
+        start += size
+        size = step
+
+
+def _fit_compact(sample: list[list[float]], dim: int) -> Projection | None:
+    """Projection for compact vectors, or None (with a warning) if the sample is too small for PCA."""
+    if INDEX_COMPACT_METHOD == "pca" and len(sample) <= dim:
+        logger.warning(
+            "Only %d vectors to fit a %d-dim PCA; indexing without compact vectors", len(sample), dim
+        )
+        return None
+    return fit_projection(sample, dim, INDEX_COMPACT_METHOD)
+
+
+def build_store_from_chunks(
+    chunks: list[Chunk] | ChunkBatch,
+    collection_name: str | None = None,
+    *,
+    profile: CollectionProfile | str | None = None,
+    email_vectors: bool | None = None,
+    compact_dim: int | None = None,
+    _persist: bool = True,
+) -> str:
+    """
+    Embed chunks (padded to 1536) and upsert them to Qdrant; returns the collection written.
+    With INDEX_BLUE_GREEN the build goes to a new versioned collection that replaces the
+    live one via an alias swap, so `collection_name` keeps serving throughout.
+    `profile` is a CollectionProfile or preset name (default: QDRANT_COLLECTION_PROFILE).
+    `email_vectors` (default INDEX_EMAIL_VECTORS) also builds the email-level index from
+    the same embeddings, for two-stage retrieval.
+    `compact_dim` (default INDEX_COMPACT_DIM; 0 = off) fits a projection on the first
+    INDEX_COMPACT_SAMPLE embeddings and stores compact first-pass vectors next to the full ones.
+    Uses sentence-transformers for embedding; vectors are padded to QDRANT_VECTOR_SIZE.
+    A list of chunks is converted to a ChunkBatch first; slices are embedded and uploaded as batches.
+    """
+    if not isinstance(chunks, ChunkBatch):
+        chunks = ChunkBatch.from_chunks(chunks)
+    client = get_qdrant_client()
+    name = collection_name or QDRANT_COLLECTION_NAME
+    size = embedding_dimension()
+    if not isinstance(profile, CollectionProfile):
+        profile = collection_profile(profile)
+    with_emails = INDEX_EMAIL_VECTORS if email_vectors is None else email_vectors
+    dim = INDEX_COMPACT_DIM if compact_dim is None else compact_dim
+    emails = EmailVectors()
+
+    # Embed slice by slice; uploads of slice i run in background threads while slice i+1 is embedded.
+    # With compact vectors the first slice is the projection's training sample.
+    step = INDEX_EMBED_BATCH_SIZE
+    slices = _embedded_slices(chunks, max(step, INDEX_COMPACT_SAMPLE) if dim else step, step)
+    head = next(slices, None)
+    projection = _fit_compact(head[1], dim) if dim and head else None
+    target = prepare_collection(
+        client, name, size=size, profile=profile, compact_dim=projection.dim if projection else 0
+    )
+    try:
+        with BulkUploader(client, target) as uploader:
+            indexed = 0
+            for batch, embeddings in itertools.chain([head] if head else [], slices):
+                payloads = batch.payloads()
+                if with_emails:
+                    for payload, vec in zip(payloads, embeddings):
+                        emails.add(payload, vec)
+                vectors: list[Any] = embeddings
+                if projection is not None:
+                    compact = projection.project(embeddings).tolist()
+                    vectors = [{FULL_VECTOR: v, COMPACT_VECTOR: c} for v, c in zip(embeddings, compact)]
+                uploader.add(
+                    models.PointStruct(
+                        # Qdrant expects int or UUID; use stable UUID from chunk_id
+                        id=str(uuid.uuid5(uuid.NAMESPACE_DNS, batch.chunk_id(row))),
+                        vector=vec,
+                        payload=payload,
+                    )
+                    for row, (vec, payload) in enumerate(zip(vectors, payloads))
+                )
+                logger.debug("Embedded and queued chunks %d–%d", indexed + 1, indexed + len(batch))
+                indexed += len(batch)
+            uploader.flush()
+        if projection is not None:
+            # After the upload barrier, which counts points: the reserved point would satisfy it one early
+            save_projection(target, projection, client)
+        finalize_collection(client, target, profile=profile)
+        logger.info("Indexed %d chunks into Qdrant collection %s", len(chunks), target)
+        publish_collection(client, name, target, expected_count=len(chunks))
+    except BaseException:
+        # A half-built version would sit next to the live one until gc_versions got to it
+        discard_version(client, name, target)
+        raise
+    if with_emails:
+        build_email_index(client, name, emails, size=size, profile=profile)
+    return target
 
 
 def get_collection_name(collection_name: str | None = None) -> str:
@@ -0,0 +1,120 @@
+"""Synthetic email corpus with planted facts: any number of emails, each with one question only it answers."""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from rag.models import ParsedEmail
+
+SUBJECTS = (
+    "Budget Approval",
+    "Client Feedback",
+    "Deadline Extension",
+    "Meeting Request",
+    "Performance Review",
+    "Project Update",
+    "Team Announcement",
+    "Technical Issue",
+    "Training Opportunity",
+    "Vendor Proposal",
+)
+_FIRST_NAMES = (
+    "Anna", "Ben", "Clara", "David", "Elena", "Frank", "Grace", "Helen", "Ivan", "Julia",
+    "Karl", "Laura", "Mark", "Nico", "Olga", "Paul", "Rosa", "Sam", "Tara", "Victor",
+)
+_LAST_NAMES = (
+    "Adams", "Brooks", "Carter", "Diaz", "Evans", "Fisher", "Gomez", "Hughes", "Ito", "Jensen",
+    "Klein", "Lopez", "Moreau", "Nolan", "Owens", "Powell", "Reyes", "Silva", "Woods", "Wright",
+)
+_DOMAINS = ("corp.org", "tech.io", "business.net", "enterprise.com")
+# A fact names a department, a two-word codename and an event; 10 * 30 * 30 * 10 distinct combinations
+_DEPARTMENTS = (
+    "finance", "legal", "marketing", "research", "support", "sales", "design", "operations", "security", "facilities",
+)
+_ADJECTIVES = (
+    "amber", "cobalt", "crimson", "silver", "golden", "quiet", "rapid", "hidden", "northern", "frozen",
+    "bright", "hollow", "iron", "jade", "lunar", "marble", "misty", "noble", "coastal", "polar",
+    "rustic", "scarlet", "solar", "stone", "swift", "velvet", "violet", "wild", "winter", "copper",
+)
+_NOUNS = (
+    "falcon", "harbor", "otter", "maple", "summit", "canyon", "lantern", "meadow", "comet", "willow",
+    "raven", "glacier", "orchid", "badger", "beacon", "cedar", "dolphin", "ember", "fjord", "heron",
+    "island", "juniper", "kestrel", "lynx", "mesa", "nebula", "oak", "pine", "quartz", "river",
+)
+_EVENTS = ("workshop", "audit", "launch", "migration", "offsite", "review", "rollout", "kickoff", "hackathon", "demo")
+_CITIES = ("Lisbon", "Oslo", "Denver", "Osaka", "Nairobi", "Toronto", "Seville", "Krakow", "Perth", "Austin")
+_WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+_MONTHS = ("March", "April", "May", "June", "September", "October", "November")
+# Shared filler: every email carries some, so only the planted fact tells emails apart
+_FILLER = (
+    "I wanted to share a quick update with you before the end of the week.",
+    "Please let me know if you have any questions or concerns about this.",
+    "The team has been working hard to keep everything on schedule.",
+    "I believe this will help us meet our goals for the quarter.",
+    "We should keep communication open throughout this process.",
+    "Your input on the next steps would be greatly appreciated.",
+    "I have attached the relevant documents for your review.",
+    "Thanks again for your continued support on this initiative.",
+    "We will follow up with more details once everything is confirmed.",
+    "This is an important step for our department and the wider organization.",
+)
+MAX_EMAILS = len(_DEPARTMENTS) * len(_ADJECTIVES) * len(_NOUNS) * len(_EVENTS)
+
+
+@dataclass(frozen=True, slots=True)
+class SyntheticEmail:
+    """A generated email and the question that only its planted fact answers."""
+
+    email: ParsedEmail
+    question: str
+
+
+def _person(rng: random.Random) -> tuple[str, str]:
+    first, last = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+    return f"{first} {last}", f"{first.lower()}.{last.lower()}@{rng.choice(_DOMAINS)}"
+
+
+def synthetic_emails(n: int, *, seed: int = 0) -> list[SyntheticEmail]:
+    """
+    `n` emails (at most MAX_EMAILS), the same for the same seed. Each body is greeting,
+    filler, a paragraph with one planted fact (department, codename, event, date, city)
+    and a sign-off; the fact's combination of department, codename and event is unique, so
+    its question has exactly one relevant email. Facts share words with other emails, which
+    makes close misses.
+    """
+    if not 0 <= n <= MAX_EMAILS:
+        raise ValueError(f"Can generate 0..{MAX_EMAILS} synthetic emails, got {n}")
+    rng = random.Random(seed)
+    combos = rng.sample(range(MAX_EMAILS), n)
+    start = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+    out = []
+    for i, combo in enumerate(combos):
+        combo, event = divmod(combo, len(_EVENTS))
+        combo, noun = divmod(combo, len(_NOUNS))
+        department, adjective = divmod(combo, len(_ADJECTIVES))
+        name = f"{_ADJECTIVES[adjective]} {_NOUNS[noun]} {_EVENTS[event]}"
+        team = _DEPARTMENTS[department]
+        city = rng.choice(_CITIES)
+        when = f"{rng.choice(_WEEKDAYS)}, {rng.choice(_MONTHS)} {rng.randint(1, 28)}"
+        (from_name, from_email), (to_name, to_email) = _person(rng), _person(rng)
+        fact = f"The {team} team's {name} is scheduled for {when}, in {city}. {rng.choice(_FILLER)}"
+        body = "\n\n".join(
+            (
+                f"Hello {to_name.split()[0]},",
+                " ".join(rng.sample(_FILLER, 3)),
+                fact,
+                f"Best regards,\n{from_name}",
+            )
+        )
+        email = ParsedEmail(
+            source_file=f"synthetic_{i + 1:05d}.txt",
+            subject=rng.choice(SUBJECTS),
+            from_name=from_name,
+            from_email=from_email,
+            to_name=to_name,
+            to_email=to_email,
+            body=body,
+            date=(start + timedelta(hours=i)).isoformat(),
+        )
+        out.append(SyntheticEmail(email, f"When and where is the {name} of the {team} team?"))
+    return out
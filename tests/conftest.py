@@ -9,6 +9,9 @@ import pytest
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 os.environ.setdefault("EMAILS_DIR", str(PROJECT_ROOT / "emails"))
 os.environ.setdefault("QDRANT_COLLECTION_NAME", "test_email_chunks")
+# Never answer from (or log into) a developer's store; tests that need them pass tmp paths
+os.environ.setdefault("ANSWER_STORE", "0")
+os.environ.setdefault("QUERY_LOG", "0")
 
 
 @pytest.fixture(scope="session")
@@ -0,0 +1,141 @@
+"""Unit tests for the query log and precomputed answers: logging, frequent-question mining, store lookups (no LLM, no Qdrant)."""
+
+import json
+
+import pytest
+
+import rag.metadata_index
+import rag.pipeline
+import rag.retrieve
+import rag.store
+from rag.answer_store import AnswerStore
+from rag.models import AskResponse, ParsedEmail, RetrieveResult
+from rag.pipeline import RAGPipeline
+from rag.query_log import QueryLog, frequent_questions, normalize_question, scope_key
+
+RESULTS = [
+    RetrieveResult(text="The Q3 budget was approved.", metadata={"source_file": "budget.txt"}, distance=0.9),
+    RetrieveResult(text="Training starts Monday.", metadata={"source_file": "training.txt"}, distance=0.7),
+]
+
+
+def test_normalize_and_scope():
+    assert normalize_question("  What was  APPROVED? ") == normalize_question("what was approved")
+    assert scope_key(None) == scope_key({}, []) == ""
+    assert scope_key({"b": 1, "a": 2}, ["y", "x"]) == scope_key({"a": 2, "b": 1}, ["x", "y"])
+    assert scope_key({"a": 1}) != scope_key({"a": 1}, ["x"])
+
+
+def test_frequent_questions():
+    entries = [
+        {"q": "budget", "via": "rag"},
+        {"q": "budget", "via": "store"},
+        {"q": "budget", "where": {"from": "Ann"}, "via": "rag"},
+        {"q": "training", "via": "rag"},
+        {"q": "training", "via": "rag"},
+        {"q": "training", "via": "rag"},
+        {"q": "how many emails from ann", "via": "route"},
+        {"q": "how many emails from ann", "via": "route"},
+    ]
+    assert frequent_questions(iter(entries), top=5, min_count=2) == [
+        ("training", None, None, 3),
+        ("budget", None, None, 2),
+    ]
+    assert frequent_questions(iter(entries), top=1, min_count=1) == [("training", None, None, 3)]
+
+
+def test_answer_store_roundtrip(tmp_path):
+    store = AnswerStore(tmp_path / "answers.sqlite3")
+    assert store.get("mail", "budget") is None
+    assert not store.path.exists()  # lookups never create the file
+    store.put("mail", "budget", "", "Approved.", RESULTS)
+    answer, results = store.get("mail", "budget")
+    assert answer == "Approved."
+    assert [(r.source_file, r.distance) for r in results] == [("budget.txt", 0.9), ("training.txt", 0.7)]
+    assert store.get("mail", "budget", scope_key({"from": "Ann"})) is None
+    assert store.get("other", "budget") is None
+    assert store.clear("mail") == 1
+    assert store.count() == 0
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path):
+    """Pipeline with fake stages, a tmp query log and answer store; counts calls to retrieve and generate."""
+    calls = {"retrieve": 0, "generate": 0}
+
+    def retrieve(query, top_k=None, **kwargs):
+        calls["retrieve"] += 1
+        return RESULTS
+
+    def generate(query, results, **kwargs):
+        calls["generate"] += 1
+        return f"answer to {query}"
+
+    monkeypatch.setattr(rag.pipeline, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(rag.pipeline, "plan_queries", lambda query: [query, f"{query} details"])
+    monkeypatch.setattr(rag.pipeline, "generate", generate)
+    monkeypatch.setattr(rag.retrieve, "retrieve", retrieve)
+    pipe = RAGPipeline(collection_name="mail", shards=[])
+    pipe.query_log = QueryLog(tmp_path / "query_log.jsonl")
+    pipe.answers = AnswerStore(tmp_path / "answers.sqlite3")
+    return pipe, calls
+
+
+def test_ask_appends_a_compact_log_line(pipeline):
+    pipe, _ = pipeline
+    pipe.ask("What was approved?", where={"from": "Ann"}, deadline_ms=0)
+    (entry,) = list(pipe.query_log.entries())
+    assert entry["q"] == "what was approved"
+    assert entry["where"] == {"from": "Ann"}
+    assert entry["planned"] == ["What was approved?", "What was approved? details"]
+    assert entry["sources"] == ["budget.txt", "training.txt"]
+    assert set(entry["ms"]) == {"plan", "retrieve", "generate"}
+    assert entry["via"] == "rag"
+    assert "answer to" not in pipe.query_log.path.read_text(encoding="utf-8")  # no answer text
+    pipe.ask("What was approved?", log=False)
+    assert len(list(pipe.query_log.entries())) == 1
+
+
+def test_precomputed_answers_are_served_until_reindex(pipeline, monkeypatch, tmp_path):
+    pipe, calls = pipeline
+    for question in ("What was approved?", "what was approved", "Who starts Monday?", "What was approved"):
+        pipe.ask(question, deadline_ms=0)
+    assert pipe.precompute(top=5, min_count=2) == 1  # "who starts monday" was asked once
+
+    before = dict(calls)
+    response = pipe.ask("WHAT was approved?")
+    assert calls == before  # no planning, retrieval or generation
+    assert response.answer == "answer to what was approved"
+    assert [r.source_file for r in response.results] == ["budget.txt", "training.txt"]
+    assert "answer_store" in response.timings_ms
+    assert json.loads(pipe.query_log.path.read_text(encoding="utf-8").splitlines()[-1])["via"] == "store"
+    # Other search settings or scopes are not served from the store
+    pipe.ask("what was approved", top_k=1, deadline_ms=0)
+    pipe.ask("what was approved", where={"from": "Ann"}, deadline_ms=0)
+    assert calls["generate"] == before["generate"] + 2
+
+    email = ParsedEmail(
+        source_file="budget.txt",
+        subject="Budget",
+        from_name="Ann",
+        from_email="a@x.io",
+        to_name="Bob",
+        to_email="b@x.io",
+        body="The Q3 budget was approved.",
+    )
+    monkeypatch.setattr(rag.metadata_index, "METADATA_INDEX_DIR", tmp_path)
+    monkeypatch.setattr(rag.pipeline, "iter_all_emails", lambda path=None: iter([email]))
+    monkeypatch.setattr(rag.store, "build_store_from_chunks", lambda chunks, **kwargs: None)
+    pipe.index()
+    assert pipe.answers.count("mail") == 0
+
+
+def test_degraded_answers_are_not_stored(pipeline, monkeypatch):
+    pipe, _ = pipeline
+    for _ in range(2):
+        pipe.ask("What was approved?", deadline_ms=0)
+    monkeypatch.setattr(
+        pipe, "ask", lambda *a, **k: AskResponse("partial", RESULTS, degradations=["extractive_answer"])
+    )
+    assert pipe.precompute(min_count=2) == 0
+    assert pipe.answers.count() == 0
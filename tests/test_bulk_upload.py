@@ -0,0 +1,119 @@
+"""Unit tests for the parallel, adaptive Qdrant bulk uploader (fake client, no server)."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from qdrant_client.http import models
+from qdrant_client.http.exceptions import ResponseHandlingException
+
+from rag import bulk_upload
+from rag.bulk_upload import BulkUploader
+
+
+class FakeClient:
+    """Records upserts; optional per-call latency and a number of leading failures."""
+
+    def __init__(
+        self, latency: float = 0.0, failures: int = 0, status_code: int | None = 503, error: Exception | None = None
+    ):
+        self.latency = latency
+        self.failures = failures
+        self.status_code = status_code
+        self.error = error
+        self.batches: list[int] = []
+        self.ids: set = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, collection_name, points, wait):
+        assert wait is False
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.failures > 0
+            self.failures -= 1 if fail else 0
+        try:
+            time.sleep(self.latency)
+            if fail:
+                if self.error is not None:
+                    raise self.error
+                error = RuntimeError("unavailable")
+                error.status_code = self.status_code
+                raise error
+            with self._lock:
+                self.batches.append(len(points))
+                self.ids.update(p.id for p in points)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def count(self, collection_name, exact):
+        return SimpleNamespace(count=len(self.ids))
+
+
+def _points(n: int):
+    return [models.PointStruct(id=i, vector=[0.1, 0.2], payload={"text": "x"}) for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(bulk_upload, "backoff_delay", lambda attempt: 0.0)
+
+
+def test_uploads_everything_and_grows_batches_under_target_latency():
+    client = FakeClient()
+    uploader = BulkUploader(client, "c", workers=3, batch_size=10, max_batch_size=100, target_latency_ms=1000)
+    uploader.add(_points(1000))
+    assert uploader.flush() == 1000
+    assert client.ids == set(range(1000))
+    assert max(client.batches) > 10
+    assert max(client.batches) <= 100
+
+
+def test_shrinks_batches_when_slow_and_bounds_in_flight():
+    client = FakeClient(latency=0.02)
+    uploader = BulkUploader(client, "c", workers=2, batch_size=64, min_batch_size=4, target_latency_ms=1)
+    uploader.add(_points(200))
+    uploader.flush()
+    assert len(client.ids) == 200
+    assert uploader.batch_size == 4
+    assert client.max_in_flight <= 2
+
+
+def test_retries_transient_errors():
+    client = FakeClient(failures=2)
+    uploader = BulkUploader(client, "c", workers=1, batch_size=10, max_retries=3)
+    uploader.add(_points(30))
+    uploader.flush()
+    assert len(client.ids) == 30
+    assert uploader.retries == 2
+
+
+def test_transport_errors_wrapped_by_qdrant_client_are_retried():
+    client = FakeClient(failures=1, error=ResponseHandlingException(httpx.ConnectError("refused")))
+    uploader = BulkUploader(client, "c", workers=1, batch_size=10, max_retries=3)
+    uploader.add(_points(10))
+    uploader.flush()
+    assert uploader.retries == 1
+
+
+@pytest.mark.parametrize("status_code", [400, None])
+def test_client_errors_are_not_retried(status_code):
+    client = FakeClient(failures=1, status_code=status_code)  # None: a bug, not a transient failure
+    uploader = BulkUploader(client, "c", workers=1, batch_size=10, max_retries=3)
+    uploader.add(_points(10))
+    with pytest.raises(RuntimeError, match="Bulk upload"):
+        uploader.flush()
+    assert uploader.retries == 0
+
+
+def test_barrier_times_out_when_points_never_appear():
+    client = FakeClient()
+    uploader = BulkUploader(client, "c", workers=1)
+    uploader.add(_points(5))
+    with pytest.raises(TimeoutError):
+        uploader.flush(expected_count=6, timeout=0.3)
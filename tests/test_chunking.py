@@ -1,7 +1,22 @@
-"""Unit tests for chunking strategy."""
+"""Unit tests for chunking strategies and the strategy report."""
 
-from rag.chunking import chunk_email, chunk_emails
-from rag.models import ParsedEmail
+import re
+
+import pytest
+
+import rag.embedding
+from rag.chunk_report import compare_strategies, format_report
+from rag.chunking import (
+    CHUNK_STRATEGIES,
+    chunk_batch,
+    chunk_email,
+    chunk_emails,
+    split_sentences,
+    split_windows,
+    token_spans,
+)
+from rag.ingest import load_all_emails
+from rag.models import Chunk, ChunkBatch, ParsedEmail, SourceRef
 
 
 def test_chunk_email_single_paragraph():
@@ -38,3 +53,129 @@ def test_chunk_email_multiple_paragraphs():
     assert "First para" in chunks[0].text
     assert "Second para" in chunks[1].text
     assert all(c.source_file == "e.txt" for c in chunks)
+
+
+def test_chunk_batch_matches_chunk_emails():
+    emails = load_all_emails()
+    chunks = chunk_emails(emails)
+    batch = chunk_batch(emails)
+    assert len(batch) == len(chunks)
+    assert list(batch) == chunks
+    assert batch.texts() == [c.text for c in chunks]
+    assert batch.payloads() == [c.to_payload() for c in chunks]
+    # Header strings are stored once per email, not once per chunk
+    assert len(batch.subjects) == len({e.source_file for e in emails})
+    assert batch[-1] == chunks[-1]
+
+
+@pytest.mark.parametrize("strategy", ["paragraph", "window"])
+def test_chunk_batch_consumes_a_stream_in_groups(monkeypatch, strategy):
+    monkeypatch.setattr(rag.embedding, "get_tokenizer", lambda: (None, 0))
+    emails = load_all_emails()[:25]
+    whole = chunk_batch(emails, strategy)
+    monkeypatch.setattr("rag.chunking.CHUNK_GROUP_EMAILS", 4)
+    streamed = chunk_batch(iter(emails), strategy)
+    assert list(streamed) == list(whole)
+
+
+def test_chunk_batch_round_trips_arbitrary_chunks():
+    dup = SourceRef(source_file="b.txt", subject="S", from_="B", to="C", paragraph_index=2)
+    headed = Chunk(
+        chunk_id="a.txt_0",
+        text="Subject: S\nFrom: A\nTo: C\n\nHello.",
+        source_file="a.txt",
+        subject="S",
+        from_="A",
+        to="C",
+        duplicates=[dup],
+        date="2024-01-01",
+    )
+    custom = Chunk(chunk_id="custom", text="No header here.", source_file="a.txt", subject="S", from_="A", to="C")
+    chunks = [headed, custom]
+    batch = ChunkBatch.from_chunks(chunks)
+    assert list(batch) == chunks
+    part = batch.take([1, 0])
+    assert list(part) == chunks[::-1]
+    assert part.subjects is batch.subjects
+    assert batch.slice(1, 10).chunk_id(0) == "custom"
+
+
+def test_models_use_slots():
+    email = ParsedEmail(
+        source_file="e.txt",
+        subject="S",
+        from_name="X",
+        from_email="x@y.com",
+        to_name="Y",
+        to_email="y@y.com",
+        body="Body.",
+    )
+    chunk = chunk_email(email)[0]
+    assert not hasattr(chunk, "__dict__")
+    with pytest.raises(AttributeError):
+        chunk.extra = 1
+
+
+class WordTokenizer:
+    """Stand-in for a fast Hugging Face tokenizer: one token per word or punctuation mark."""
+
+    is_fast = True
+
+    def __call__(self, texts, add_special_tokens=True, return_offsets_mapping=False):
+        return {"offset_mapping": [[m.span() for m in re.finditer(r"\w+|[^\w\s]", t)] for t in texts]}
+
+
+@pytest.fixture
+def tokenizer(monkeypatch):
+    """Model tokenizer reading at most 64 tokens (special tokens included)."""
+    monkeypatch.setattr(rag.embedding, "get_tokenizer", lambda: (WordTokenizer(), 64))
+
+
+def test_sentences_merge_up_to_target():
+    body = "Hi there. How are you? I am fine!\n\nThanks,\nTara"
+    assert split_sentences(body, 20) == ["Hi there.", "How are you?", "I am fine!", "Thanks,\nTara"]
+    assert split_sentences(body, 30) == ["Hi there. How are you?", "I am fine! Thanks,\nTara"]
+    long = "word " * 50 + "end."
+    assert split_sentences(f"Short. {long}", 40) == ["Short.", long.strip()]
+
+
+def test_windows_fit_the_model_and_overlap(tokenizer):
+    body = " ".join(f"w{i}" for i in range(300))
+    header = "Subject: S\nFrom: A\nTo: B\n\n"  # 11 tokens
+    (windows,) = split_windows([body], [header], overlap=3)
+    spans, limit = token_spans([header + w for w in windows])
+    assert all(len(s) + 2 <= limit for s in spans)  # nothing is truncated
+    words = [w.split() for w in windows]
+    assert words[0][0] == "w0" and words[-1][-1] == "w299"
+    assert all(a[-3:] == b[:3] for a, b in zip(words[:-2], words[1:-1]))
+    assert len(set(words[-2]) & set(words[-1])) >= 3  # the last window is full, so it overlaps more
+    assert split_windows(["short body"], [header]) == [["short body"]]
+
+
+def test_strategies_on_the_corpus(monkeypatch):
+    monkeypatch.setattr(rag.embedding, "get_tokenizer", lambda: (None, 0))
+    emails = load_all_emails()
+    counts = {s: len(chunk_batch(emails, s)) for s in CHUNK_STRATEGIES}
+    assert counts["email"] == len(emails)
+    assert counts["paragraph"] > counts["sentence"] >= counts["email"]
+    for strategy in CHUNK_STRATEGIES:
+        batch = chunk_batch(emails, strategy)
+        assert len({batch.chunk_id(row) for row in range(len(batch))}) == len(batch)
+        assert all(text.startswith("Subject: ") for text in batch.texts())
+    with pytest.raises(ValueError):
+        chunk_batch(emails, "semantic")
+
+
+def test_report_counts_truncation_and_embed_time(tokenizer, monkeypatch):
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "hashing-64")
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    emails = load_all_emails()[:20]
+    reports = {r.strategy: r for r in compare_strategies(emails)}
+    assert reports["email"].truncated > 0
+    assert reports["window"].truncated == 0
+    assert reports["window"].tokens_max <= 64
+    assert reports["paragraph"].chunks > reports["email"].chunks == 20
+    assert all(r.embed_ms is not None and r.embed_ms >= 0 for r in reports.values())
+    table = format_report(list(reports.values()))
+    assert all(name in table for name in CHUNK_STRATEGIES)
+    assert compare_strategies(emails, ["email"], embed=False)[0].embed_ms is None
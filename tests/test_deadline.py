@@ -0,0 +1,156 @@
+"""Unit tests for deadline-aware ask: stage budgets, step-by-step degradation, extractive answers (no LLM, no Qdrant)."""
+
+import time
+
+import pytest
+
+import rag.pipeline
+import rag.retrieve
+from rag.deadline import (
+    DROP_QUERIES,
+    EXTRACTIVE_ANSWER,
+    LOWER_TOP_K,
+    SKIP_PLANNING,
+    Deadline,
+    run_with_timeout,
+)
+from rag.extractive import extractive_answer
+from rag.models import RetrieveResult
+from rag.pipeline import RAGPipeline
+
+
+def _result(name: str, body: str, score: float) -> RetrieveResult:
+    return RetrieveResult(
+        text=f"Subject: {name}\nFrom: A <a@x.io>\nTo: B <b@x.io>\n\n{body}",
+        metadata={"source_file": f"{name}.txt", "subject": name},
+        distance=score,
+    )
+
+
+RESULTS = [
+    _result("budget", "Hello team. The Q3 budget was approved on Friday. Lunch is at noon.", 0.9),
+    _result("training", "The security training starts Monday. Attendance is mandatory.", 0.8),
+    _result("offsite", "We booked the venue. The budget for the offsite is separate.", 0.7),
+]
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Fake planner / retriever / generator with configurable latency (seconds)."""
+    latency = {"plan": 0.0, "retrieve": 0.0, "generate": 0.0}
+    calls: dict[str, list] = {"retrieve": []}
+    monkeypatch.setattr(rag.pipeline, "ROUTER_ENABLED", False)
+
+    def plan(query, **kwargs):
+        time.sleep(latency["plan"])
+        return [f"{query} a", f"{query} b", f"{query} c"]
+
+    def retrieve(query, top_k, **kwargs):
+        calls["retrieve"].append((query, top_k))
+        time.sleep(latency["retrieve"])
+        return RESULTS
+
+    def generate(query, results, **kwargs):
+        time.sleep(latency["generate"])
+        return "generated"
+
+    monkeypatch.setattr(rag.pipeline, "plan_queries", plan)
+    monkeypatch.setattr(rag.retrieve, "retrieve", retrieve)
+    monkeypatch.setattr(rag.pipeline, "generate", generate)
+    return latency, calls
+
+
+def test_without_deadline_nothing_degrades(stages):
+    response = RAGPipeline().ask("budget", top_k=3, deadline_ms=0)
+    answer, results = response
+    assert answer == "generated"
+    assert len(results) == 3
+    assert response.degradations == []
+    assert set(response.timings_ms) == {"plan", "retrieve", "generate"}
+
+
+def test_generous_deadline_runs_every_stage(stages):
+    response = RAGPipeline().ask("budget", top_k=3, deadline_ms=10_000)
+    assert response.answer == "generated"
+    assert not response.degraded
+    assert len(stages[1]["retrieve"]) == 3
+
+
+def test_slow_planner_is_skipped(stages):
+    stages[0]["plan"] = 2.0
+    started = time.monotonic()
+    response = RAGPipeline().ask("budget", top_k=3, deadline_ms=5_000)
+    assert time.monotonic() - started < 2.0
+    assert response.degradations == [SKIP_PLANNING]
+    assert stages[1]["retrieve"][0][0] == "budget"
+    assert response.answer == "generated"
+
+
+def test_small_budget_skips_planning_and_lowers_top_k(stages):
+    response = RAGPipeline().ask("budget", top_k=5, deadline_ms=1_300)
+    assert response.degradations[:2] == [SKIP_PLANNING, LOWER_TOP_K]
+    assert len(response.results) < 5
+
+
+def test_slow_retrieval_drops_remaining_planned_queries(stages):
+    stages[0]["retrieve"] = 1.0
+    response = RAGPipeline().ask("budget", top_k=5, deadline_ms=2_500)
+    assert response.degradations == [DROP_QUERIES]
+    assert len(stages[1]["retrieve"]) == 1
+    assert response.answer == "generated"
+
+
+def test_slow_generation_falls_back_to_extractive_answer(stages):
+    stages[0]["generate"] = 3.0
+    started = time.monotonic()
+    response = RAGPipeline().ask("When was the budget approved?", top_k=3, deadline_ms=2_000)
+    assert time.monotonic() - started < 2.5
+    assert response.degradations[-1] == EXTRACTIVE_ANSWER
+    assert "The Q3 budget was approved on Friday." in response.answer
+
+
+def test_generation_errors_fall_back_only_under_a_deadline(stages, monkeypatch):
+    status = [503]
+
+    def failing(query, results, **kwargs):
+        error = RuntimeError(str(status[0]))
+        error.status_code = status[0]
+        raise error
+
+    monkeypatch.setattr(rag.pipeline, "generate", failing)
+    response = RAGPipeline().ask("budget", top_k=3, deadline_ms=10_000)
+    assert response.degradations == [EXTRACTIVE_ANSWER]
+    with pytest.raises(RuntimeError):
+        RAGPipeline().ask("budget", top_k=3, deadline_ms=0)
+    # A client error or a bug is not hidden behind an extractive answer
+    status[0] = 401
+    with pytest.raises(RuntimeError, match="401"):
+        RAGPipeline().ask("budget", top_k=3, deadline_ms=10_000)
+    monkeypatch.setattr(rag.pipeline, "generate", lambda query, results, **kwargs: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        RAGPipeline().ask("budget", top_k=3, deadline_ms=10_000)
+
+
+def test_extractive_answer_quotes_best_matching_sentences():
+    answer = extractive_answer("When was the budget approved?", RESULTS, max_sentences=2)
+    lines = answer.splitlines()[1:]
+    assert lines[0] == '- "The Q3 budget was approved on Friday." (budget.txt)'
+    assert lines[1] == '- "The budget for the offsite is separate." (offsite.txt)'
+    assert "Subject:" not in answer
+
+
+def test_extractive_answer_without_overlap_uses_leading_sentences():
+    answer = extractive_answer("zebra", RESULTS, max_sentences=2)
+    assert '"Hello team." (budget.txt)' in answer
+    assert '"The security training starts Monday." (training.txt)' in answer
+
+
+def test_run_with_timeout_and_deadline_shares():
+    assert run_with_timeout(1000, lambda x: x * 2, 21) == 42
+    with pytest.raises(TimeoutError):
+        run_with_timeout(50, time.sleep, 1.0)
+    with pytest.raises(ZeroDivisionError):
+        run_with_timeout(1000, lambda: 1 / 0)
+    deadline = Deadline(1000)
+    assert deadline.share_ms(0.2) == pytest.approx(200)
+    assert 0 < deadline.remaining_ms() <= 1000
@@ -0,0 +1,66 @@
+"""Unit tests for index-time near-duplicate collapse."""
+
+from rag.chunking import chunk_batch, chunk_email, chunk_emails
+from rag.dedup import dedupe_batch, dedupe_chunks, near_duplicate_groups
+from rag.ingest import load_all_emails
+from rag.models import ParsedEmail
+
+BOILERPLATE = (
+    "Additionally, I wanted to emphasize the importance of maintaining open "
+    "communication channels throughout this process."
+)
+
+
+def _email(source_file: str, sender: str, body: str) -> ParsedEmail:
+    return ParsedEmail(
+        source_file=source_file,
+        subject="Project Update",
+        from_name=sender,
+        from_email=f"{sender.lower()}@x.com",
+        to_name="Team",
+        to_email="team@x.com",
+        body=body,
+    )
+
+
+def test_near_duplicate_groups_separates_distinct_texts():
+    texts = [
+        "Please approve the budget for the next fiscal year by Friday.",
+        "Please approve the budget for the next fiscal year by Friday!",
+        "The training workshop covers advanced techniques in our field.",
+    ]
+    groups = near_duplicate_groups(texts, threshold=0.8)
+    assert groups == [[0, 1], [2]]
+
+
+def test_dedupe_chunks_collapses_boilerplate_across_emails():
+    a = _email("email_a.txt", "Alice", f"Budget numbers are attached.\n\n{BOILERPLATE}")
+    b = _email("email_b.txt", "Bob", f"The workshop is next month.\n\n{BOILERPLATE}")
+    chunks = chunk_email(a) + chunk_email(b)
+    deduped = dedupe_chunks(chunks)
+
+    assert len(deduped) == 3
+    collapsed = next(c for c in deduped if c.duplicates)
+    assert collapsed.source_file == "email_a.txt"
+    assert [d.source_file for d in collapsed.duplicates] == ["email_b.txt"]
+
+    payload = collapsed.to_payload()
+    assert payload["source_file"] == ["email_a.txt", "email_b.txt"]
+    assert payload["from"] == ["Alice <alice@x.com>", "Bob <bob@x.com>"]
+    assert payload["subject"] == "Project Update"
+    assert len(payload["sources"]) == 2
+
+
+def test_dedupe_chunks_shrinks_real_corpus():
+    chunks = chunk_emails(load_all_emails())
+    deduped = dedupe_chunks(chunks)
+    assert 0 < len(deduped) < len(chunks)
+    refs = sum(1 + len(c.duplicates) for c in deduped)
+    assert refs == len(chunks)
+
+
+def test_dedupe_batch_matches_dedupe_chunks():
+    emails = load_all_emails()
+    batch = dedupe_batch(chunk_batch(emails))
+    assert list(batch) == dedupe_chunks(chunk_emails(emails))
+    assert batch.duplicates
@@ -0,0 +1,153 @@
+"""Unit tests for the evaluation harness: labels, metrics, the synthetic corpus, and a sweep on embedded Qdrant."""
+
+import json
+
+import pytest
+
+import rag.embedding
+import rag.projection
+import rag.store
+from rag.evaluation import (
+    IndexConfig,
+    LabelledQuery,
+    SearchConfig,
+    SweepResult,
+    corpus_queries,
+    email_ranking,
+    fastest_within,
+    format_results,
+    index_grid,
+    load_queries,
+    pareto_front,
+    recall_at_k,
+    reciprocal_rank,
+    search_grid,
+    sweep,
+    synthetic_corpus,
+)
+from rag.ingest import load_all_emails
+from rag.models import RetrieveResult
+from rag.synthetic import MAX_EMAILS, synthetic_emails
+
+
+def _result(source_file: str, *others: str) -> RetrieveResult:
+    metadata = {"source_file": source_file}
+    if others:
+        metadata["sources"] = [{"source_file": f} for f in (source_file, *others)]
+    return RetrieveResult(text="", metadata=metadata)
+
+
+def _swept(label: str, recall: float, p99_ms: float, memory_mb: float = 1.0, mrr: float = 0.5) -> SweepResult:
+    return SweepResult(
+        index=IndexConfig(chunking=label),
+        search=SearchConfig(),
+        queries=10,
+        recall=recall,
+        mrr=mrr,
+        p50_ms=p99_ms / 2,
+        p99_ms=p99_ms,
+        memory_mb=memory_mb,
+        index_s=1.0,
+    )
+
+
+def test_ranking_and_metrics():
+    ranking = email_ranking([_result("a"), _result("b", "c"), _result("a"), _result("d")])
+    assert ranking == ["a", "b", "c", "d"]  # one entry per email; collapsed chunks rank all their sources
+    assert recall_at_k(ranking, frozenset({"c"}), 2) == 0.0
+    assert recall_at_k(ranking, frozenset({"c"}), 3) == 1.0
+    # Capped at k: two hits in two slots is perfect, even with more relevant emails
+    assert recall_at_k(ranking, frozenset({"a", "b", "x", "y"}), 2) == 1.0
+    assert recall_at_k(ranking, frozenset({"a", "x", "y"}), 2) == 0.5
+    assert reciprocal_rank(ranking, frozenset({"c", "d"})) == pytest.approx(1 / 3)
+    assert reciprocal_rank(ranking, frozenset({"x"})) == 0.0
+
+
+def test_corpus_queries_label_topics_and_people():
+    emails = load_all_emails()
+    queries = corpus_queries(emails)
+    topics = [q for q in queries if q.kind == "topic"]
+    assert len(topics) == len({e.subject for e in emails})
+    training = next(q for q in topics if "workshop" in q.query)
+    assert training.relevant == {e.source_file for e in emails if e.subject == "Training Opportunity"}
+    people = [q for q in queries if q.kind == "person"]
+    assert sum(len(q.relevant) for q in people) == len(emails)
+    first = emails[0]
+    assert any(first.from_name in q.query and first.source_file in q.relevant for q in people)
+
+
+def test_synthetic_corpus_is_deterministic_with_unique_answers():
+    emails, queries = synthetic_corpus(200, seed=7)
+    assert [e.body for e in emails] == [e.body for e in synthetic_corpus(200, seed=7)[0]]
+    assert [e.body for e in emails] != [e.body for e in synthetic_corpus(200, seed=8)[0]]
+    assert len({e.source_file for e in emails}) == len({q.query for q in queries}) == 200
+    for email, query in zip(emails, queries):
+        assert query.relevant == {email.source_file}
+        name, team = query.query.removeprefix("When and where is the ").removesuffix(" team?").split(" of the ")
+        fact = f"The {team} team's {name} is"  # codenames repeat across teams; with the team they are unique
+        assert fact in email.body and sum(fact in e.body for e in emails) == 1
+    with pytest.raises(ValueError):
+        synthetic_emails(MAX_EMAILS + 1)
+
+
+def test_load_queries(tmp_path):
+    path = tmp_path / "labels.jsonl"
+    path.write_text(json.dumps({"query": "budget?", "relevant": ["email_001.txt"]}) + "\n\n", encoding="utf-8")
+    assert load_queries(path) == [LabelledQuery("budget?", frozenset({"email_001.txt"}))]
+    path.write_text(json.dumps({"query": "budget?", "relevant": []}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_queries(path)
+
+
+def test_grids():
+    assert len(index_grid(["paragraph", "window"], ["default"], [0, 64])) == 4
+    grid = search_grid([3, 5], [None, 64], [False, True], [True])
+    # ef only varies for HNSW search: 2 k * (2 ef + 1 exact)
+    assert len(grid) == 6
+    assert all(c.hnsw_ef is None for c in grid if c.exact)
+
+
+def test_pareto_front_and_guardrail():
+    slow_best = _swept("slow-best", recall=0.95, p99_ms=20.0)
+    fast_ok = _swept("fast-ok", recall=0.85, p99_ms=5.0)
+    dominated = _swept("dominated", recall=0.80, p99_ms=8.0)
+    small = _swept("small", recall=0.80, p99_ms=8.0, memory_mb=0.2)
+    results = [slow_best, fast_ok, dominated, small]
+    front = pareto_front(results)
+    assert front == [fast_ok, small, slow_best]  # fastest first
+    assert fastest_within(results, 0.9) is slow_best
+    assert fastest_within(results, 0.8) is fast_ok
+    assert fastest_within(results, 0.99) is None
+    table = format_results(results).splitlines()
+    assert table[2].startswith("* slow-best")  # best recall first, on the frontier
+    assert any(line.startswith("  dominated") for line in table)
+
+
+def test_sweep_offline(monkeypatch, tmp_path):
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "hashing")
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    monkeypatch.setattr(rag.store, "QDRANT_URL", ":memory:")
+    monkeypatch.setattr(rag.store, "_embedded", {})
+    monkeypatch.setattr(rag.projection, "INDEX_PROJECTION_DIR", tmp_path)
+
+    emails, queries = synthetic_corpus(40, seed=3)
+    results = sweep(
+        emails,
+        queries,
+        index_grid(["paragraph"], ["default"], [0, 16]),
+        search_grid([1, 5], hierarchical=[False]),
+        repeat=1,
+    )
+    assert len(results) == 4
+    by_label = {r.label: r for r in results}
+    full_1 = by_label["paragraph/default/full k=1 ef=- flat"]
+    full_5 = by_label["paragraph/default/full k=5 ef=- flat"]
+    compact_5 = by_label["paragraph/default/compact16 k=5 ef=- flat"]
+    # One relevant email per query: recall@5 >= recall@1, and the planted fact is found lexically
+    assert full_5.recall >= full_1.recall > 0.3
+    assert full_5.mrr >= full_1.mrr - 1e-9  # more results can only add a first hit
+    assert all(r.queries == 40 and r.p99_ms >= r.p50_ms > 0 for r in results)
+    # Compact vectors keep the full ones on disk: less RAM
+    assert compact_5.memory_mb < full_5.memory_mb
+    assert pareto_front(results)
+    assert rag.store.get_qdrant_client().get_collections().collections == []  # evaluation indexes dropped
@@ -0,0 +1,118 @@
+"""Unit tests for the where-filter language, compile cache and exact-search choice (in-memory Qdrant)."""
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from rag.filters import compile_where, needs_metadata, prefer_exact
+from rag.metadata_index import MetadataIndex
+from rag.models import ParsedEmail
+
+PEOPLE = {
+    "helen": ("Helen Powell", "helen@tech.io"),
+    "tara": ("Tara Woods", "tara@ent.com"),
+    "nico": ("Nico Clark", "nico@corp.org"),
+    "anna": ("Anna Wright", "anna@corp.org"),
+}
+
+
+def _email(n: int, subject: str, sender: str, recipient: str, date: str) -> ParsedEmail:
+    return ParsedEmail(f"e{n}.txt", subject, *PEOPLE[sender], *PEOPLE[recipient], body="", date=date)
+
+
+EMAILS = [
+    _email(1, "Budget Approval", "helen", "nico", "2024-01-05T10:00:00+00:00"),
+    _email(2, "Budget Review", "tara", "nico", "2024-02-10T10:00:00+00:00"),
+    _email(3, "Meeting Request", "helen", "anna", "2024-03-15T10:00:00+00:00"),
+    _email(4, "Training Opportunity", "tara", "anna", ""),
+]
+HELEN = "Helen Powell <helen@tech.io>"
+TARA = "Tara Woods <tara@ent.com>"
+
+
+@pytest.fixture(scope="module")
+def client():
+    client = QdrantClient(location=":memory:")
+    client.create_collection("mail", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.upsert(
+        "mail",
+        points=[
+            models.PointStruct(
+                id=i,
+                vector=[1.0, float(i)],
+                payload={
+                    "source_file": e.source_file,
+                    "subject": e.subject,
+                    "from": e.from_display(),
+                    "to": e.to_display(),
+                    **({"date": e.date} if e.date else {}),
+                },
+            )
+            for i, e in enumerate(EMAILS)
+        ],
+    )
+    return client
+
+
+def _files(client: QdrantClient, where: dict) -> set[str]:
+    points, _ = client.scroll(
+        "mail", scroll_filter=compile_where(where, MetadataIndex.build(EMAILS)), limit=100, with_payload=True
+    )
+    return {p.payload["source_file"] for p in points}
+
+
+@pytest.mark.parametrize(
+    "where,expected",
+    [
+        ({"from": HELEN}, {"e1.txt", "e3.txt"}),
+        ({"from": {"$ne": HELEN}}, {"e2.txt", "e4.txt"}),
+        ({"subject": {"$in": ["Budget Review", "Meeting Request"]}}, {"e2.txt", "e3.txt"}),
+        ({"subject": {"$nin": ["Budget Review", "Meeting Request"]}}, {"e1.txt", "e4.txt"}),
+        ({"subject": {"$prefix": "budget"}}, {"e1.txt", "e2.txt"}),
+        ({"date": {"$gte": "2024-02-01", "$lt": "2024-03-01"}}, {"e2.txt"}),
+        (
+            {"$or": [{"from": TARA, "to": "Nico Clark <nico@corp.org>"}, {"subject": "Meeting Request"}]},
+            {"e2.txt", "e3.txt"},
+        ),
+        ({"$and": [{"from": HELEN}, {"$not": {"subject": {"$prefix": "Meet"}}}]}, {"e1.txt"}),
+    ],
+)
+def test_filter_grammar(client, where, expected):
+    assert _files(client, where) == expected
+
+
+def test_compiled_filters_are_cached_regardless_of_key_order():
+    a = compile_where({"from": HELEN, "subject": {"$in": ["x"]}})
+    b = compile_where({"subject": {"$in": ["x"]}, "from": HELEN})
+    assert a is b
+    assert compile_where(None) is None
+
+
+def test_invalid_filters_raise():
+    with pytest.raises(ValueError, match="Unknown operator"):
+        compile_where({"from": {"$like": "x"}})
+    with pytest.raises(ValueError, match="Unknown operator"):
+        compile_where({"$xor": []})
+    with pytest.raises(ValueError, match="metadata index"):
+        compile_where({"subject": {"$prefix": "B"}})
+
+
+def test_prefix_expands_every_stored_spelling():
+    emails = [_email(1, "Re: Budget", "helen", "nico", ""), _email(2, "RE: budget.", "tara", "nico", "")]
+    compiled = compile_where({"subject": {"$prefix": "re: b"}}, MetadataIndex.build(emails))
+    assert set(compiled.must[0].match.any) == {"Re: Budget", "RE: budget."}
+
+
+def test_prefix_as_a_literal_value_is_not_expanded():
+    assert not needs_metadata({"subject": "$prefix"})
+    assert not needs_metadata({"subject": {"$eq": "$prefix"}})
+    assert needs_metadata({"$or": [{"from": HELEN}, {"$not": {"subject": {"$prefix": "B"}}}]})
+    compiled = compile_where({"subject": "$prefix"})
+    assert compiled.must[0].match.value == "$prefix"
+
+
+def test_selective_filters_prefer_exact_search(client, monkeypatch):
+    monkeypatch.setattr("rag.filters.RETRIEVE_EXACT_SELECTIVITY", 0.3)
+    assert prefer_exact(client, "mail", compile_where({"source_file": "e1.txt"}))
+    assert not prefer_exact(client, "mail", compile_where({"from": HELEN}))
+    assert not prefer_exact(client, "mail", None)
@@ -0,0 +1,82 @@
+"""Unit tests for the offline hashing embedder, and an index + ask run on it with embedded Qdrant (no model, no server)."""
+
+import time
+
+import numpy as np
+import pytest
+
+import rag.embedding
+import rag.hashing_embedding
+import rag.metadata_index
+import rag.pipeline
+import rag.store
+from rag.hashing_embedding import HashingEncoder, hashing_dimension, is_hashing_model
+from rag.pipeline import RAGPipeline
+
+TEXTS = [
+    "Can we meet to discuss the budget?",
+    "can we meet to discuss the budget",
+    "Let's discuss the budget in a meeting",
+    "The security training is mandatory for everyone.",
+    "Grüße aus München: das Budget ist genehmigt",
+    "",
+]
+
+
+def test_model_names():
+    assert is_hashing_model("hashing") and is_hashing_model("Hashing-384")
+    assert not is_hashing_model("all-mpnet-base-v2")
+    assert hashing_dimension("hashing") is None
+    assert hashing_dimension("hashing-384") == 384
+    with pytest.raises(ValueError):
+        hashing_dimension("hashing-x")
+
+
+def test_vectors_are_deterministic_unit_and_batch_independent(monkeypatch):
+    vectors = HashingEncoder(256).encode(TEXTS)
+    assert vectors.shape == (len(TEXTS), 256) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[:-1], axis=1), 1.0)
+    assert not vectors[-1].any()  # no features, no direction
+    assert np.array_equal(vectors, HashingEncoder(256).encode(TEXTS))
+    # A text embeds the same alone, in any batch, and across blocks
+    monkeypatch.setattr(rag.hashing_embedding, "_BLOCK_TEXTS", 2)
+    for i, text in enumerate(TEXTS):
+        assert np.allclose(HashingEncoder(256).encode([text])[0], vectors[i])
+    assert np.allclose(HashingEncoder(256).encode(TEXTS[::-1])[::-1], vectors)
+
+
+def test_similarity_follows_shared_words():
+    v = HashingEncoder(1536).encode(TEXTS)
+    sims = v @ v.T
+    assert sims[0, 1] > 0.99  # case and punctuation do not matter
+    assert sims[0, 2] > sims[0, 3] + 0.2
+    assert sims[4, 0] < 0.3
+    budget, budgets = HashingEncoder(1536).encode(["budget", "budgets"])
+    assert budget @ budgets > 0.15  # shared character trigrams
+
+
+def test_throughput():
+    texts = [f"Question {i}: can we move the project deadline to next week?" for i in range(20000)]
+    encoder = HashingEncoder(384)
+    started = time.perf_counter()
+    encoder.encode(texts)
+    assert time.perf_counter() - started < 2.0  # ~0.1 s here; a model needs minutes
+
+
+def test_index_and_ask_offline(monkeypatch, tmp_path):
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "hashing")
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    monkeypatch.setattr(rag.store, "QDRANT_URL", ":memory:")
+    monkeypatch.setattr(rag.store, "_embedded", {})
+    monkeypatch.setattr(rag.metadata_index, "METADATA_INDEX_DIR", tmp_path)
+    monkeypatch.setattr(rag.pipeline, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(rag.pipeline, "plan_queries", lambda query: [query])
+    monkeypatch.setattr(rag.pipeline, "generate", lambda query, results: results[0].subject)
+
+    pipeline = RAGPipeline(collection_name="hashing_e2e", shards=[])
+    pipeline.index()
+    response = pipeline.ask("security training workshop schedule", top_k=3, deadline_ms=0)
+    assert len(response.results) == 3
+    assert any("training" in r.text.lower() for r in response.results)
+    with pytest.raises(ValueError):
+        rag.embedding.get_embedding_model()
@@ -0,0 +1,167 @@
+"""Unit tests for resilient LLM calls against a local mock Mistral server (real SDK, no network)."""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from mistralai import Mistral
+
+import rag.llm
+from rag.llm import CircuitBreaker, CircuitOpenError, LLMGuard, TokenBucket, complete_chat
+from rag.query_plan import plan_queries
+
+
+class _Script:
+    """Responses the mock server plays in order: (status, delay_s, content); the last one repeats."""
+
+    def __init__(self, *steps: tuple[int, float, str]):
+        self.steps = list(steps)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def next(self) -> tuple[int, float, str]:
+        with self.lock:
+            self.requests += 1
+            return self.steps.pop(0) if len(self.steps) > 1 else self.steps[0]
+
+
+def _completion(content: str) -> dict:
+    return {
+        "id": "cmpl-test",
+        "object": "chat.completion",
+        "model": "mock",
+        "created": 0,
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+@pytest.fixture
+def server():
+    script = _Script((200, 0.0, "ok"))
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            status, delay, content = script.next()
+            time.sleep(delay)
+            body = json.dumps(_completion(content) if status == 200 else {"message": "mock error"}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield url, script
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(rag.llm, "backoff_ms", lambda attempt: 0.0)
+
+
+def _chat(url, llm_guard, **kwargs):
+    client = Mistral(api_key="test", server_url=url)
+    response = complete_chat(
+        client,
+        operation="test",
+        llm_guard=llm_guard,
+        model="mock",
+        messages=[{"role": "user", "content": "hi"}],
+        **kwargs,
+    )
+    return response.choices[0].message.content
+
+
+def test_transient_errors_are_retried(server):
+    url, script = server
+    script.steps = [(503, 0.0, ""), (429, 0.0, ""), (200, 0.0, "recovered")]
+    llm_guard = LLMGuard(max_retries=3)
+    assert _chat(url, llm_guard) == "recovered"
+    assert script.requests == 3
+    assert llm_guard.retries == 2
+    assert llm_guard.breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried(server):
+    url, script = server
+    script.steps = [(400, 0.0, "")]
+    llm_guard = LLMGuard(max_retries=3)
+    with pytest.raises(Exception) as err:
+        _chat(url, llm_guard)
+    assert getattr(err.value, "status_code", None) == 400
+    assert script.requests == 1
+
+
+def test_timeout_bounds_all_attempts(server):
+    url, script = server
+    script.steps = [(200, 1.0, "slow")]
+    llm_guard = LLMGuard(max_retries=5)
+    started = time.monotonic()
+    with pytest.raises(Exception):
+        _chat(url, llm_guard, timeout_ms=300)
+    assert time.monotonic() - started < 0.9
+
+
+def test_hedged_request_beats_a_slow_first_attempt(server):
+    url, script = server
+    llm_guard = LLMGuard(hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        assert _chat(url, llm_guard) == "ok"
+    assert llm_guard.hedge_delay_ms() is not None
+    script.steps = [(200, 1.5, "slow"), (200, 0.0, "fast")]
+    started = time.monotonic()
+    assert _chat(url, llm_guard) == "fast"
+    assert time.monotonic() - started < 1.0
+    assert llm_guard.hedges == 1
+
+
+def test_open_breaker_short_circuits_planning(server, monkeypatch):
+    url, script = server
+    script.steps = [(503, 0.0, "")]
+    llm_guard = LLMGuard(max_retries=1, breaker=CircuitBreaker(failures=2, reset_s=60))
+    with pytest.raises(Exception):
+        _chat(url, llm_guard)
+    assert llm_guard.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        _chat(url, llm_guard, optional=True)
+    assert script.requests == 2
+
+    monkeypatch.setattr(rag.llm, "_guard", llm_guard)
+    monkeypatch.setattr(rag.llm, "MISTRAL_SERVER_URL", url)
+    assert plan_queries("budget approval?", api_key="test") == ["budget approval?"]
+    assert script.requests == 2
+
+
+def test_half_open_probe_closes_breaker(server):
+    url, script = server
+    script.steps = [(503, 0.0, ""), (200, 0.0, "back")]
+    llm_guard = LLMGuard(max_retries=0, breaker=CircuitBreaker(failures=1, reset_s=0.05))
+    with pytest.raises(Exception):
+        _chat(url, llm_guard)
+    assert llm_guard.breaker.state == "open"
+    time.sleep(0.06)
+    assert _chat(url, llm_guard) == "back"
+    assert llm_guard.breaker.state == "closed"
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=20, capacity=2)
+    started = time.monotonic()
+    for _ in range(4):
+        assert bucket.acquire()
+    assert time.monotonic() - started >= 0.08
+    empty = TokenBucket(rate=1, capacity=1)
+    assert empty.acquire()
+    assert not empty.acquire(timeout_s=0.1)
@@ -0,0 +1,107 @@
+"""Unit tests for the local stand-ins (mock Mistral server, embedded Qdrant) and the load driver."""
+
+import json
+import random
+import time
+
+import pytest
+from mistralai import Mistral
+
+import rag.llm
+import rag.store
+from rag.generate import generate
+from rag.llm import LLMGuard
+from rag.loadtest import run_load
+from rag.mock_mistral import LatencyModel, MockMistralServer, plan_reply
+from rag.models import RetrieveResult
+from rag.query_plan import plan_queries
+from rag.stats import percentile
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    with MockMistralServer(latency="constant:0") as server:
+        monkeypatch.setattr(rag.llm, "MISTRAL_SERVER_URL", server.url)
+        monkeypatch.setattr(rag.llm, "_guard", LLMGuard(max_retries=0))
+        yield server
+
+
+def test_planner_and_generation_are_deterministic(mock_server):
+    assert plan_queries("budget and training?", api_key="mock") == ["budget and training?", "budget", "training"]
+    results = [RetrieveResult(text="Budget approved.", metadata={"source_file": "a.txt", "subject": "Budget"})]
+    answer = generate("Was the budget approved?", results, api_key="mock")
+    assert answer == "Mock answer to 'Was the budget approved?' from 1 source(s) (a.txt)."
+    assert mock_server.requests == 2
+
+
+def test_streaming_returns_the_same_content(mock_server):
+    client = Mistral(api_key="mock", server_url=mock_server.url)
+    messages = [{"role": "user", "content": "Question: hi"}]
+    stream = client.chat.stream(model="mock", messages=messages)
+    streamed = "".join(event.data.choices[0].delta.content or "" for event in stream)
+    complete = client.chat.complete(model="mock", messages=messages).choices[0].message.content
+    assert streamed == complete == "Mock answer to 'hi' from 0 source(s)."
+
+
+def test_injected_errors_and_latency():
+    with MockMistralServer(latency="constant:100", error_rate=1.0, error_statuses=(429,), retry_after_s=2) as server:
+        client = Mistral(api_key="mock", server_url=server.url)
+        started = time.monotonic()
+        with pytest.raises(Exception) as err:
+            client.chat.complete(model="mock", messages=[{"role": "user", "content": "x"}])
+        assert time.monotonic() - started >= 0.1
+        assert err.value.status_code == 429
+        assert rag.llm._retry_after_ms(err.value) == 2000
+        assert server.errors == 1
+
+
+def test_latency_models():
+    rng = random.Random(0)
+    assert LatencyModel.parse("constant:250").sample_ms(rng) == 250
+    assert 100 <= LatencyModel.parse("uniform:100:200").sample_ms(rng) <= 200
+    samples = sorted(LatencyModel.parse("lognormal:300:0.5").sample_ms(rng) for _ in range(2001))
+    assert samples[1000] == pytest.approx(300, rel=0.1)
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gamma:1")
+    assert json.loads(plan_reply("what changed?")) == {"queries": ["what changed?"]}
+
+
+def test_memory_qdrant_is_shared_within_the_process(monkeypatch):
+    monkeypatch.setattr(rag.store, "QDRANT_URL", ":memory:")
+    monkeypatch.setattr(rag.store, "_embedded", {})
+    client = rag.store.get_qdrant_client()
+    assert rag.store.get_qdrant_client() is client
+    rag.store.create_collection(client, "shim_test", size=4)
+    assert rag.store.get_qdrant_client().collection_exists("shim_test")
+
+
+def test_path_location_gives_the_locked_embedded_client(monkeypatch, tmp_path):
+    monkeypatch.setattr(rag.store, "_embedded", {})
+    location = f"{rag.store.PATH_PREFIX}{tmp_path}"
+    client = rag.store.get_qdrant_client(location)
+    # snapshot import --local: the same serialized client the upload threads will share
+    assert isinstance(client, rag.store.EmbeddedClient)
+    assert rag.store.get_qdrant_client(location) is client
+    client.close()
+
+
+def test_load_driver_reports_percentiles():
+    calls = []
+
+    def ask(question):
+        calls.append(question)
+        if len(calls) % 10 == 0:
+            raise RuntimeError("boom")
+        time.sleep(0.01)
+        return "answer"
+
+    report = run_load(ask, ["a", "b"], concurrency=4, requests=40, warmup=2)
+    assert len(calls) == 42
+    assert report.requests == 40
+    assert report.errors == 4
+    assert report.error_types == {"RuntimeError": 4}
+    assert report.percentiles()[50] >= 10
+    assert report.throughput > 0
+    assert "p95=" in report.summary()
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
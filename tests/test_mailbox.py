@@ -0,0 +1,148 @@
+"""Unit tests for bulk mailbox ingest (mbox, Maildir, .eml)."""
+
+from pathlib import Path
+
+import pytest
+
+from rag.ingest import iter_all_emails, load_all_emails
+from rag.mailbox import is_mailbox, iso_date, iter_mailbox, parse_message_bytes
+
+PLAIN = b"""Subject: Budget Approval for the
+ Next Fiscal Year
+From: Helen Powell <helen.powell@tech.io>
+To: Nico Clark <nico.clark@corp.org>
+
+Please approve the budget.
+>From the finance team's point of view it is ready.
+"""
+
+LATIN1_QP = (
+    b"Subject: =?iso-8859-1?q?R=E9union?=\n"
+    b"From: =?utf-8?b?w4lsaXNl?= <elise@x.fr>\n"
+    b"To: Team <team@x.fr>\n"
+    b"MIME-Version: 1.0\n"
+    b"Content-Type: text/plain; charset=iso-8859-1\n"
+    b"Content-Transfer-Encoding: quoted-printable\n"
+    b"\n"
+    b"Caf=E9 demain =E0 10h.\n"
+)
+
+MULTIPART = b"""Subject: Training Opportunity
+From: Tara Woods <tara.woods@enterprise.com>
+To: Anna Wright <anna.wright@corp.org>
+MIME-Version: 1.0
+Content-Type: multipart/alternative; boundary="b1"
+
+--b1
+Content-Type: text/html; charset=utf-8
+
+<p>HTML version</p>
+--b1
+Content-Type: text/plain; charset=utf-8
+
+Plain version of the workshop details.
+--b1--
+"""
+
+
+def _write_mbox(path: Path) -> None:
+    path.write_bytes(
+        b"From helen@tech.io Mon Jan  1 00:00:00 2024\n"
+        + PLAIN.replace(b"\n>From", b"\n>>From")
+        + b"\nFrom elise@x.fr Mon Jan  1 00:00:00 2024\n"
+        + LATIN1_QP
+        + b"\nFrom tara@x.com Mon Jan  1 00:00:00 2024\n"
+        + MULTIPART
+    )
+
+
+def test_parse_message_bytes_unfolds_headers_and_decodes_charset():
+    parsed = parse_message_bytes(PLAIN, "m1")
+    assert parsed is not None
+    assert parsed.subject == "Budget Approval for the Next Fiscal Year"
+    assert parsed.from_name == "Helen Powell"
+    assert parsed.to_email == "nico.clark@corp.org"
+
+    latin = parse_message_bytes(LATIN1_QP, "m2")
+    assert latin.subject == "Réunion"
+    assert latin.from_name == "Élise"
+    assert latin.body == "Café demain à 10h."
+
+    multi = parse_message_bytes(MULTIPART, "m3")
+    assert multi.body == "Plain version of the workshop details."
+
+
+def test_date_header_is_normalized_to_iso():
+    parsed = parse_message_bytes(b"Date: Tue, 02 Jan 2024 09:30:00 +0100\n" + PLAIN, "m1")
+    assert parsed.date == "2024-01-02T09:30:00+01:00"
+    assert parse_message_bytes(PLAIN, "m1").date == ""
+    assert iso_date("2024-03-01") == "2024-03-01T00:00:00+00:00"
+    assert iso_date("not a date") == ""
+
+
+def test_parse_message_bytes_missing_headers():
+    assert parse_message_bytes(b"just a body\n", "x") is None
+
+
+def test_iter_mailbox_mbox_in_process_and_pool(tmp_path):
+    mbox = tmp_path / "archive.mbox"
+    _write_mbox(mbox)
+    serial = list(iter_mailbox(mbox, workers=1))
+    pooled = list(iter_mailbox(mbox, workers=2, batch_size=1))
+    assert [e.source_file for e in serial] == ["archive.mbox#0", "archive.mbox#1", "archive.mbox#2"]
+    assert serial == pooled
+    # mboxrd: one level of ">From " quoting is removed
+    assert ">From the finance team" in serial[0].body
+
+
+def test_maildir_and_eml_directories(tmp_path):
+    maildir = tmp_path / "Maildir"
+    for sub in ("cur", "new", "tmp", ".Archive/cur"):
+        (maildir / sub).mkdir(parents=True)
+    (maildir / "cur" / "1.host:2,S").write_bytes(PLAIN)
+    (maildir / "new" / "2.host").write_bytes(MULTIPART)
+    (maildir / "tmp" / "3.host").write_bytes(LATIN1_QP)
+    (maildir / ".Archive" / "cur" / "4.host:2,S").write_bytes(LATIN1_QP)
+    assert is_mailbox(maildir)
+    emails = load_all_emails(maildir)
+    assert sorted(e.source_file for e in emails) == [
+        ".Archive/cur/4.host:2,S",
+        "cur/1.host:2,S",
+        "new/2.host",
+    ]
+
+    eml_dir = tmp_path / "eml"
+    eml_dir.mkdir()
+    (eml_dir / "a.eml").write_bytes(PLAIN)
+    assert [e.subject for e in load_all_emails(eml_dir)] == ["Budget Approval for the Next Fiscal Year"]
+
+
+def test_legacy_txt_directory_is_not_a_mailbox():
+    emails_dir = Path(__file__).resolve().parent.parent / "emails"
+    assert not is_mailbox(emails_dir)
+    assert not is_mailbox(emails_dir / "email_001.txt")
+
+
+def test_mailbox_detection_looks_at_the_top_level_only(tmp_path):
+    (tmp_path / "archive").mkdir()
+    (tmp_path / "archive" / "old.eml").write_bytes(PLAIN)
+    assert not is_mailbox(tmp_path)  # a stray nested .eml does not turn the directory into a mailbox
+    _write_mbox(tmp_path / "Inbox")
+    assert is_mailbox(tmp_path / "Inbox")  # no suffix, but starts with a "From " line
+
+
+def test_txt_emails_and_mailbox_in_one_directory_are_merged(tmp_path):
+    legacy = Path(__file__).resolve().parent.parent / "emails" / "email_001.txt"
+    (tmp_path / "email_001.txt").write_bytes(legacy.read_bytes())
+    (tmp_path / "extra.eml").write_bytes(MULTIPART)
+    assert is_mailbox(tmp_path)
+    assert [e.source_file for e in load_all_emails(tmp_path)] == ["email_001.txt", "extra.eml"]
+
+
+def test_emails_are_streamed_and_a_missing_directory_fails_at_once(tmp_path):
+    _write_mbox(tmp_path / "Inbox")
+    stream = iter_all_emails(tmp_path / "Inbox")
+    assert not isinstance(stream, list)
+    assert [e.source_file for e in stream] == [e.source_file for e in load_all_emails(tmp_path / "Inbox")]
+    with pytest.raises(FileNotFoundError):
+        iter_all_emails(tmp_path / "missing")
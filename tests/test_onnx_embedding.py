@@ -0,0 +1,148 @@
+"""Unit tests for the ONNX embedding backend and the drift check (stub session and tokenizer, no export)."""
+
+import numpy as np
+import pytest
+
+import rag.embedding
+import rag.onnx_embedding
+from rag.config import QDRANT_VECTOR_SIZE
+from rag.embedding import check_backend_drift, embed_texts, get_encoder
+from rag.onnx_embedding import INT8_FILE, OnnxEncoder, export_onnx
+
+DIM = 8
+
+
+class _Tokenizer:
+    """One token per word (id = word length), padded to the longest text like a HF tokenizer."""
+
+    def __call__(self, texts, *, padding, truncation, max_length, return_tensors):
+        ids = [[len(w) for w in t.split()][:max_length] or [0] for t in texts]
+        width = max(len(row) for row in ids)
+        return {
+            "input_ids": np.asarray([row + [0] * (width - len(row)) for row in ids]),
+            "attention_mask": np.asarray([[1] * len(row) + [0] * (width - len(row)) for row in ids]),
+        }
+
+
+class _Session:
+    """Stands in for an int8 InferenceSession: a fixed int8 weight, mean pooling and L2 normalization."""
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.weight = (rng.integers(-127, 128, size=(16, DIM)).astype(np.int8), np.float32(0.01))
+        self.batches: list[int] = []
+
+    def run(self, output_names, feeds):
+        assert output_names == ["sentence_embedding"]
+        ids, mask = feeds["input_ids"], feeds["attention_mask"]
+        assert ids.dtype == mask.dtype == np.int64
+        self.batches.append(len(ids))
+        q, scale = self.weight
+        tokens = q[ids % 16].astype(np.float32) * scale * mask[..., None]
+        pooled = tokens.sum(axis=1) / mask.sum(axis=1, keepdims=True)
+        return [pooled / np.linalg.norm(pooled, axis=1, keepdims=True)]
+
+
+def _encoder(batch_size: int = 2) -> OnnxEncoder:
+    encoder = object.__new__(OnnxEncoder)
+    encoder.max_seq_length = 4
+    encoder.dimension = DIM
+    encoder.batch_size = batch_size
+    encoder._session = _Session()
+    encoder._tokenizer = _Tokenizer()
+    return encoder
+
+
+def _unit(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    x = np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def test_encode_shape_order_and_normalisation():
+    texts = ["a much longer text with many words", "hi", "three word text", "two words", "one"]
+    encoder = _encoder(batch_size=2)
+    out = encoder.encode(texts)
+    assert out.shape == (len(texts), DIM) and out.dtype == np.float32
+    assert np.allclose(np.linalg.norm(out, axis=1), 1.0, atol=1e-5)
+    assert encoder._session.batches == [2, 2, 1]
+    # Length-sorted batches are written back in input order
+    for i, text in enumerate(texts):
+        assert np.allclose(out[i], _encoder().encode([text])[0], atol=1e-6)
+    assert encoder.encode([]).shape == (0, DIM)
+
+
+def test_export_quantizes_once(monkeypatch, tmp_path):
+    quantization = pytest.importorskip("onnxruntime.quantization")
+    monkeypatch.setattr(rag.onnx_embedding, "EMBEDDING_CACHE_DIR", tmp_path)
+    exports, quantized = [], []
+
+    def fake_export(model_name, out_dir):
+        exports.append(model_name)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        (out_dir / "model.onnx").write_bytes(b"fp32")
+
+    def fake_quantize(src, dst, weight_type):
+        quantized.append(weight_type)
+        open(dst, "wb").write(b"int8")
+
+    monkeypatch.setattr(rag.onnx_embedding, "_export_fp32", fake_export)
+    monkeypatch.setattr(quantization, "quantize_dynamic", fake_quantize)
+    path = export_onnx("org/some-model", quantize=True)
+    assert path.name == INT8_FILE and path.parent == tmp_path / "org_some-model" / "onnx"
+    assert export_onnx("org/some-model", quantize=True) == path
+    assert export_onnx("org/some-model").name == "model.onnx"
+    assert exports == ["org/some-model"] and quantized == [quantization.QuantType.QInt8]
+
+
+def test_vectors_are_padded_to_the_collection_size(monkeypatch):
+    native = _unit(3, 384)
+    monkeypatch.setattr(rag.embedding, "_encoder", lambda texts: native[: len(texts)])
+    vectors = np.asarray(embed_texts(["a", "b", "c"]))
+    assert vectors.shape == (3, QDRANT_VECTOR_SIZE)
+    assert np.allclose(vectors[:, :384], native) and not vectors[:, 384:].any()
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+
+
+@pytest.mark.parametrize("backend,quantize", [("onnx", False), ("onnx-int8", True)])
+def test_backend_is_selected_through_config(monkeypatch, backend, quantize):
+    loaded = []
+    encoder = _encoder()
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "some-model")
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_BACKEND", backend)
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_DRIFT_CHECK", False)
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    monkeypatch.setattr(
+        rag.onnx_embedding, "load_onnx_encoder", lambda name, *, quantize: loaded.append((name, quantize)) or encoder
+    )
+    assert get_encoder() == encoder.encode
+    assert get_encoder() == encoder.encode  # cached
+    assert loaded == [("some-model", quantize)]
+
+
+def test_unknown_backend_is_refused(monkeypatch):
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "some-model")
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_BACKEND", "tensorrt")
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    with pytest.raises(ValueError, match="EMBEDDING_BACKEND"):
+        get_encoder()
+
+
+def test_drift_above_the_threshold_raises(monkeypatch):
+    reference = _unit(5, DIM)
+    noise = _unit(5, DIM, seed=1)
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MAX_DRIFT", 0.01)
+    monkeypatch.setattr(rag.embedding, "_torch_encode", lambda texts: reference)
+    close = check_backend_drift("onnx-int8", encoder=lambda texts: reference + 0.01 * noise)
+    assert 0 < close < 0.01
+    with pytest.raises(RuntimeError, match="drifts"):
+        check_backend_drift("onnx-int8", encoder=lambda texts: reference + 0.5 * noise)
+
+    # At startup a drifting backend is not cached, so every load checks again
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "some-model")
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_DRIFT_CHECK", True)
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    monkeypatch.setattr(rag.embedding, "_load_encoder", lambda backend: lambda texts: -reference)
+    with pytest.raises(RuntimeError):
+        get_encoder()
+    assert rag.embedding._encoder is None
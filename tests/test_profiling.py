@@ -0,0 +1,55 @@
+"""Unit tests for built-in profiling: sampled stacks, collapsed output, memory peak, stage times."""
+
+import time
+
+import rag.profiling
+from rag.profiling import Profiler, profiled, record_stages, stage
+
+
+def _busy_loop(seconds: float) -> int:
+    total = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+def test_samples_attribute_time_to_the_busy_function():
+    profiler = Profiler(interval_ms=2, trace_memory=False).start()
+    _busy_loop(0.3)
+    profiler.stop()
+    assert profiler.samples > 20
+    # Other threads (if any) are sampled too; find the busy function among the top entries
+    busy = [(own, total) for label, own, total in profiler.top_functions() if label.startswith("_busy_loop (tests/")]
+    assert busy
+    own, inclusive = busy[0]
+    assert own > 0.5 * profiler.samples
+    assert inclusive >= own
+
+
+def test_collapsed_format_and_files(tmp_path):
+    with profiled("unit", tmp_path, interval_ms=2) as profiler:
+        with stage("work"):
+            _busy_loop(0.1)
+            blob = [bytes(1024) for _ in range(2048)]  # ~2 MiB live
+        record_stages({"extra": 12.5})
+    del blob
+    assert rag.profiling._active is None
+    collapsed = next(tmp_path.glob("unit-*.collapsed")).read_text().splitlines()
+    assert collapsed
+    for line in collapsed:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+    assert any("_busy_loop" in line for line in collapsed)
+    assert profiler.peak_bytes >= 2 * 2**20
+    assert profiler.stages["work"] >= 100
+    assert profiler.stages["extra"] == 12.5
+    summary = next(tmp_path.glob("unit-*.txt")).read_text()
+    assert "peak traced memory" in summary and "work" in summary
+
+
+def test_stage_is_a_no_op_without_a_profile():
+    with stage("ignored"):
+        pass
+    record_stages({"ignored": 1.0})
+    assert rag.profiling._active is None
@@ -0,0 +1,165 @@
+"""Unit tests for compact first-pass vectors: PCA fit, rescored search, snapshot round trip (in-memory Qdrant)."""
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import rag.projection
+import rag.store
+from rag.projection import (
+    COMPACT_VECTOR,
+    FULL_VECTOR,
+    fit_projection,
+    load_projection,
+    projection_path,
+    save_projection,
+)
+from rag.snapshot import export_snapshot, import_snapshot
+from rag.store import (
+    create_collection,
+    prepare_collection,
+    publish_collection,
+    resolve_collection,
+    search_points,
+    vector_layout,
+)
+
+FULL = 32
+COMPACT = 4
+
+
+@pytest.fixture(autouse=True)
+def projection_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag.projection, "INDEX_PROJECTION_DIR", tmp_path / "projections")
+    monkeypatch.setattr(rag.projection, "_cache", {})
+    monkeypatch.setattr(rag.store, "_layouts", {})
+
+
+def _low_rank(n: int, seed: int = 0) -> np.ndarray:
+    """Vectors that live (up to small noise) in a COMPACT-dim subspace, zero-padded like real embeddings."""
+    rng = np.random.default_rng(seed)
+    basis = rng.normal(size=(COMPACT, FULL // 2))
+    x = np.zeros((n, FULL), dtype=np.float32)
+    x[:, : FULL // 2] = rng.normal(size=(n, COMPACT)) @ basis + 0.01 * rng.normal(size=(n, FULL // 2))
+    return x
+
+
+def test_pca_keeps_the_signal_subspace():
+    x = _low_rank(200)
+    projection = fit_projection(x, COMPACT, "pca")
+    assert projection.components.shape == (COMPACT, FULL)
+    # Reconstruction from the compact coordinates is near-exact for in-subspace data
+    restored = projection.project(x) @ projection.components + projection.mean
+    assert np.abs(restored - x).max() < 0.1
+
+
+def test_truncate_and_invalid_settings():
+    x = _low_rank(10)
+    assert np.allclose(fit_projection(x, 3, "truncate").project(x), x[:, :3])
+    with pytest.raises(ValueError, match="needs more than"):
+        fit_projection(x, 12, "pca")
+    with pytest.raises(ValueError, match="Unknown projection method"):
+        fit_projection(x, 3, "svd")
+
+
+def _fill(client: QdrantClient, name: str, x: np.ndarray, projection=None) -> None:
+    compact = (projection or fit_projection(x, COMPACT, "pca")).project(x)
+    client.upsert(
+        name,
+        points=[
+            models.PointStruct(
+                id=i,
+                vector={FULL_VECTOR: x[i].tolist(), COMPACT_VECTOR: compact[i].tolist()},
+                payload={"text": f"chunk {i}", "source_file": f"{i}.txt"},
+            )
+            for i in range(len(x))
+        ],
+    )
+
+
+def _compact_collection(client: QdrantClient, name: str, x: np.ndarray) -> None:
+    projection = fit_projection(x, COMPACT, "pca")
+    create_collection(client, name, size=FULL, compact_dim=COMPACT)
+    save_projection(name, projection)
+    _fill(client, name, x, projection)
+
+
+def test_search_rescores_compact_candidates_with_full_vectors():
+    client = QdrantClient(location=":memory:")
+    x = _low_rank(100)
+    _compact_collection(client, "mail", x)
+    query = x[7] + 0.001
+    hits = search_points(client, "mail", query.tolist(), 5)
+    assert hits[0].id == 7
+    full = x / np.linalg.norm(x, axis=1, keepdims=True)
+    expected = float(full[7] @ (query / np.linalg.norm(query)))
+    # Scores come from the full vectors, not the compact first pass
+    assert hits[0].score == pytest.approx(expected, abs=1e-4)
+
+
+def test_compact_layout_comes_from_the_collection():
+    client = QdrantClient(location=":memory:")
+    x = _low_rank(60)
+    create_collection(client, "plain", size=FULL)
+    assert vector_layout(client, "plain") == ("plain", 0)
+    _compact_collection(client, "mail", x)
+    assert vector_layout(client, "mail") == ("mail", COMPACT)
+    # Built on another host: compact vectors but no projection here -> a clear error, not a silent flat search
+    projection_path("mail").unlink()
+    rag.projection._cache.clear()
+    with pytest.raises(RuntimeError, match="no projection"):
+        search_points(client, "mail", x[0].tolist(), 3)
+    # Copied in later: picked up without a restart
+    fit_projection(x, COMPACT, "pca").save(projection_path("mail"))
+    assert search_points(client, "mail", x[0].tolist(), 1)[0].id == 0
+
+
+def test_projection_is_stored_with_the_collection_version():
+    client = QdrantClient(location=":memory:")
+    x = _low_rank(60)
+    old = prepare_collection(client, "mail", size=FULL, compact_dim=COMPACT)
+    _fill(client, old, x)
+    save_projection(old, fit_projection(x, COMPACT, "pca"), client)
+    # The reserved point is not counted
+    publish_collection(client, "mail", old, expected_count=len(x), warmup_queries=[])
+    # Another query host: no local artifact, the projection is read from the collection
+    projection_path(old).unlink()
+    rag.projection._cache.clear()
+    assert search_points(client, "mail", x[5].tolist(), 1)[0].id == 5
+    assert load_projection(old).dim == COMPACT  # cached once read
+
+    # Another process publishes a new version with its own PCA; this process still has the old layout cached
+    y = _low_rank(60, seed=1)
+    new = prepare_collection(client, "mail", size=FULL, compact_dim=COMPACT)
+    _fill(client, new, y)
+    save_projection(new, fit_projection(y, COMPACT, "pca"), client)
+    client.update_collection_aliases(
+        change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name="mail")),
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=new, alias_name="mail")),
+        ]
+    )
+    # Vectors and projection come from the same (cached) version until the layout is looked up again
+    assert search_points(client, "mail", x[5].tolist(), 1)[0].id == 5
+    client.delete_collection(old)  # garbage-collected by the other process: looked up again at once
+    assert search_points(client, "mail", y[9].tolist(), 1)[0].id == 9
+
+
+def test_snapshot_carries_projection(tmp_path):
+    client = QdrantClient(location=":memory:")
+    x = _low_rank(40)
+    _compact_collection(client, "src", x)
+    manifest = export_snapshot(tmp_path / "snap", "src", client=client)
+    assert manifest["compact_dim"] == COMPACT
+    import_snapshot(tmp_path / "snap", "dst", client=client, parallel=1)
+    imported = load_projection(resolve_collection(client, "dst"))
+    assert imported is not None and imported.dim == COMPACT
+    assert search_points(client, "dst", x[3].tolist(), 1)[0].id == 3
+
+
+def test_snapshot_export_refuses_compact_vectors_without_projection(tmp_path):
+    client = QdrantClient(location=":memory:")
+    create_collection(client, "src", size=FULL, compact_dim=COMPACT)
+    with pytest.raises(RuntimeError, match="projection"):
+        export_snapshot(tmp_path / "snap", "src", client=client)
@@ -0,0 +1,95 @@
+"""Unit tests for two-stage (email -> paragraph) retrieval (in-memory Qdrant, no embedding model)."""
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import rag.store
+from rag.retrieve import two_stage_search
+from rag.store import (
+    EmailVectors,
+    build_email_index,
+    email_index_missing,
+    prepare_collection,
+    publish_collection,
+)
+
+SIZE = 4
+
+# Two emails about "x", one about "y"; each paragraph is a unit-ish vector
+PARAGRAPHS = [
+    ("a.txt", [1.0, 0.1, 0.0, 0.0]),
+    ("a.txt", [0.9, 0.0, 0.2, 0.0]),
+    ("b.txt", [0.8, 0.3, 0.0, 0.0]),
+    ("c.txt", [0.0, 0.0, 0.0, 1.0]),
+    ("c.txt", [0.1, 0.0, 0.0, 0.9]),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_layouts(monkeypatch):
+    monkeypatch.setattr(rag.store, "_layouts", {})
+    monkeypatch.setattr(rag.store, "_no_email_index", set())
+
+
+def _index(client: QdrantClient, *, with_emails: bool = True) -> EmailVectors:
+    target = prepare_collection(client, "mail", size=SIZE)
+    emails = EmailVectors()
+    points = []
+    for i, (source_file, vector) in enumerate(PARAGRAPHS):
+        payload = {"text": f"p{i}", "source_file": source_file, "subject": source_file}
+        emails.add(payload, vector)
+        points.append(models.PointStruct(id=i, vector=vector, payload=payload))
+    client.upsert(target, points=points)
+    publish_collection(client, "mail", target, expected_count=len(points), warmup_queries=[])
+    if with_emails:
+        build_email_index(client, "mail", emails, size=SIZE)
+    return emails
+
+
+def test_email_vectors_average_chunks_and_expand_sources():
+    emails = EmailVectors()
+    emails.add({"source_file": "a.txt"}, [1.0, 0.0])
+    emails.add({"source_file": "a.txt"}, [0.0, 1.0])
+    emails.add({"source_file": "b.txt", "sources": [{"source_file": "b.txt"}, {"source_file": "a.txt"}]}, [1.0, 1.0])
+    points = {p.payload["source_file"]: p for p in emails.points()}
+    assert points["a.txt"].vector == pytest.approx([2 / 3, 2 / 3])
+    assert points["a.txt"].payload["chunks"] == 3
+    assert points["b.txt"].vector == [1.0, 1.0]
+
+
+def test_fine_stage_only_ranks_paragraphs_of_candidate_emails():
+    client = QdrantClient(location=":memory:")
+    _index(client)
+    # At least `limit` emails are always candidates, so limits stay small here
+    hits = two_stage_search(client, "mail", [0.0, 0.0, 0.0, 1.0], 1, candidate_emails=1)
+    assert [h.payload["source_file"] for h in hits] == ["c.txt"]
+
+    hits = two_stage_search(client, "mail", [1.0, 0.0, 0.0, 0.0], 3, candidate_emails=2)
+    assert {h.payload["source_file"] for h in hits} == {"a.txt", "b.txt"}
+
+
+def test_where_filter_applies_to_both_stages():
+    client = QdrantClient(location=":memory:")
+    _index(client)
+    where = models.Filter(
+        must=[models.FieldCondition(key="subject", match=models.MatchValue(value="b.txt"))]
+    )
+    hits = two_stage_search(client, "mail", [1.0, 0.0, 0.0, 0.0], 5, query_filter=where)
+    assert [h.payload["source_file"] for h in hits] == ["b.txt"]
+
+
+def test_missing_email_index_falls_back_to_flat():
+    client = QdrantClient(location=":memory:")
+    client.create_collection("plain", vectors_config=models.VectorParams(size=SIZE, distance=models.Distance.COSINE))
+    assert two_stage_search(client, "plain", [1.0, 0.0, 0.0, 0.0], 5) is None
+
+
+def test_missing_email_index_is_rechecked_after_a_build():
+    client = QdrantClient(location=":memory:")
+    emails = _index(client, with_emails=False)
+    assert two_stage_search(client, "mail", [1.0, 0.0, 0.0, 0.0], 5) is None
+    assert email_index_missing(client, "mail")
+    build_email_index(client, "mail", emails, size=SIZE)
+    assert not email_index_missing(client, "mail")
+    assert two_stage_search(client, "mail", [1.0, 0.0, 0.0, 0.0], 5)
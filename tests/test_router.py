@@ -0,0 +1,83 @@
+"""Unit tests for the metadata index and structured-question router (sample emails, no LLM)."""
+
+from pathlib import Path
+
+import pytest
+
+import rag.metadata_index
+from rag.ingest import load_all_emails
+from rag.metadata_index import MetadataIndex, load_metadata_index, save_metadata_index
+from rag.router import parse_structured, route
+
+EMAILS_DIR = Path(__file__).resolve().parent.parent / "emails"
+
+
+@pytest.fixture(scope="module")
+def emails():
+    loaded = load_all_emails(EMAILS_DIR)
+    if not loaded:
+        pytest.skip("No sample emails")
+    return loaded
+
+
+@pytest.fixture(scope="module")
+def index(emails):
+    return MetadataIndex.build(emails)
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        "what did Helen say about the budget?",
+        "how many emails mention the workshop",
+        "summarize the meeting requests",
+    ],
+)
+def test_semantic_questions_are_not_routed(question):
+    assert parse_structured(question) is None
+
+
+def test_count_by_sender_is_exact(emails, index):
+    sender = emails[0]
+    expected = sum(e.from_email == sender.from_email for e in emails)
+    for phrasing in (
+        f"How many emails did {sender.from_name} send?",
+        f"how many emails were sent by {sender.from_email}",
+        f"How many messages from {sender.from_display()}?",
+    ):
+        answer, results = route(phrasing, index)
+        assert answer.startswith(f"{expected} email")
+        assert all(r.from_ == sender.from_display() for r in results)
+
+
+def test_count_combines_sender_recipient_and_subject(emails, index):
+    e = emails[0]
+    expected = sum(
+        x.from_email == e.from_email and x.to_email == e.to_email and x.subject == e.subject for x in emails
+    )
+    question = f'how many emails did {e.from_name} send to {e.to_name} with subject "{e.subject}"?'
+    answer, _ = route(question, index)
+    assert answer.startswith(f"{expected} email")
+
+
+def test_list_by_subject_and_totals(emails, index):
+    subject = emails[0].subject
+    answer, results = route(f"list emails with subject {subject}", index)
+    assert len(results) == min(50, sum(e.subject == subject for e in emails))
+    assert {r.subject for r in results} == {subject}
+    assert route("how many emails are there?", index)[0] == f"{len(emails)} emails in total."
+    top_answer, _ = route("who sent the most emails?", index)
+    assert top_answer.startswith("Top senders:\n1. ")
+
+
+def test_unknown_name_falls_back_to_rag(index):
+    assert route("how many emails did Nobody Known send?", index) is None
+
+
+def test_index_roundtrip(tmp_path, monkeypatch, index):
+    monkeypatch.setattr(rag.metadata_index, "METADATA_INDEX_DIR", tmp_path)
+    assert load_metadata_index("mail") is None
+    save_metadata_index(index, "mail")
+    loaded = load_metadata_index("mail")
+    assert loaded.rows == index.rows
+    assert loaded.top("from") == index.top("from")
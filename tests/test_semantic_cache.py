@@ -0,0 +1,134 @@
+"""Unit tests for the semantic answer cache: similarity lookup, scopes, eviction, TTL, index versions (no LLM, no Qdrant)."""
+
+import os
+import time
+import uuid
+
+import pytest
+
+import rag.embedding
+import rag.metadata_index
+import rag.pipeline
+import rag.retrieve
+import rag.semantic_cache
+from rag.metadata_index import metadata_index_path
+from rag.models import RetrieveResult
+from rag.pipeline import RAGPipeline
+from rag.semantic_cache import SemanticCache
+
+RESULTS = [
+    RetrieveResult(text="The Q3 budget was approved.", metadata={"source_file": "budget.txt"}, point_id="p1"),
+]
+# Toy embeddings: paraphrases of one question point the same way
+VECTORS = {
+    "what was approved?": [1.0, 0.0, 0.0],
+    "which things got approved": [0.98, 0.2, 0.0],
+    "who starts monday?": [0.0, 1.0, 0.0],
+    "when is the offsite?": [0.6, 0.0, 0.8],
+}
+
+
+@pytest.fixture(autouse=True)
+def metadata_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(rag.metadata_index, "METADATA_INDEX_DIR", tmp_path)
+    return tmp_path
+
+
+def test_lookup_by_similarity_and_scope():
+    cache = SemanticCache("mail", threshold=0.9)
+    cache.put(VECTORS["what was approved?"], "", "Q3 budget.", RESULTS)
+    assert cache.get(VECTORS["which things got approved"]) == ("Q3 budget.", RESULTS)
+    assert cache.get(VECTORS["when is the offsite?"]) is None  # cosine 0.6
+    assert cache.get(VECTORS["what was approved?"], scope='{"where": {"from": "Ann"}}') is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    assert cache.stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_size_and_ttl_eviction():
+    cache = SemanticCache("mail", threshold=0.9, size=2)
+    cache.put(VECTORS["what was approved?"], "", "a", RESULTS)
+    cache.put(VECTORS["who starts monday?"], "", "b", RESULTS)
+    assert cache.get(VECTORS["what was approved?"]) is not None  # now most recently used
+    cache.put(VECTORS["when is the offsite?"], "", "c", RESULTS)
+    assert len(cache) == 2 and cache.stats.evictions == 1
+    assert cache.get(VECTORS["who starts monday?"]) is None
+
+    expiring = SemanticCache("mail", threshold=0.9, ttl_s=0.05)
+    expiring.put(VECTORS["what was approved?"], "", "a", RESULTS)
+    time.sleep(0.1)
+    assert expiring.get(VECTORS["what was approved?"]) is None
+    assert expiring.stats.expired == 1 and len(expiring) == 0
+
+
+def test_reindex_keeps_answers_whose_chunks_survive(monkeypatch):
+    present = {"p1": True}
+    checked = []
+
+    def chunks_present(results, collection_name):
+        checked.append(collection_name)
+        return all(present.get(r.point_id, False) for r in results)
+
+    monkeypatch.setattr(rag.semantic_cache, "chunks_present", chunks_present)
+    path = metadata_index_path("mail")
+    path.write_text("{}", encoding="utf-8")
+    cache = SemanticCache("mail", threshold=0.9)
+    cache.put(VECTORS["what was approved?"], "", "a", RESULTS)
+    assert cache.get(VECTORS["what was approved?"]) is not None
+    assert checked == []  # same index version: no check
+
+    os.utime(path, ns=(time.time_ns() + 10**9,) * 2)  # re-indexed
+    assert cache.get(VECTORS["what was approved?"]) is not None
+    assert cache.get(VECTORS["what was approved?"]) is not None
+    assert checked == ["mail"]  # verified once per version
+
+    os.utime(path, ns=(time.time_ns() + 2 * 10**9,) * 2)
+    present["p1"] = False
+    assert cache.get(VECTORS["what was approved?"]) is None
+    assert cache.stats.stale == 1 and len(cache) == 0
+
+
+def test_ask_reuses_answers_to_rephrased_questions(monkeypatch):
+    calls = {"generate": 0}
+
+    def generate(query, results, **kwargs):
+        calls["generate"] += 1
+        return f"answer to {query}"
+
+    monkeypatch.setattr(rag.pipeline, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(rag.pipeline, "plan_queries", lambda query: [query])
+    monkeypatch.setattr(rag.pipeline, "generate", generate)
+    monkeypatch.setattr(rag.retrieve, "retrieve", lambda query, top_k=None, **kwargs: RESULTS)
+    monkeypatch.setattr(rag.embedding, "embed_query", lambda query: VECTORS[query.lower()])
+    pipe = RAGPipeline(collection_name="mail", shards=[])
+    pipe.semantic_cache = SemanticCache("mail", threshold=0.9)
+
+    first = pipe.ask("What was approved?", deadline_ms=0)
+    again = pipe.ask("Which things got approved", deadline_ms=0)
+    assert calls["generate"] == 1
+    assert again.answer == first.answer and "semantic_cache" in again.timings_ms
+    pipe.ask("Which things got approved", where={"from": "Ann"}, deadline_ms=0)
+    pipe.ask("Which things got approved", top_k=1, deadline_ms=0)
+    pipe.ask("Which things got approved", deadline_ms=0, use_store=False)
+    assert calls["generate"] == 4
+    assert pipe.semantic_cache.stats.hits == 1
+
+
+def test_chunks_present_checks_ids_and_text(monkeypatch):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+
+    import rag.store
+
+    client = QdrantClient(location=":memory:")
+    client.create_collection("mail", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    kept, gone = str(uuid.uuid5(uuid.NAMESPACE_DNS, "a.txt_0")), str(uuid.uuid5(uuid.NAMESPACE_DNS, "a.txt_1"))
+    client.upsert("mail", points=[models.PointStruct(id=kept, vector=[1.0, 0.0], payload={"text": "kept"})])
+    monkeypatch.setattr(rag.store, "get_qdrant_client", lambda: client)
+
+    def result(point_id, text):
+        return RetrieveResult(text=text, metadata={}, point_id=point_id)
+
+    assert rag.semantic_cache.chunks_present([result(kept, "kept")], "mail")
+    assert not rag.semantic_cache.chunks_present([result(kept, "edited")], "mail")
+    assert not rag.semantic_cache.chunks_present([result(gone, "gone")], "mail")
+    assert not rag.semantic_cache.chunks_present([result(None, "kept")], "mail")
@@ -0,0 +1,165 @@
+"""Unit tests for sharded collections: shard config, routing, parallel fan-out and per-shard indexing (no Qdrant)."""
+
+import time
+
+import pytest
+
+import rag.embedding
+import rag.metadata_index
+import rag.pipeline
+import rag.retrieve
+import rag.store
+from rag.metadata_index import MetadataIndex
+from rag.models import ParsedEmail, RetrieveResult
+from rag.pipeline import RAGPipeline
+from rag.sharding import (
+    Shard,
+    configured_shards,
+    fan_out,
+    hash_bucket,
+    parse_shards,
+    route_shards,
+    select_shards,
+    shard_emails,
+)
+
+
+def _email(source_file: str, sender: str, subject: str = "Budget") -> ParsedEmail:
+    return ParsedEmail(
+        source_file=source_file,
+        subject=subject,
+        from_name=sender,
+        from_email=f"{sender.lower()}@x.io",
+        to_name="Team",
+        to_email="team@x.io",
+        body=f"{subject} notes from {sender}.",
+    )
+
+
+def _result(source_file: str, score: float) -> RetrieveResult:
+    return RetrieveResult(text=source_file, metadata={"source_file": source_file}, distance=score)
+
+
+def test_shard_config():
+    shards = configured_shards("mail", spec="sales=/m/sales.mbox, hr=/m/hr")
+    assert [(s.name, s.collection, str(s.emails_dir)) for s in shards] == [
+        ("sales", "mail__sales", "/m/sales.mbox"),
+        ("hr", "mail__hr", "/m/hr"),
+    ]
+    hashed = configured_shards("mail", spec="", buckets=3)
+    assert [s.collection for s in hashed] == ["mail__h0", "mail__h1", "mail__h2"]
+    assert configured_shards("mail", spec="", buckets=0) == []
+    for bad in ("sales", "=x", "a b=x", "a=x,a=y"):
+        with pytest.raises(ValueError):
+            parse_shards(bad)
+    with pytest.raises(ValueError):
+        select_shards(shards, ["ops"])
+
+
+def test_hash_buckets_are_stable_and_partition_emails():
+    emails = [_email(f"email_{i}.txt", "Ann") for i in range(200)]
+    shards = configured_shards("mail", spec="", buckets=4)
+    parts = [shard_emails(s, emails) for s in shards]
+    assert sorted(e.source_file for part in parts for e in part) == sorted(e.source_file for e in emails)
+    assert all(20 < len(part) < 80 for part in parts)
+    assert hash_bucket("email_7.txt", 4) == hash_bucket("email_7.txt", 4)
+
+
+def test_routing_prunes_shards():
+    hashed = configured_shards("mail", spec="", buckets=4)
+    file = "email_7.txt"
+    routed = route_shards(hashed, {"source_file": file})
+    assert [s.bucket for s in routed] == [hash_bucket(file, 4)]
+    assert route_shards(hashed, {"subject": "x"}) == hashed
+
+    mailboxes = configured_shards("mail", spec="sales=/m/s,hr=/m/h,ops=/m/o")
+    metadata = {
+        "sales": MetadataIndex.build([_email("a.txt", "Ann")]),
+        "hr": MetadataIndex.build([_email("b.txt", "Bob")]),
+        "ops": None,  # not indexed yet: never pruned
+    }
+    routed = route_shards(mailboxes, {"$and": [{"from": {"$in": ["Bob", "Carl"]}}]}, metadata)
+    assert [s.name for s in routed] == ["hr", "ops"]
+
+
+def test_fan_out_merges_top_k_in_parallel():
+    shards = [Shard(name=f"s{i}", collection=f"c{i}") for i in range(4)]
+    scores = {"s0": [0.9, 0.5], "s1": [0.8, 0.7], "s2": [0.95], "s3": []}
+
+    def search(shard):
+        time.sleep(0.2)
+        return [_result(f"{shard.name}-{score}", score) for score in scores[shard.name]]
+
+    started = time.monotonic()
+    merged = fan_out(search, shards, 3)
+    assert time.monotonic() - started < 0.6
+    assert [r.distance for r in merged] == [0.95, 0.9, 0.8]
+    assert [r.metadata["shard"] for r in merged] == ["s2", "s0", "s1"]
+
+
+def test_fan_out_skips_a_failing_shard():
+    shards = [Shard(name="ok", collection="c0"), Shard(name="down", collection="c1")]
+
+    def search(shard):
+        if shard.name == "down":
+            raise ConnectionError("shard down")
+        return [_result("a.txt", 0.5)]
+
+    assert [r.source_file for r in fan_out(search, shards, 5)] == ["a.txt"]
+    with pytest.raises(ConnectionError):
+        fan_out(search, shards[1:], 5)
+
+
+@pytest.fixture
+def sharded(monkeypatch, tmp_path):
+    """Hash-sharded pipeline over fake emails; builds and searches are recorded, not run."""
+    emails = [_email(f"email_{i}.txt", "Ann" if i % 2 else "Bob") for i in range(12)]
+    built: dict[str, list[str]] = {}
+    searched: list[str] = []
+
+    def build(chunks, collection_name=None, **kwargs):
+        built[collection_name] = sorted({c.source_file for c in chunks})
+        return collection_name
+
+    def retrieve(query, top_k=None, *, collection_name=None, **kwargs):
+        searched.append(collection_name)
+        files = built[collection_name][:top_k]
+        return [_result(f, 1.0 - i / 100) for i, f in enumerate(files)]
+
+    monkeypatch.setattr(rag.metadata_index, "METADATA_INDEX_DIR", tmp_path)
+    monkeypatch.setattr(rag.pipeline, "load_all_emails", lambda path=None: emails)
+    monkeypatch.setattr(rag.pipeline, "ROUTER_ENABLED", False)
+    monkeypatch.setattr(rag.pipeline, "plan_queries", lambda query: [query])
+    monkeypatch.setattr(rag.pipeline, "generate", lambda query, results: f"{len(results)} results")
+    monkeypatch.setattr(rag.store, "build_store_from_chunks", build)
+    monkeypatch.setattr(rag.retrieve, "retrieve", retrieve)
+    monkeypatch.setattr(rag.embedding, "embed_query", lambda query: [0.0])
+    pipeline = RAGPipeline(collection_name="mail", shards=configured_shards("mail", spec="", buckets=3))
+    return pipeline, built, searched
+
+
+def test_shards_index_independently(sharded):
+    pipeline, built, _ = sharded
+    pipeline.index(shard="h1")
+    assert list(built) == ["mail__h1"]
+    assert all(hash_bucket(f, 3) == 1 for f in built["mail__h1"])
+    pipeline.index()
+    assert sorted(built) == ["mail__h0", "mail__h1", "mail__h2"]
+    assert sum(len(files) for files in built.values()) == 12
+    assert len(pipeline.metadata().rows) == 12
+
+
+def test_ask_fans_out_or_routes(sharded):
+    pipeline, built, searched = sharded
+    pipeline.index()
+    response = pipeline.ask("budget?", top_k=4)
+    assert sorted(searched) == ["mail__h0", "mail__h1", "mail__h2"]
+    assert len(response.results) == 4
+    assert {r.metadata["shard"] for r in response.results} <= {"h0", "h1", "h2"}
+
+    searched.clear()
+    pipeline.ask("budget?", where={"source_file": "email_3.txt"})
+    assert searched == [f"mail__h{hash_bucket('email_3.txt', 3)}"]
+    searched.clear()
+    pipeline.ask("budget?", shards=["h2"])
+    assert searched == ["mail__h2"]
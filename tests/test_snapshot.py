@@ -0,0 +1,120 @@
+"""Unit tests for snapshot export / import (in-memory Qdrant, no embedding model)."""
+
+import json
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import rag.metadata_index
+import rag.snapshot
+from rag.ingest import load_all_emails
+from rag.metadata_index import MetadataIndex, load_metadata_index, save_metadata_index
+from rag.snapshot import export_snapshot, import_snapshot, read_manifest
+from rag.store import alias_target, create_collection
+
+SIZE = 16
+NATIVE = 6
+
+
+@pytest.fixture(autouse=True)
+def metadata_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag.metadata_index, "METADATA_INDEX_DIR", tmp_path / "metadata")
+
+
+@pytest.fixture
+def client_with_points():
+    client = QdrantClient(location=":memory:")
+    create_collection(client, "src", size=SIZE)
+    rng = np.random.default_rng(0)
+    vectors = np.zeros((25, SIZE), dtype=np.float32)
+    vectors[:, :NATIVE] = rng.normal(size=(25, NATIVE))
+    client.upsert(
+        "src",
+        points=[
+            models.PointStruct(
+                id=i,
+                vector=vectors[i].tolist(),
+                payload={"text": f"chunk {i}", "subject": "S", **({"sources": [i]} if i % 2 else {})},
+            )
+            for i in range(25)
+        ],
+    )
+    return client, vectors
+
+
+@pytest.mark.parametrize("dtype,compress", [("float32", False), ("float16", True), ("int8", False)])
+def test_export_import_roundtrip(tmp_path, client_with_points, dtype, compress):
+    client, vectors = client_with_points
+    manifest = export_snapshot(tmp_path, "src", dtype=dtype, compress=compress, batch_size=10, client=client)
+    assert manifest["count"] == 25
+    assert manifest["stored_dim"] == NATIVE
+    assert read_manifest(tmp_path)["dtype"] == dtype
+
+    loaded = import_snapshot(tmp_path, "dst", client=client, parallel=1, batch_size=7)
+    assert loaded == 25
+    points, _ = client.scroll("dst", limit=100, with_payload=True, with_vectors=True)
+    by_id = {int(p.id): p for p in points}
+    assert len(by_id) == 25
+    restored = np.asarray([by_id[i].vector for i in range(25)])
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    cosine = np.sum(restored * normed, axis=1) / np.linalg.norm(restored, axis=1)
+    assert cosine.min() > 0.999
+    assert by_id[3].payload["sources"] == [3]
+    assert "sources" not in by_id[4].payload
+
+
+def test_payloads_are_json_lines_and_format_1_still_imports(tmp_path, client_with_points):
+    client, _ = client_with_points
+    export_snapshot(tmp_path, "src", batch_size=10, client=client)
+    lines = (tmp_path / "payloads.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 25 and json.loads(lines[3]) == {"id": 3, "text": "chunk 3", "subject": "S", "sources": [3]}
+
+    # Format 1 kept payloads as one JSON object of columns
+    records = [json.loads(line) for line in lines]
+    keys = sorted({k for r in records for k in r})
+    columns = {k: [r.get(k) for r in records] for k in keys}
+    (tmp_path / "payloads.json").write_text(json.dumps(columns), encoding="utf-8")
+    (tmp_path / "payloads.jsonl").unlink()
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["format_version"] = 1
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    assert import_snapshot(tmp_path, "dst", client=client, parallel=1) == 25
+    point = client.retrieve("dst", [3], with_payload=True)[0]
+    assert point.payload == {"text": "chunk 3", "subject": "S", "sources": [3]}
+
+
+def test_import_refuses_other_model(tmp_path, client_with_points):
+    client, _ = client_with_points
+    export_snapshot(tmp_path, "src", client=client)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    manifest["model"] = "some-other-model"
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+    with pytest.raises(ValueError, match="EMBEDDING_MODEL"):
+        import_snapshot(tmp_path, "dst", client=client)
+
+
+def test_metadata_index_travels_with_the_snapshot(tmp_path, client_with_points):
+    client, _ = client_with_points
+    index = MetadataIndex.build(load_all_emails()[:5])
+    save_metadata_index(index, "src")
+    manifest = export_snapshot(tmp_path / "snap", "src", compress=True, client=client)
+    assert manifest["metadata_index"]
+    import_snapshot(tmp_path / "snap", "dst", client=client, parallel=1)
+    assert load_metadata_index("dst") == index
+
+
+def test_failed_import_deletes_its_version(tmp_path, client_with_points, monkeypatch):
+    client, _ = client_with_points
+    export_snapshot(tmp_path, "src", client=client)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("optimizer stuck")
+
+    monkeypatch.setattr(rag.snapshot, "finalize_collection", fail)
+    with pytest.raises(RuntimeError, match="optimizer stuck"):
+        import_snapshot(tmp_path, "dst", client=client, parallel=1)
+    assert alias_target(client, "dst") is None
+    assert [c.name for c in client.get_collections().collections] == ["src"]
+    assert load_metadata_index("dst") is None
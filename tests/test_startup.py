@@ -0,0 +1,74 @@
+"""Import-time budget: the CLI starts without loading the embedding model, Qdrant client or Mistral SDK."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Loaded on first use only (torch alone takes seconds); importing any of them at startup is a regression
+HEAVY_MODULES = ("sentence_transformers", "torch", "qdrant_client", "mistralai", "httpx")
+# Wall time for `import cli` in a fresh interpreter; ~0.15s today, generous for slow CI machines
+STARTUP_BUDGET_S = 1.0
+
+_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import cli
+elapsed = time.perf_counter() - started
+print(json.dumps({{"elapsed_s": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def test_cli_import_defers_heavy_dependencies():
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    report = json.loads(out.stdout.strip().splitlines()[-1])
+    assert report["heavy"] == []
+    assert report["elapsed_s"] < STARTUP_BUDGET_S
+
+
+def test_cli_help_runs():
+    out = subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "cli.py"), "--help"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert out.returncode == 0
+    assert "index" in out.stdout and "ask" in out.stdout
+
+
+def test_llm_modules_import_the_sdk_lazily():
+    out = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, rag.generate, rag.query_plan, rag.embedding\n"
+            "print(sorted(m for m in ('mistralai', 'sentence_transformers', 'httpx') if m in sys.modules))",
+        ],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.strip() == "[]"
+
+
+def test_mistral_stays_a_patchable_module_attribute():
+    import mistralai
+
+    import rag.generate
+    import rag.query_plan
+
+    assert rag.generate.Mistral is rag.query_plan.Mistral is mistralai.Mistral
+    with patch("rag.query_plan.Mistral") as mock:
+        assert rag.query_plan._mistral() is mock
+        assert rag.generate._mistral() is mistralai.Mistral
+    assert rag.query_plan._mistral() is mistralai.Mistral
+    with pytest.raises(AttributeError):
+        rag.generate.MistralClient
@@ -0,0 +1,116 @@
+"""Unit tests for blue/green collection versions behind an alias (in-memory Qdrant)."""
+
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import rag.embedding
+import rag.store
+from rag.chunking import chunk_emails
+from rag.config import collection_profile
+from rag.ingest import load_all_emails
+from rag.store import (
+    alias_target,
+    build_store_from_chunks,
+    create_collection,
+    finalize_collection,
+    gc_versions,
+    prepare_collection,
+    publish_collection,
+    resolve_collection,
+)
+
+SIZE = 4
+
+
+def _fill(client: QdrantClient, name: str, n: int) -> None:
+    client.upsert(
+        name,
+        points=[models.PointStruct(id=i, vector=[1.0, float(i), 0.0, 0.0]) for i in range(n)],
+    )
+
+
+def _build(client: QdrantClient, alias: str, n: int) -> str:
+    target = prepare_collection(client, alias, size=SIZE)
+    _fill(client, target, n)
+    publish_collection(client, alias, target, expected_count=n, warmup_queries=[])
+    return target
+
+
+def test_rebuild_swaps_alias_and_keeps_serving():
+    client = QdrantClient(location=":memory:")
+    first = _build(client, "mail", 3)
+    assert alias_target(client, "mail") == first
+    assert client.count("mail", exact=True).count == 3
+
+    second = _build(client, "mail", 5)
+    assert second != first
+    assert resolve_collection(client, "mail") == second
+    assert client.count("mail", exact=True).count == 5
+
+
+def test_failed_build_leaves_alias_untouched():
+    client = QdrantClient(location=":memory:")
+    live = _build(client, "mail", 3)
+    target = prepare_collection(client, "mail", size=SIZE)
+    _fill(client, target, 2)
+    with pytest.raises(RuntimeError, match="alias not swapped"):
+        publish_collection(client, "mail", target, expected_count=4, warmup_queries=[])
+    assert alias_target(client, "mail") == live
+
+
+def test_failed_index_build_deletes_its_unpublished_version(monkeypatch):
+    monkeypatch.setattr(rag.embedding, "EMBEDDING_MODEL", "hashing-8")
+    monkeypatch.setattr(rag.embedding, "_encoder", None)
+    monkeypatch.setattr(rag.store, "QDRANT_URL", ":memory:")
+    monkeypatch.setattr(rag.store, "_embedded", {})
+    chunks = chunk_emails(load_all_emails()[:3])
+    live = build_store_from_chunks(chunks, "mail", email_vectors=False, compact_dim=0)
+    client = rag.store.get_qdrant_client()
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("optimizer stuck")
+
+    monkeypatch.setattr(rag.store, "finalize_collection", fail)
+    with pytest.raises(RuntimeError, match="optimizer stuck"):
+        build_store_from_chunks(chunks, "mail", email_vectors=False, compact_dim=0)
+    assert alias_target(client, "mail") == live
+    assert [c.name for c in client.get_collections().collections] == [live]
+
+
+def test_gc_keeps_newest_versions_and_live():
+    client = QdrantClient(location=":memory:")
+    versions = [_build(client, "mail", 1) for _ in range(4)]
+    names = {c.name for c in client.get_collections().collections}
+    # publish_collection garbage-collects with the default retention of 2
+    assert names == set(versions[-2:])
+    assert gc_versions(client, "mail", keep=1) == [versions[-2]]
+    assert alias_target(client, "mail") == versions[-1]
+
+
+def test_plain_collection_is_migrated_to_alias():
+    client = QdrantClient(location=":memory:")
+    create_collection(client, "mail", size=SIZE)
+    _fill(client, "mail", 2)
+    target = _build(client, "mail", 3)
+    assert alias_target(client, "mail") == target
+    assert client.count("mail", exact=True).count == 3
+
+
+def test_bulk_load_profile_defers_then_enables_hnsw():
+    client = QdrantClient(location=":memory:")
+    profile = collection_profile("bulk-load")
+    target = prepare_collection(client, "mail", size=SIZE, profile=profile)
+    _fill(client, target, 3)
+    finalize_collection(client, target, profile=profile, timeout=0)
+    publish_collection(client, "mail", target, expected_count=3, warmup_queries=[])
+    assert client.count("mail", exact=True).count == 3
+
+
+def test_collection_profile_env_overrides(monkeypatch):
+    monkeypatch.setenv("QDRANT_HNSW_M", "48")
+    profile = collection_profile("low-memory")
+    assert profile.hnsw_m == 48
+    assert profile.on_disk_vectors
+    with pytest.raises(ValueError, match="Unknown collection profile"):
+        collection_profile("fastest")